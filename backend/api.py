@@ -0,0 +1,231 @@
+"""
+Read-only JSON API for Grafana, reports etc. – same aggregates as the dashboard, no UI.
+Run: python -m backend.api [port]   (API_HOST / API_PORT, default 127.0.0.1:8502)
+
+Endpoints (from/to = YYYY-MM-DD, default: last 7 days incl. today):
+  /api/kpis, /api/utilization, /api/processes, /api/idle-gaps   ?from=&to=
+  /api/trends, /api/quickwins, /api/health
+  /metrics   sync/recompute metrics in the Prometheus text format (backend.metrics, no ETag)
+
+Responses come from daily_utilization, the job range cache and the shared result cache
+(backend.cache). Every response carries an ETag derived from the data generation, the day and
+the request; a matching If-None-Match is answered with 304 before anything is loaded.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import sys
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parent.parent / ".env")
+
+import numpy as np
+import pandas as pd
+
+import backend.cache as shared_cache
+from backend import metrics
+from backend.database import init_tables
+from backend.services import dashboard_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DAYS = 7
+MAX_RANGE_DAYS = 366
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, (pd.Timedelta, timedelta)):
+        return value.total_seconds()
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return None if math.isnan(value) else float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, pd.DataFrame):
+        return _records(value)
+    raise TypeError(f"not JSON serializable: {type(value).__name__}")
+
+
+def _records(df: pd.DataFrame | None) -> list[dict[str, Any]]:
+    if df is None or df.empty:
+        return []
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def _date_range(query: dict[str, list[str]]) -> tuple[date, date]:
+    today = date.today()
+    try:
+        d_to = date.fromisoformat(query["to"][0]) if "to" in query else today
+        d_from = date.fromisoformat(query["from"][0]) if "from" in query else d_to - timedelta(days=DEFAULT_DAYS - 1)
+    except ValueError:
+        raise ApiError(400, "from/to must be YYYY-MM-DD")
+    if d_from > d_to:
+        raise ApiError(400, "from must not be after to")
+    if (d_to - d_from).days >= MAX_RANGE_DAYS:
+        raise ApiError(400, f"range must not exceed {MAX_RANGE_DAYS} days")
+    return d_from, d_to
+
+
+def kpis(query: dict[str, list[str]]) -> dict[str, Any]:
+    d_from, d_to = _date_range(query)
+    df_jobs = dashboard_service.load_jobs(d_from, d_to)
+    df_util = dashboard_service.load_utilization(d_from, d_to)
+    return {"from": d_from, "to": d_to, **dashboard_service.compute_kpis(df_jobs, df_util, date.today())}
+
+
+def utilization(query: dict[str, list[str]]) -> dict[str, Any]:
+    d_from, d_to = _date_range(query)
+    df_util = dashboard_service.load_utilization(d_from, d_to)
+    rows = df_util.sort_values(["date", "robot_name"]) if not df_util.empty else df_util
+    return {"from": d_from, "to": d_to, "rows": _records(rows)}
+
+
+def processes(query: dict[str, list[str]]) -> dict[str, Any]:
+    d_from, d_to = _date_range(query)
+    stats = shared_cache.get_or_compute(
+        "process_stats", d_from, d_to,
+        lambda: dashboard_service.process_stats(dashboard_service.load_jobs(d_from, d_to)),
+    )
+    rows = stats.sort_values("runs", ascending=False) if stats is not None else None
+    return {"from": d_from, "to": d_to, "processes": _records(rows)}
+
+
+def idle_gaps(query: dict[str, list[str]]) -> dict[str, Any]:
+    d_from, d_to = _date_range(query)
+    d_to = min(d_to, date.today() - timedelta(days=1))  # nur abgeschlossene Tage
+    df_jobs = dashboard_service.load_jobs(d_from, d_to)
+    days = dashboard_service.idle_days(df_jobs, d_from, d_to, last_n_days=MAX_RANGE_DAYS)
+    return {
+        "from": d_from,
+        "to": d_to,
+        "days": [
+            {"date": d["date"], "idle_minutes": d["idle_minutes"], "idle_str": d["idle_str"], "rows": _records(d["table"])}
+            for d in days
+        ],
+    }
+
+
+def trends(query: dict[str, list[str]]) -> dict[str, Any]:
+    return dashboard_service.weekly_trends(date.today())
+
+
+def quickwins(query: dict[str, list[str]]) -> dict[str, Any]:
+    return dashboard_service.quickwins(date.today())
+
+
+def health(query: dict[str, list[str]]) -> dict[str, Any]:
+    return {"status": "ok", "generation": shared_cache.current_generation()}
+
+
+ROUTES: dict[str, Callable[[dict[str, list[str]]], Any]] = {
+    "/api/kpis": kpis,
+    "/api/utilization": utilization,
+    "/api/processes": processes,
+    "/api/idle-gaps": idle_gaps,
+    "/api/trends": trends,
+    "/api/quickwins": quickwins,
+    "/api/health": health,
+}
+
+
+# Text-Endpunkte ohne ETag (ändern sich unabhängig von der Daten-Generation)
+TEXT_ROUTES: dict[str, Callable[[], str]] = {
+    "/metrics": metrics.exposition,
+}
+
+
+def etag_for(path: str, query: str) -> str:
+    """Weak ETag: changes with the data generation, the calendar day (default ranges) and the request."""
+    raw = f"{shared_cache.current_generation()}|{date.today().isoformat()}|{path}?{query}"
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "RPAPerformanceAPI/1.0"
+
+    def _send(
+        self, status: int, body: bytes | None, etag: str | None = None, content_type: str = "application/json; charset=utf-8"
+    ) -> None:
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        if body is not None:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body is not None and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        text_route = TEXT_ROUTES.get(url.path.rstrip("/"))
+        if text_route is not None:
+            self._send(200, text_route().encode("utf-8"), content_type="text/plain; version=0.0.4; charset=utf-8")
+            return
+        route = ROUTES.get(url.path.rstrip("/") or "/")
+        if route is None:
+            self._error(404, f"unknown endpoint {url.path}; available: {', '.join(sorted([*ROUTES, *TEXT_ROUTES]))}")
+            return
+        etag = etag_for(url.path, url.query)
+        if_none_match = self.headers.get("If-None-Match", "")
+        if etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*":
+            self._send(304, None, etag)
+            return
+        try:
+            payload = route(parse_qs(url.query))
+            body = json.dumps(payload, default=_json_default, ensure_ascii=False).encode("utf-8")
+        except ApiError as e:
+            self._error(e.status, str(e))
+            return
+        except Exception:
+            logger.exception("API error on %s", self.path)
+            self._error(500, "internal error")
+            return
+        self._send(200, body, etag)
+
+    do_HEAD = do_GET
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.info("%s %s", self.address_string(), format % args)
+
+
+def serve(host: str | None = None, port: int | None = None) -> None:
+    init_tables()
+    host = host or os.getenv("API_HOST", "127.0.0.1")
+    port = port or int(os.getenv("API_PORT", "8502"))
+    httpd = ThreadingHTTPServer((host, port), ApiHandler)
+    logger.info("API listening on http://%s:%d/api/", host, port)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    serve(port=int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,35 @@
+"""
+Lagert Jobs, die vor mehr als N Tagen geendet haben, nach data/archive/jobs/ aus (Parquet pro
+Monat) und entfernt sie aus SQLite. Dashboard und Loader lesen ältere Zeiträume weiter über das
+Archiv (siehe backend/services/job_archive.py). Benötigt pyarrow.
+Run: python -m backend.archive_jobs [days]   (Standard: JOB_ARCHIVE_AFTER_DAYS oder 365)
+"""
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.database import init_tables, stage_generation
+from backend.services import job_archive
+
+DEFAULT_DAYS = 365
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    days = job_archive.ARCHIVE_AFTER_DAYS or DEFAULT_DAYS
+    if len(sys.argv) > 1:
+        try:
+            days = int(sys.argv[1])
+        except ValueError:
+            pass
+    init_tables()
+    with stage_generation() as staging:
+        result = job_archive.archive_jobs(days, session_factory=staging)
+    months = ", ".join(result["months"]) or "–"
+    print(f"{result['archived']} Jobs vor {result['horizon']:%d.%m.%Y} archiviert (Monate: {months}).")
+
+
+if __name__ == "__main__":
+    main()
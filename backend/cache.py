@@ -0,0 +1,122 @@
+"""
+Process-wide result cache shared by all dashboard sessions.
+
+Entries are keyed by (name, day_from, day_to, extra) and stamped with the data generation
+(max data_generations.id) they were computed for. When the generation moves on, an entry is
+only recomputed if one of the newer generations changed a day inside its range; otherwise it
+is re-stamped and reused. Concurrent requests for the same key wait for one computation.
+Streamlit runs all sessions as threads of one process, so module state is shared.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Hashable
+
+from sqlalchemy import func
+
+from backend.database import DataGeneration, ReadSessionLocal
+
+MAX_ENTRIES = 64
+GENERATION_TTL_SECONDS = 1.0
+
+_lock = threading.Lock()
+_entries: "OrderedDict[tuple, tuple[int, Any]]" = OrderedDict()
+_key_locks: dict[tuple, threading.Lock] = {}
+_generation: tuple[float, int] = (0.0, -1)  # (checked_at, generation)
+
+
+def current_generation(force: bool = False) -> int:
+    """Latest data generation id (0 if none); re-read at most every GENERATION_TTL_SECONDS."""
+    global _generation
+    checked_at, gen = _generation
+    now = time.monotonic()
+    if not force and gen >= 0 and now - checked_at < GENERATION_TTL_SECONDS:
+        return gen
+    db = ReadSessionLocal()
+    try:
+        gen = db.query(func.max(DataGeneration.id)).scalar() or 0
+    finally:
+        db.close()
+    _generation = (now, gen)
+    return gen
+
+
+def changed_since(generation: int) -> list[tuple[date, date]]:
+    """Day ranges changed by generations newer than `generation` (everything if retention already purged some of them)."""
+    db = ReadSessionLocal()
+    try:
+        oldest = db.query(func.min(DataGeneration.id)).scalar()
+        if generation > 0 and oldest is not None and oldest > generation + 1:
+            return [(date.min, date.max)]
+        rows = (
+            db.query(DataGeneration.day_from, DataGeneration.day_to)
+            .filter(DataGeneration.id > generation)
+            .all()
+        )
+        return [(r[0], r[1]) for r in rows]
+    finally:
+        db.close()
+
+
+def _is_stale(entry_gen: int, gen: int, day_from: date | None, day_to: date | None) -> bool:
+    if entry_gen == gen:
+        return False
+    if day_from is None or day_to is None:
+        return True
+    return any(lo <= day_to and hi >= day_from for lo, hi in changed_since(entry_gen))
+
+
+def get_or_compute(
+    name: str,
+    day_from: date | None,
+    day_to: date | None,
+    compute: Callable[[], Any],
+    extra: Hashable = (),
+) -> Any:
+    """
+    Cached value for (name, day_from, day_to, extra). day_from/day_to = days the value depends on
+    (None = depends on everything, recompute on every new generation). Callers must not mutate the result.
+    """
+    key = (name, day_from, day_to, extra)
+    gen = current_generation()
+    with _lock:
+        entry = _entries.get(key)
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    if entry is not None and not _is_stale(entry[0], gen, day_from, day_to):
+        with _lock:
+            _entries[key] = (gen, entry[1])
+            _entries.move_to_end(key)
+        return entry[1]
+    with key_lock:
+        # Andere Session hat evtl. gerade berechnet
+        with _lock:
+            entry = _entries.get(key)
+        if entry is not None and entry[0] == gen:
+            return entry[1]
+        value = compute()
+        with _lock:
+            _entries[key] = (gen, value)
+            _entries.move_to_end(key)
+            while len(_entries) > MAX_ENTRIES:
+                old_key, _ = _entries.popitem(last=False)
+                _key_locks.pop(old_key, None)
+        return value
+
+
+def seed(name: str, day_from: date | None, day_to: date | None, value: Any, generation: int, extra: Hashable = ()) -> None:
+    """Store a value precomputed for `generation` (cold-start snapshot), unless the key is already cached."""
+    key = (name, day_from, day_to, extra)
+    gen = generation
+    with _lock:
+        if key not in _entries:
+            _entries[key] = (gen, value)
+
+
+def clear() -> None:
+    """Drop all entries (e.g. after restoring a DB file)."""
+    global _generation
+    with _lock:
+        _entries.clear()
+        _key_locks.clear()
+    _generation = (0.0, -1)
@@ -2,15 +2,23 @@
 Calculate daily utilization per robot (24/7 basis) from jobs and store in daily_utilization.
 Run: python -m backend.calculate_utilization
 """
+import logging
 import sys
+import time
 from collections import defaultdict
 from datetime import date, datetime, timedelta
 from pathlib import Path
+from typing import Callable
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from sqlalchemy import and_
-from backend.database import SessionLocal, Job, DailyUtilization, init_tables
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from backend import metrics as run_metrics
+from backend.database import SessionLocal, Job, DailyUtilization, DimRobotKey, init_tables, record_data_generation, stage_generation
+from backend.services import job_archive, retention_service
+
+logger = logging.getLogger(__name__)
 
 
 def _to_date(dt: datetime | date) -> date:
@@ -41,79 +49,175 @@ def _merge_intervals(ranges: list[tuple[datetime, datetime]]) -> list[tuple[date
     return out
 
 
-def calculate_and_store() -> int:
-    """Compute utilization per robot per day and upsert into daily_utilization. Returns rows updated."""
-    init_tables()
-    db = SessionLocal()
-    try:
-        jobs = db.query(Job).order_by(Job.robot_name, Job.start_time).all()
-        # Group by (date, robot_name): list of (start, end) clipped to that day (Job kann mehrere Tage überlappen)
-        by_day_robot: dict[tuple[date, str], list[tuple[datetime, datetime]]] = defaultdict(list)
-        for j in jobs:
-            start = _to_naive(j.start_time) if j.start_time else None
-            end = _to_naive(j.end_time) if j.end_time else None
-            if start is None or end is None or end <= start:
+def utilization_horizon(db: Session) -> date | None:
+    """First day whose jobs are complete in SQLite (archive/retention horizon); None = all days."""
+    horizons = [h for h in (job_archive.hot_horizon(), retention_service.jobs_horizon(db)) if h is not None]
+    return max(horizons) if horizons else None
+
+
+def _day_runs(days: set[date]) -> list[tuple[date, date]]:
+    """Contiguous runs [first, last] of the given days."""
+    runs: list[tuple[date, date]] = []
+    for d in sorted(days):
+        if runs and d == runs[-1][1] + timedelta(days=1):
+            runs[-1] = (runs[-1][0], d)
+        else:
+            runs.append((d, d))
+    return runs
+
+
+def rollup_utilization(
+    db: Session,
+    days: set[date] | None = None,
+    horizon: date | None = None,
+    progress: Callable[..., None] | None = None,
+    metrics: run_metrics.RunMetrics | None = None,
+) -> tuple[int, set[date]]:
+    """
+    Compute utilization per robot for `days` (None = every day with jobs) from the jobs in `db`
+    (pending changes must be flushed) and upsert daily_utilization; rows of these days whose
+    robot no longer has jobs there are deleted. The caller commits. Days before `horizon` are
+    skipped. Returns (rows computed, days whose rows changed).
+    metrics: phases utilization_query / utilization_compute / utilization_write are added to it.
+    """
+    metrics = metrics or run_metrics.RunMetrics("recompute")
+    query = db.query(DimRobotKey.name, Job.start_time, Job.end_time).join(DimRobotKey, DimRobotKey.id == Job.robot_key_id)
+    if days is not None:
+        if horizon is not None:
+            days = {d for d in days if d >= horizon}
+        if not days:
+            return 0, set()
+        query = query.filter(or_(*[
+            and_(
+                Job.start_time <= datetime.combine(last, datetime.max.time()),
+                Job.end_time >= datetime.combine(first, datetime.min.time()),
+            )
+            for first, last in _day_runs(days)
+        ]))
+    elif horizon is not None:
+        query = query.filter(Job.end_time >= datetime.combine(horizon, datetime.min.time()))
+    with metrics.span("utilization_query"):
+        jobs = query.order_by(Job.robot_key_id, Job.start_time).all()
+    t_compute = time.perf_counter()
+    # Group by (date, robot_key): list of (start, end) clipped to that day (Job kann mehrere Tage überlappen)
+    by_day_robot: dict[tuple[date, str], list[tuple[datetime, datetime]]] = defaultdict(list)
+    for robot_key, start, end in jobs:
+        start = _to_naive(start) if start else None
+        end = _to_naive(end) if end else None
+        if start is None or end is None or end <= start:
+            continue
+        d_start = _to_date(start)
+        d_end = _to_date(end)
+        # Job allen Kalendertagen zuordnen, die er überlappt (Abgleich mit Orchestrator/CSV)
+        for i in range((d_end - d_start).days + 1):
+            d = d_start + timedelta(days=i)
+            if horizon is not None and d < horizon:
+                continue
+            if days is not None and d not in days:
                 continue
-            rn = j.robot_name or "Unknown"
-            mn = (j.machine_name or "").strip()
-            robot_key = mn if mn else rn
-            d_start = _to_date(start)
-            d_end = _to_date(end)
-            # Job allen Kalendertagen zuordnen, die er überlappt (Abgleich mit Orchestrator/CSV)
-            for i in range((d_end - d_start).days + 1):
-                d = d_start + timedelta(days=i)
-                day_start = datetime.combine(d, datetime.min.time())
-                day_end = datetime.combine(d, datetime.max.time())
-                if start >= day_end or end <= day_start:
-                    continue
-                clip_start = max(start, day_start)
-                clip_end = min(end, day_end)
-                if clip_end > clip_start:
-                    by_day_robot[(d, robot_key)].append((clip_start, clip_end))
-
-        count = 0
-        for (d, robot_key), ranges in by_day_robot.items():
             day_start = datetime.combine(d, datetime.min.time())
             day_end = datetime.combine(d, datetime.max.time())
-            merged = _merge_intervals(ranges)
-            total_seconds = 0.0
-            for start, end in merged:
-                if end is None or end <= start:
-                    continue
-                clip_start = max(start, day_start)
-                clip_end = min(end, day_end)
-                if clip_end > clip_start:
-                    total_seconds += (clip_end - clip_start).total_seconds()
-            total_hours = min(24.0, total_seconds / 3600.0)  # Sicherheitscap
-            available_hours = 24.0  # 24/7
-            utilization_percent = (total_hours / available_hours) * 100.0 if available_hours else 0.0
-            idle_hours = max(0.0, available_hours - total_hours)
-
-            existing = db.query(DailyUtilization).filter(
-                and_(DailyUtilization.date == d, DailyUtilization.robot_name == robot_key)
-            ).first()
-            if existing:
-                existing.total_runtime_hours = total_hours
-                existing.idle_hours = idle_hours
-                existing.utilization_percent = utilization_percent
-            else:
-                db.add(DailyUtilization(
-                    date=d,
-                    robot_name=robot_key,
-                    total_runtime_hours=total_hours,
-                    idle_hours=idle_hours,
-                    utilization_percent=utilization_percent,
-                ))
-            count += 1
-        db.commit()
+            if start >= day_end or end <= day_start:
+                continue
+            clip_start = max(start, day_start)
+            clip_end = min(end, day_end)
+            if clip_end > clip_start:
+                by_day_robot[(d, robot_key)].append((clip_start, clip_end))
+    metrics.add_time("utilization_compute", time.perf_counter() - t_compute)
+
+    t_write = time.perf_counter()
+    # Bestehende Zeilen der neu berechneten Tage; was danach übrig bleibt, hat keine Jobs mehr
+    existing_query = db.query(DailyUtilization)
+    if days is not None:
+        existing_query = existing_query.filter(or_(*[
+            and_(DailyUtilization.date >= first, DailyUtilization.date <= last) for first, last in _day_runs(days)
+        ]))
+    elif horizon is not None:
+        existing_query = existing_query.filter(DailyUtilization.date >= horizon)
+    stale = {(row.date, row.robot_name): row for row in existing_query}
+    count = 0
+    changed_days: set[date] = set()
+    for (d, robot_key), ranges in by_day_robot.items():
+        day_start = datetime.combine(d, datetime.min.time())
+        day_end = datetime.combine(d, datetime.max.time())
+        merged = _merge_intervals(ranges)
+        total_seconds = 0.0
+        for start, end in merged:
+            if end is None or end <= start:
+                continue
+            clip_start = max(start, day_start)
+            clip_end = min(end, day_end)
+            if clip_end > clip_start:
+                total_seconds += (clip_end - clip_start).total_seconds()
+        total_hours = min(24.0, total_seconds / 3600.0)  # Sicherheitscap
+        available_hours = 24.0  # 24/7
+        utilization_percent = (total_hours / available_hours) * 100.0 if available_hours else 0.0
+        idle_hours = max(0.0, available_hours - total_hours)
+
+        existing = stale.pop((d, robot_key), None)
+        if existing:
+            if (existing.total_runtime_hours, existing.idle_hours, existing.utilization_percent) != (total_hours, idle_hours, utilization_percent):
+                changed_days.add(d)
+            existing.total_runtime_hours = total_hours
+            existing.idle_hours = idle_hours
+            existing.utilization_percent = utilization_percent
+        else:
+            changed_days.add(d)
+            db.add(DailyUtilization(
+                date=d,
+                robot_name=robot_key,
+                total_runtime_hours=total_hours,
+                idle_hours=idle_hours,
+                utilization_percent=utilization_percent,
+            ))
+        count += 1
+        if progress and count % 50 == 0:
+            progress(util_days=count)
+    for (d, _), row in stale.items():
+        db.delete(row)
+        changed_days.add(d)
+    db.flush()  # Sessions ohne Autoflush: nächster Aufruf in derselben Transaktion sieht die Zeilen
+    metrics.add_time("utilization_write", time.perf_counter() - t_write)
+    return count, changed_days
+
+
+def calculate_and_store(
+    progress: Callable[..., None] | None = None,
+    session_factory: Callable[[], Session] | None = None,
+    days: set[date] | None = None,
+) -> int:
+    """
+    Compute utilization per robot per day and upsert into daily_utilization. Returns rows updated.
+    progress(util_days=n) reports the number of (day, robot) rows computed so far.
+    session_factory: e.g. the staging generation (database.stage_generation); default SessionLocal.
+    days: only these days (e.g. the days a sync changed); default all days.
+    Days before the archive or retention horizon are left as they are (their jobs are no longer
+    complete in SQLite).
+    """
+    init_tables()
+    metrics = run_metrics.RunMetrics("recompute")
+    db = (session_factory or SessionLocal)()
+    try:
+        count, changed_days = rollup_utilization(db, days, utilization_horizon(db), progress, metrics)
+        if progress:
+            progress(util_days=count)
+        with metrics.span("commit"):
+            record_data_generation(db, "calculate_utilization", changed_days)
+            db.commit()
+        metrics.inc("util_rows", count)
+        metrics.inc("changed_days", len(changed_days))
+        summary = run_metrics.publish(metrics)
+        logger.info("Utilization: %d rows, phases %s", count, summary["phases"])
         return count
     except Exception:
         db.rollback()
+        run_metrics.publish(metrics, "failed")
         raise
     finally:
         db.close()
 
 
 if __name__ == "__main__":
-    n = calculate_and_store()
+    with stage_generation() as staging:
+        n = calculate_and_store(session_factory=staging)
     print(f"Updated {n} daily utilization rows.")
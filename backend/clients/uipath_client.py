@@ -3,7 +3,7 @@ UiPath Cloud Orchestrator API client: OAuth 2.0 + Jobs endpoint.
 """
 import logging
 from datetime import date, datetime
-from typing import Any
+from typing import Any, AsyncIterator, Callable
 
 import httpx
 
@@ -26,6 +26,29 @@ def _parse_iso(s: str | None) -> datetime | None:
     return None
 
 
+def parse_job(item: dict[str, Any]) -> dict[str, Any]:
+    """OData job item -> dict with job_key, robot_name, machine_name, process_name, start_time, end_time, state."""
+    robot = item.get("Robot") or {}
+    # HostMachineName = Host Name in Orchestrator (RPA-DONALD-001, RPA-MICKY-002)
+    machine_name = (
+        item.get("HostMachineName")
+        or robot.get("MachineName")
+        or ""
+    )
+    robot_name = robot.get("Name") or item.get("RuntimeType") or "Unknown"
+    start_dt = _parse_iso(item.get("StartTime"))
+    end_dt = _parse_iso(item.get("EndTime")) if item.get("EndTime") else None
+    return {
+        "job_key": str(item.get("Key", "")),
+        "robot_name": robot_name,
+        "machine_name": str(machine_name).strip(),
+        "process_name": item.get("ReleaseName") or "",
+        "start_time": start_dt,
+        "end_time": end_dt,
+        "state": item.get("State") or "",
+    }
+
+
 class UiPathClient:
     """Client for UiPath Automation Cloud Orchestrator API."""
 
@@ -84,14 +107,10 @@ class UiPathClient:
             logger.info("UiPath token refreshed")
             return self._token or ""
 
-    async def get_jobs(
-        self,
-        date_from: date,
-        date_to: date,
-    ) -> list[dict[str, Any]]:
+    async def iter_job_pages(self, date_from: date, date_to: date) -> AsyncIterator[list[dict[str, Any]]]:
         """
-        Fetch jobs from Orchestrator for the given date range.
-        Returns list of dicts with keys: job_key, robot_name, machine_name, process_name, start_time, end_time, state.
+        Raw OData job items for the given date range, one list per page, ordered by StartTime.
+        Parse them with parse_job(); the next page is requested only when the consumer asks for it.
         """
         token = await self.get_access_token()
         # OData filter: StartTime >= date_from and StartTime <= date_to
@@ -103,7 +122,6 @@ class UiPathClient:
             "&$orderby=StartTime asc"
             "&$expand=Robot"
         )
-        all_rows: list[dict[str, Any]] = []
         skip = 0
         top = 100
 
@@ -133,29 +151,28 @@ class UiPathClient:
                 value = data.get("value") or []
                 if not value:
                     break
-                for item in value:
-                    robot = item.get("Robot") or {}
-                    # HostMachineName = Host Name in Orchestrator (RPA-DONALD-001, RPA-MICKY-002)
-                    machine_name = (
-                        item.get("HostMachineName")
-                        or robot.get("MachineName")
-                        or ""
-                    )
-                    robot_name = robot.get("Name") or item.get("RuntimeType") or "Unknown"
-                    start_dt = _parse_iso(item.get("StartTime"))
-                    end_dt = _parse_iso(item.get("EndTime")) if item.get("EndTime") else None
-                    all_rows.append({
-                        "job_key": str(item.get("Key", "")),
-                        "robot_name": robot_name,
-                        "machine_name": str(machine_name).strip(),
-                        "process_name": item.get("ReleaseName") or "",
-                        "start_time": start_dt,
-                        "end_time": end_dt,
-                        "state": item.get("State") or "",
-                    })
+                yield value
                 skip += len(value)
                 if len(value) < top:
                     break
 
+    async def get_jobs(
+        self,
+        date_from: date,
+        date_to: date,
+        on_page: Callable[[int, int], None] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Fetch jobs from Orchestrator for the given date range.
+        Returns list of dicts with keys: job_key, robot_name, machine_name, process_name, start_time, end_time, state.
+        on_page(pages_fetched, rows_fetched) is called after every page (progress reporting).
+        """
+        all_rows: list[dict[str, Any]] = []
+        pages = 0
+        async for value in self.iter_job_pages(date_from, date_to):
+            all_rows.extend(parse_job(item) for item in value)
+            pages += 1
+            if on_page is not None:
+                on_page(pages, len(all_rows))
         logger.info("Fetched %d jobs from UiPath", len(all_rows))
         return all_rows
@@ -1,14 +1,50 @@
 """
 SQLite database setup and SQLAlchemy models for RPA performance data.
+
+Two engines per database file: the writer engine (sync, utilization) and the read
+engine (dashboard, API, caches) whose connections are query_only and pooled separately.
+Every SQLite connection gets the storage pragmas below on connect: WAL journal (readers and
+the one writer no longer block each other), synchronous=NORMAL (safe with WAL), a larger page
+cache, mmap reads and a busy timeout instead of immediate "database is locked" errors.
+
+Blue/green generations: a sync writes into a copy of the published file (stage_generation,
+sqlite backup API) and publishes it by atomically replacing the pointer file
+`<db>.current` next to DATABASE_URL. SessionLocal/ReadSessionLocal/get_engine/get_read_engine
+always resolve the pointer, so readers see either the old or the new generation, never a sync
+that has updated jobs but not yet daily_utilization. Writers of different processes (background
+sync, CLI sync/utilization/archive/retention) are serialized by an exclusive lock on `<db>.lock`,
+held from the copy until the pointer is switched; without it the last publisher would drop the
+other's changes. The previous file is kept for readers still running on it; only generations
+older than it are deleted (never the DATABASE_URL file). sync_runs (single-flight row, progress,
+heartbeat) is written while a generation is staged and therefore lives in its own file
+`<db stem>.runs<suffix>` that is never copied or swapped (RunsSessionLocal).
+
+Jobs are stored dictionary-encoded: robot, machine, robot_key, process and state are integer
+foreign keys into small dim_* tables (indexes and group-bys on integers, loaders map ids to
+categoricals). init_tables migrates a jobs table with the old name columns once.
 """
+import logging
 import os
+import sys
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable, Iterator
 
-from sqlalchemy import create_engine, Index
-from sqlalchemy.orm import declarative_base, sessionmaker, Session
+from sqlalchemy import create_engine, event, ForeignKey, Index, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.orm import column_property, declarative_base, Session
 from sqlalchemy import Column, Integer, String, DateTime, Float, Date, UniqueConstraint
 from sqlalchemy.sql import func
 
+logger = logging.getLogger(__name__)
+
 # Project root: parent of backend/
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
@@ -16,37 +52,316 @@ DATA_DIR.mkdir(exist_ok=True)
 DB_PATH = DATA_DIR / "rpa_performance.db"
 
 DATABASE_URL = os.getenv("DATABASE_URL") or f"sqlite:///{DB_PATH}"
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+_IS_SQLITE_FILE = IS_SQLITE and ":memory:" not in DATABASE_URL and DATABASE_URL not in ("sqlite://", "sqlite:///")
+
+# Storage-Pragmas (pro Verbindung); JOURNAL_MODE=DELETE nur zum Vergleich (benchmarks/)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL").upper()
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+WRITE_POOL_SIZE = 2
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=False,
+# Blue/Green: Basisdatei aus DATABASE_URL, Zeiger auf die veröffentlichte Generation daneben
+BASE_DB_PATH: Path | None = Path(make_url(DATABASE_URL).database).resolve() if _IS_SQLITE_FILE else None
+POINTER_PATH: Path | None = BASE_DB_PATH.with_name(BASE_DB_PATH.name + ".current") if BASE_DB_PATH else None
+LOCK_PATH: Path | None = BASE_DB_PATH.with_name(BASE_DB_PATH.name + ".lock") if BASE_DB_PATH else None
+RUNS_DB_PATH: Path | None = (
+    BASE_DB_PATH.with_name(f"{BASE_DB_PATH.stem}.runs{BASE_DB_PATH.suffix}") if BASE_DB_PATH else None
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+POINTER_CHECK_SECONDS = 0.5
+_GENERATION_FILE = (
+    re.compile(rf"^{re.escape(BASE_DB_PATH.stem)}\.(\d{{8}}-\d{{6}}(?:\d{{6}})?)-[0-9a-f]{{6}}{re.escape(BASE_DB_PATH.suffix)}$")
+    if BASE_DB_PATH else None
+)
+
+
+def _sqlite_pragmas(read_only: bool):
+    def on_connect(dbapi_conn: Any, _record: Any) -> None:
+        cur = dbapi_conn.cursor()
+        try:
+            cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            if not read_only:
+                # Beides persistent in der Datei; auto_vacuum greift nur bei neuen DBs (sonst einmal VACUUM,
+                # siehe retention_service) und muss vor journal_mode gesetzt werden
+                cur.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                cur.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            cur.execute("PRAGMA synchronous=NORMAL")
+            cur.execute(f"PRAGMA cache_size={-SQLITE_CACHE_SIZE_KB}")
+            cur.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+            cur.execute("PRAGMA temp_store=MEMORY")
+            if read_only:
+                cur.execute("PRAGMA query_only=ON")
+        finally:
+            cur.close()
+    return on_connect
+
+
+def _create_engine(url: str, read_only: bool) -> Engine:
+    if not IS_SQLITE:
+        return create_engine(url, echo=False)
+    kwargs: dict[str, Any] = {}
+    if _IS_SQLITE_FILE:
+        kwargs.update(
+            pool_size=READ_POOL_SIZE if read_only else WRITE_POOL_SIZE,
+            max_overflow=READ_POOL_SIZE if read_only else 4,
+            pool_timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+        )
+    eng = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000.0},
+        echo=False,
+        **kwargs,
+    )
+    event.listen(eng, "connect", _sqlite_pragmas(read_only))
+    return eng
+
+
+_engine_lock = threading.Lock()
+_engines: dict[tuple[str, bool], Engine] = {}
+_live: tuple[float, Path | None] = (0.0, None)  # (checked_at, path)
+_previous: Path | None = None
+
+
+def _url(path: Path | None) -> str:
+    return f"sqlite:///{path}" if path is not None else DATABASE_URL
+
+
+def _engine_for(url: str, read_only: bool) -> Engine:
+    key = (url, read_only and _IS_SQLITE_FILE)  # In-Memory: ein Engine für Lesen und Schreiben
+    with _engine_lock:
+        eng = _engines.get(key)
+        if eng is None:
+            eng = _engines[key] = _create_engine(url, read_only=key[1])
+        return eng
+
+
+def _retire_engines(keep: set[Path]) -> None:
+    """Dispose pools of generations other than `keep` (checked-out connections finish normally)."""
+    keep_urls = {_url(p) for p in keep}
+    with _engine_lock:
+        for key in [k for k in _engines if k[0] not in keep_urls]:
+            _engines.pop(key).dispose()
+
+
+def _set_live(path: Path) -> None:
+    global _live, _previous
+    old = _live[1]
+    _live = (time.monotonic(), path)
+    if old is not None and old != path:
+        _previous = old
+        _retire_engines({path, old})
+
+
+def live_db_path(fresh: bool = False) -> Path | None:
+    """
+    File of the published generation (pointer file, else the DATABASE_URL file); None if not a
+    SQLite file. The pointer is reread at most every POINTER_CHECK_SECONDS unless fresh=True.
+    """
+    if BASE_DB_PATH is None:
+        return None
+    checked_at, path = _live
+    if not fresh and path is not None and time.monotonic() - checked_at < POINTER_CHECK_SECONDS:
+        return path
+    try:
+        name = POINTER_PATH.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        name = ""
+    new_path = BASE_DB_PATH.with_name(name) if name else BASE_DB_PATH
+    _set_live(new_path)
+    return new_path
+
+
+def get_engine() -> Engine:
+    """Writer engine of the published generation."""
+    return _engine_for(_url(live_db_path()), read_only=False)
+
+
+def get_read_engine() -> Engine:
+    """Engine for read-only queries (dashboard, API, caches); query_only connections, own pool."""
+    return _engine_for(_url(live_db_path()), read_only=True)
+
+
+class _LiveSessionFactory:
+    """sessionmaker-like: each call returns a session on the currently published generation."""
+
+    def __init__(self, get_bind: Callable[[], Engine]) -> None:
+        self._get_bind = get_bind
+
+    def __call__(self, **kwargs: Any) -> Session:
+        return Session(bind=self._get_bind(), autoflush=False, **kwargs)
+
+
+def get_runs_engine() -> Engine:
+    """Writer engine of the sync_runs file (not part of the generations; DATABASE_URL if not a SQLite file)."""
+    return _engine_for(_url(RUNS_DB_PATH), read_only=False)
+
+
+class _StagingSessionFactory(_LiveSessionFactory):
+    """Session factory of a staging generation; collects callbacks to run once it is published."""
+
+    def __init__(self, get_bind: Callable[[], Engine]) -> None:
+        super().__init__(get_bind)
+        self.published_callbacks: list[Callable[[], None]] = []
+
+
+def after_publish(session_factory: Callable[..., Session] | None, callback: Callable[[], None]) -> None:
+    """
+    Run `callback` once the data written through session_factory is visible to readers: after
+    the pointer switch for a staging generation (skipped if staging fails), else immediately.
+    """
+    if isinstance(session_factory, _StagingSessionFactory):
+        session_factory.published_callbacks.append(callback)
+    else:
+        callback()
+
+
+SessionLocal = _LiveSessionFactory(get_engine)
+ReadSessionLocal = _LiveSessionFactory(get_read_engine)
+RunsSessionLocal = _LiveSessionFactory(get_runs_engine)
 Base = declarative_base()
+RunsBase = declarative_base()  # Tabellen in RUNS_DB_PATH
+
+
+class DimRobot(Base):
+    """Robot names (dimension of jobs.robot_id)."""
+    __tablename__ = "dim_robots"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(255), unique=True, nullable=False)
+
+
+class DimMachine(Base):
+    """Machine (host) names, trimmed (dimension of jobs.machine_id)."""
+    __tablename__ = "dim_machines"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(255), unique=True, nullable=False)
+
+
+class DimRobotKey(Base):
+    """robot_key values: machine name if set, else robot name (dimension of jobs.robot_key_id)."""
+    __tablename__ = "dim_robot_keys"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(255), unique=True, nullable=False)
+
+
+class DimProcess(Base):
+    """Process names (dimension of jobs.process_id)."""
+    __tablename__ = "dim_processes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(255), unique=True, nullable=False)
+
+
+class DimState(Base):
+    """Job states: Successful, Faulted, Stopped, ... (dimension of jobs.state_id)."""
+    __tablename__ = "dim_states"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(50), unique=True, nullable=False)
+
+
+def _dim_name(model: Any, fk: Column) -> Any:
+    return column_property(select(model.name).where(model.id == fk).correlate_except(model).scalar_subquery())
 
 
 class Job(Base):
-    """UiPath job record."""
+    """
+    UiPath job record. Robot, machine, robot_key, process and state are integer foreign keys into
+    the dim_* tables; the name attributes are read-only SQL expressions (usable in filters and
+    ORM reads). Writers set the ids via job_dimension_ids().
+    """
     __tablename__ = "jobs"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     job_key = Column(String(100), unique=True, nullable=False, index=True)
-    robot_name = Column(String(255), nullable=True)
-    machine_name = Column(String(255), nullable=True)
-    process_name = Column(String(255), nullable=True)
+    robot_id = Column(Integer, ForeignKey("dim_robots.id"), nullable=True)
+    machine_id = Column(Integer, ForeignKey("dim_machines.id"), nullable=True)
+    robot_key_id = Column(Integer, ForeignKey("dim_robot_keys.id"), nullable=False)
+    process_id = Column(Integer, ForeignKey("dim_processes.id"), nullable=True)
     start_time = Column(DateTime(timezone=True), nullable=False)
     end_time = Column(DateTime(timezone=True), nullable=True)
-    state = Column(String(50), nullable=True)  # Successful, Faulted, Stopped
+    state_id = Column(Integer, ForeignKey("dim_states.id"), nullable=True)  # Successful, Faulted, Stopped
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    robot_name = _dim_name(DimRobot, robot_id)
+    machine_name = _dim_name(DimMachine, machine_id)
+    robot_key = _dim_name(DimRobotKey, robot_key_id)
+    process_name = _dim_name(DimProcess, process_id)
+    state = _dim_name(DimState, state_id)
+
     __table_args__ = (
         Index("idx_job_start_time", "start_time"),
-        Index("idx_job_robot", "robot_name"),
-        Index("idx_job_process", "process_name"),
+        Index("idx_job_robot", "robot_key_id"),
+        Index("idx_job_process", "process_id"),
     )
 
 
+# Job-Spalte -> Dimension (Name des Attributs am Job, Tabelle)
+JOB_DIMENSIONS = {
+    "robot_id": ("robot_name", DimRobot),
+    "machine_id": ("machine_name", DimMachine),
+    "robot_key_id": ("robot_key", DimRobotKey),
+    "process_id": ("process_name", DimProcess),
+    "state_id": ("state", DimState),
+}
+
+
+def robot_key_for(robot_name: str | None, machine_name: str | None) -> str:
+    """Robot key of a job: the host (machine name) if set, else the robot name."""
+    machine = (machine_name or "").strip()
+    if machine:
+        return machine
+    return robot_name if robot_name is not None else "Unknown"
+
+
+def _dimension_id(db: Session, model: Any, name: str | None) -> int | None:
+    if name is None:
+        return None
+    ids = db.info.get(model.__tablename__)
+    if ids is None:
+        ids = db.info[model.__tablename__] = dict(db.execute(select(model.name, model.id)).all())
+    dim_id = ids.get(name)
+    if dim_id is None:
+        row = model(name=name)
+        db.add(row)
+        db.flush()
+        dim_id = ids[name] = row.id
+    return dim_id
+
+
+def job_dimension_ids(
+    db: Session,
+    robot_name: str | None,
+    machine_name: str | None,
+    process_name: str | None,
+    state: str | None,
+) -> dict[str, int | None]:
+    """
+    Foreign keys for a job row ({robot_id, machine_id, robot_key_id, process_id, state_id}); new
+    names are inserted into the dimension tables. The name -> id maps are cached on the session.
+    """
+    machine = (machine_name or "").strip() or None
+    names = {
+        "robot_id": robot_name,
+        "machine_id": machine,
+        "robot_key_id": robot_key_for(robot_name, machine),
+        "process_id": process_name,
+        "state_id": state,
+    }
+    return {col: _dimension_id(db, JOB_DIMENSIONS[col][1], name) for col, name in names.items()}
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_dimension_ids(db: Session) -> None:
+    # Zurückgerollte Dimensionszeilen dürfen nicht im Cache bleiben
+    for _, model in JOB_DIMENSIONS.values():
+        db.info.pop(model.__tablename__, None)
+
+
 class DailyUtilization(Base):
     """Daily utilization per robot (24/7 basis)."""
     __tablename__ = "daily_utilization"
@@ -64,6 +379,122 @@ class DailyUtilization(Base):
     )
 
 
+class ProcessRuntimeState(Base):
+    """Incremental detector state per process (EWMA reference + CUSUM), see regression_service."""
+    __tablename__ = "process_runtime_state"
+
+    process_name = Column(String(255), primary_key=True)
+    n_runs = Column(Integer, default=0)
+    ref_duration_mean = Column(Float, default=0.0)  # Sekunden
+    ref_duration_var = Column(Float, default=0.0)
+    recent_duration = Column(Float, default=0.0)
+    cusum_duration = Column(Float, default=0.0)
+    ref_fail_rate = Column(Float, default=0.0)
+    recent_fail_rate = Column(Float, default=0.0)
+    cusum_fail = Column(Float, default=0.0)
+    last_end_time = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ProcessRegressionFlag(Base):
+    """Detected runtime slowdown or failure-rate spike of a process."""
+    __tablename__ = "process_regression_flags"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    process_name = Column(String(255), nullable=False)
+    kind = Column(String(20), nullable=False)  # slowdown, failure_rate
+    detected_at = Column(DateTime(timezone=True), nullable=False)  # Endzeit des auslösenden Jobs
+    job_key = Column(String(100), nullable=True)
+    baseline_value = Column(Float, nullable=False)
+    current_value = Column(Float, nullable=False)
+    change_percent = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_regression_detected_at", "detected_at"),
+    )
+
+
+class DataGeneration(Base):
+    """One row per committed data change (sync/recompute): which days were touched. Used for cache invalidation."""
+    __tablename__ = "data_generations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String(50), nullable=False)  # sync_jobs, calculate_utilization, ...
+    day_from = Column(Date, nullable=False)
+    day_to = Column(Date, nullable=False)
+    n_changed = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SyncRunRecord(RunsBase):
+    """Background sync run (cross-process single-flight lock + progress), see sync_runner."""
+    __tablename__ = "sync_runs"
+
+    id = Column(String(32), primary_key=True)
+    owner = Column(String(100), nullable=False)  # host:pid des ausführenden Prozesses
+    days = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False)  # running, done, failed
+    phase = Column(String(20), nullable=True)
+    pages = Column(Integer, default=0)
+    rows_fetched = Column(Integer, default=0)
+    rows_upserted = Column(Integer, default=0)
+    util_days = Column(Integer, default=0)
+    n_jobs = Column(Integer, nullable=True)
+    n_util = Column(Integer, nullable=True)
+    error = Column(String(500), nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    heartbeat_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_sync_runs_status", "status", "heartbeat_at"),
+    )
+
+
+class DailyProcessStats(Base):
+    """Daily rollup per process and robot (by job start day); keeps process trends after raw jobs are purged."""
+    __tablename__ = "daily_process_stats"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    date = Column(Date, nullable=False)
+    process_name = Column(String(255), nullable=False)
+    robot_key = Column(String(255), nullable=False)
+    runs = Column(Integer, default=0)
+    successful = Column(Integer, default=0)
+    faulted = Column(Integer, default=0)
+    total_runtime_minutes = Column(Float, default=0.0)
+    max_runtime_minutes = Column(Float, default=0.0)
+
+    __table_args__ = (
+        UniqueConstraint("date", "process_name", "robot_key", name="uq_daily_process_stats"),
+    )
+
+
+class RetentionRun(Base):
+    """One retention run: raw-job horizon, purged rows per table and reclaimed space (see retention_service)."""
+    __tablename__ = "retention_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_at = Column(DateTime, nullable=False)
+    jobs_horizon = Column(Date, nullable=True)  # Rohdaten-Jobs vor diesem Tag gelöscht
+    rolled_up_days = Column(Integer, default=0)
+    deleted_jobs = Column(Integer, default=0)
+    deleted_other = Column(Integer, default=0)  # sync_runs, data_generations, Regression-Flags, Utilization
+    bytes_before = Column(Integer, nullable=True)
+    bytes_after = Column(Integer, nullable=True)
+
+
+def record_data_generation(db: Session, source: str, changed_days: set) -> int | None:
+    """Add a DataGeneration row for the changed days (caller commits). Returns None if nothing changed."""
+    if not changed_days:
+        return None
+    gen = DataGeneration(source=source, day_from=min(changed_days), day_to=max(changed_days), n_changed=len(changed_days))
+    db.add(gen)
+    db.flush()
+    return gen.id
+
+
 def get_db() -> Session:
     """Yield a DB session; close after use."""
     db = SessionLocal()
@@ -73,6 +504,188 @@ def get_db() -> Session:
         db.close()
 
 
-def init_tables() -> None:
-    """Create all tables and indexes if they do not exist."""
-    Base.metadata.create_all(bind=engine)
+def _migrate_job_dimensions(bind: Engine) -> None:
+    """
+    One-time migration of a jobs table with name columns (robot_name, machine_name, process_name,
+    state) to dimension ids: fill the dim_* tables, rebuild jobs, all in one transaction.
+    """
+    if bind.dialect.name != "sqlite":
+        return
+    with bind.connect() as conn:
+        columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(jobs)")}
+    if "robot_name" not in columns:
+        return
+    def robot_key(t: str) -> str:
+        return (
+            f"CASE WHEN TRIM(COALESCE({t}machine_name, '')) <> '' THEN TRIM({t}machine_name) "
+            f"ELSE COALESCE({t}robot_name, 'Unknown') END"
+        )
+
+    ddl = [str(CreateTable(Job.__table__).compile(bind)).strip()]
+    ddl += [str(CreateIndex(ix).compile(bind)).strip() for ix in Job.__table__.indexes]
+    script = ";\n".join([
+        "BEGIN IMMEDIATE",
+        "DROP INDEX IF EXISTS idx_job_start_time",
+        "DROP INDEX IF EXISTS idx_job_robot",
+        "DROP INDEX IF EXISTS idx_job_process",
+        "DROP INDEX IF EXISTS ix_jobs_job_key",
+        "ALTER TABLE jobs RENAME TO jobs_legacy",
+        *ddl,
+        "INSERT OR IGNORE INTO dim_robots (name) SELECT DISTINCT robot_name FROM jobs_legacy WHERE robot_name IS NOT NULL",
+        "INSERT OR IGNORE INTO dim_machines (name) SELECT DISTINCT TRIM(machine_name) FROM jobs_legacy "
+        "WHERE TRIM(COALESCE(machine_name, '')) <> ''",
+        f"INSERT OR IGNORE INTO dim_robot_keys (name) SELECT DISTINCT {robot_key('')} FROM jobs_legacy",
+        "INSERT OR IGNORE INTO dim_processes (name) SELECT DISTINCT process_name FROM jobs_legacy WHERE process_name IS NOT NULL",
+        "INSERT OR IGNORE INTO dim_states (name) SELECT DISTINCT state FROM jobs_legacy WHERE state IS NOT NULL",
+        "INSERT INTO jobs (id, job_key, robot_id, machine_id, robot_key_id, process_id, start_time, end_time, state_id, created_at) "
+        "SELECT j.id, j.job_key, r.id, m.id, k.id, p.id, j.start_time, j.end_time, s.id, j.created_at FROM jobs_legacy j "
+        "LEFT JOIN dim_robots r ON r.name = j.robot_name "
+        "LEFT JOIN dim_machines m ON m.name = TRIM(j.machine_name) "
+        f"JOIN dim_robot_keys k ON k.name = {robot_key('j.')} "
+        "LEFT JOIN dim_processes p ON p.name = j.process_name "
+        "LEFT JOIN dim_states s ON s.name = j.state",
+        "DROP TABLE jobs_legacy",
+        "COMMIT",
+    ]) + ";"
+    raw = bind.raw_connection()
+    try:
+        # executescript statt SQLAlchemy-Transaktion: DDL und Daten atomar in einem BEGIN ... COMMIT
+        raw.driver_connection.executescript(script)
+    except Exception:
+        raw.driver_connection.rollback()
+        raise
+    finally:
+        raw.close()
+    logger.info("Migrated jobs to dimension tables")
+
+
+def init_tables(bind: Engine | None = None) -> None:
+    """Create all tables and indexes if they do not exist (default: published generation and sync_runs file)."""
+    if bind is None:
+        RunsBase.metadata.create_all(bind=get_runs_engine())
+    bind = bind or get_engine()
+    Base.metadata.create_all(bind=bind)
+    _migrate_job_dimensions(bind)
+
+
+def release_space(db: Session) -> str:
+    """Incremental vacuum; converts a DB without auto_vacuum once with a full VACUUM."""
+    db.commit()
+    with db.get_bind().connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+            return "vacuum"
+        conn.exec_driver_sql("PRAGMA incremental_vacuum")
+        return "incremental_vacuum"
+
+
+def _remove_db_file(path: Path) -> None:
+    for p in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm")):
+        try:
+            p.unlink(missing_ok=True)
+        except OSError:  # z. B. Windows: Datei noch geöffnet – beim nächsten Publish erneut
+            logger.debug("Could not remove %s", p)
+
+
+def _cleanup_generations(previous: Path) -> None:
+    """
+    Delete generation files older than `previous`, the generation just replaced. Newer files
+    (another process's staging copy) and the DATABASE_URL file are never touched.
+    """
+    current = _GENERATION_FILE.match(previous.name)
+    if current is None:  # bisher lief die Basisdatei: es gibt keine ältere Generation
+        return
+    for path in BASE_DB_PATH.parent.iterdir():
+        m = _GENERATION_FILE.match(path.name)
+        if m is not None and m.group(1) < current.group(1):
+            _remove_db_file(path)
+
+
+_writer_thread_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: Path, what: str = "lock") -> Iterator[None]:
+    """Exclusive lock on `path` across processes (flock / msvcrt.locking); waits until free."""
+    with open(path, "a+b") as f:
+        if sys.platform == "win32":
+            import msvcrt
+
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # versucht es selbst 10 s lang
+                    break
+                except OSError:
+                    logger.info("Waiting for %s %s", what, path)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info("Waiting for %s %s", what, path)
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def _writer_lock() -> Iterator[None]:
+    """Exclusive lock on LOCK_PATH across processes and threads; waits until free."""
+    with _writer_thread_lock, file_lock(LOCK_PATH, "database writer lock"):
+        yield
+
+
+@contextmanager
+def stage_generation() -> Iterator[Callable[..., Session]]:
+    """
+    Yield a session factory on a staging copy of the published database. If the block succeeds,
+    the copy is published by switching the pointer file; on error it is deleted and readers
+    never see it. The writer lock is held from the copy until the switch: a second writer waits
+    and then copies the generation published here. Without a SQLite file DB the live database
+    is written directly.
+    """
+    if BASE_DB_PATH is None:
+        yield SessionLocal
+        return
+    with _writer_lock():
+        init_tables()
+        live = live_db_path(fresh=True)  # ein anderer Prozess kann gerade veröffentlicht haben
+        staging = BASE_DB_PATH.with_name(
+            f"{BASE_DB_PATH.stem}.{datetime.now():%Y%m%d-%H%M%S%f}-{uuid.uuid4().hex[:6]}{BASE_DB_PATH.suffix}"
+        )
+        # Online-Backup: konsistente Kopie inkl. WAL-Inhalt, Leser laufen weiter
+        with closing(sqlite3.connect(live)) as src, closing(sqlite3.connect(staging)) as dst:
+            src.backup(dst)
+        staging_engine = _engine_for(_url(staging), read_only=False)
+        try:
+            init_tables(staging_engine)
+            factory = _StagingSessionFactory(lambda: staging_engine)
+            yield factory
+            with staging_engine.connect() as conn:
+                conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        except BaseException:
+            _retire_engines({live} | ({_previous} if _previous else set()))
+            _remove_db_file(staging)
+            raise
+        tmp = POINTER_PATH.with_name(f".{POINTER_PATH.name}.{os.getpid()}.tmp")
+        tmp.write_text(staging.name, encoding="utf-8")
+        os.replace(tmp, POINTER_PATH)
+        _set_live(staging)
+        _cleanup_generations(live)
+        logger.info("Published database generation %s", staging.name)
+        for callback in factory.published_callbacks:
+            try:
+                callback()
+            except Exception:  # die Generation ist bereits veröffentlicht
+                logger.exception("Callback after publishing %s failed", staging.name)
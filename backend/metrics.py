@@ -0,0 +1,248 @@
+"""
+Phase timings, counters and latency histograms for sync and recompute runs.
+
+A run collects into a RunMetrics: span("upsert") adds the busy time of a phase (pipeline stages
+overlap, so the phases can add up to more than the wall time), inc() counts rows, observe() records
+samples such as the latency of every OData page. publish() turns the run into its JSON summary
+(returned by sync_jobs.run_sync) and folds it into totals rendered in the Prometheus text format
+to METRICS_FILE (default data/metrics.prom, empty = off; textfile collector of node_exporter or
+GET /metrics of backend.api, which serves the file, since syncs run in the dashboard or CLI
+process). The totals span all processes: under a file lock (<METRICS_FILE>.lock) publish()
+reads the persisted totals of every kind (<METRICS_FILE>.json), adds the run and writes both
+files back, so counters keep growing across CLI runs and one kind never drops another's metrics.
+Without METRICS_FILE the totals are those of this process.
+
+  rpa_<kind>_runs_total{status}            runs per outcome (ok, failed)
+  rpa_<kind>_phase_seconds_total{phase}    busy time per phase
+  rpa_<kind>_<counter>_total               e.g. rpa_sync_rows_total{result="inserted"}
+  rpa_<kind>_<sample>_seconds              histogram, e.g. rpa_sync_page_latency_seconds
+  rpa_<kind>_last_run_*                    duration and end time of the last run
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from backend.database import DATA_DIR, file_lock
+
+logger = logging.getLogger(__name__)
+
+_metrics_file = os.getenv("METRICS_FILE", str(DATA_DIR / "metrics.prom"))
+METRICS_FILE: Path | None = Path(_metrics_file) if _metrics_file else None  # leer = keine Datei
+STATE_FILE: Path | None = METRICS_FILE.with_name(METRICS_FILE.name + ".json") if METRICS_FILE else None
+LOCK_FILE: Path | None = METRICS_FILE.with_name(METRICS_FILE.name + ".lock") if METRICS_FILE else None
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # Sekunden
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 4) if value is not None else None
+
+
+def _nested(counters: dict[str, int]) -> dict[str, Any]:
+    """{'rows{result="inserted"}': 5, 'pages': 2} -> {"rows": {"inserted": 5}, "pages": 2}"""
+    out: dict[str, Any] = {}
+    for key, n in counters.items():
+        base, labels = _metric(key)
+        if labels:
+            out.setdefault(base, {})[labels.split('"')[1]] = n
+        else:
+            out[base] = n
+    return out
+
+
+class RunMetrics:
+    """Metrics of one run. Thread-safe: the sync's writer thread reports into the same object."""
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases: dict[str, float] = defaultdict(float)
+        self.counters: dict[str, int] = defaultdict(int)  # "rows{result=inserted}" -> n
+        self.samples: dict[str, list[float]] = defaultdict(list)
+
+    @contextmanager
+    def span(self, phase: str) -> Iterator[None]:
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - t)
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] += seconds
+
+    def inc(self, counter: str, n: int = 1, **labels: str) -> None:
+        key = counter + ("{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}" if labels else "")
+        with self._lock:
+            self.counters[key] += n
+
+    def observe(self, sample: str, value: float) -> None:
+        with self._lock:
+            self.samples[sample].append(value)
+
+    def summary(self) -> dict[str, Any]:
+        """JSON-ready summary: wall time, busy seconds per phase, counters, sample statistics."""
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "seconds": round(time.perf_counter() - self._t0, 3),
+                "phases": {p: round(s, 3) for p, s in self.phases.items()},
+                "counters": _nested(self.counters),
+                "histograms": {
+                    name: {
+                        "count": len(values),
+                        "sum": round(sum(values), 3),
+                        "p50": _round(_percentile(values, 0.50)),
+                        "p95": _round(_percentile(values, 0.95)),
+                        "max": _round(max(values) if values else None),
+                    }
+                    for name, values in self.samples.items()
+                },
+            }
+
+
+_lock = threading.Lock()
+_totals: dict[str, dict[str, Any]] = {}  # kind -> aufsummierte Werte aller Läufe dieses Prozesses
+
+
+def _kind_totals(totals: dict[str, dict[str, Any]], kind: str) -> dict[str, Any]:
+    return totals.setdefault(kind, {
+        "runs": defaultdict(int),
+        "phases": defaultdict(float),
+        "counters": defaultdict(int),
+        "histograms": {},
+        "last_seconds": 0.0,
+        "last_end": 0.0,
+    })
+
+
+def _add_run(totals: dict[str, dict[str, Any]], run: RunMetrics, status: str, seconds: float) -> None:
+    kind = _kind_totals(totals, run.kind)
+    kind["runs"][status] += 1
+    for phase, secs in run.phases.items():
+        kind["phases"][phase] += secs
+    for key, n in run.counters.items():
+        kind["counters"][key] += n
+    for name, values in run.samples.items():
+        hist = kind["histograms"].get(name)
+        if hist is None or len(hist["buckets"]) != len(BUCKETS):  # neue BUCKETS: Histogramm neu beginnen
+            hist = kind["histograms"][name] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for v in values:
+            for i, bound in enumerate(BUCKETS):
+                if v <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += v
+            hist["count"] += 1
+    kind["last_seconds"] = seconds
+    kind["last_end"] = time.time()
+
+
+def _load_state() -> dict[str, dict[str, Any]]:
+    """Persisted totals of all processes (empty if STATE_FILE is missing or unreadable)."""
+    try:
+        data = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.warning("Metrics state %s unreadable, starting new totals", STATE_FILE, exc_info=True)
+        return {}
+    totals: dict[str, dict[str, Any]] = {}
+    for kind, saved in data.items():
+        t = _kind_totals(totals, kind)
+        t["runs"].update(saved.get("runs", {}))
+        t["phases"].update(saved.get("phases", {}))
+        t["counters"].update(saved.get("counters", {}))
+        t["histograms"] = saved.get("histograms", {})
+        t["last_seconds"] = saved.get("last_seconds", 0.0)
+        t["last_end"] = saved.get("last_end", 0.0)
+    return totals
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")  # je Prozess eigene Temp-Datei
+    try:
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)  # atomar, der Collector liest nie eine halbe Datei
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def publish(run: RunMetrics, status: str = "ok") -> dict[str, Any]:
+    """Add `run` to the totals, rewrite METRICS_FILE and return the run's JSON summary."""
+    summary = run.summary()
+    summary["status"] = status
+    with _lock:
+        _add_run(_totals, run, status, summary["seconds"])
+        if METRICS_FILE is None:
+            return summary
+        try:
+            METRICS_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with file_lock(LOCK_FILE, "metrics lock"):
+                totals = _load_state()
+                _add_run(totals, run, status, summary["seconds"])
+                _write_atomic(STATE_FILE, json.dumps(totals, sort_keys=True))
+                _write_atomic(METRICS_FILE, render(totals))
+        except OSError:
+            logger.warning("Metrics file %s not written", METRICS_FILE, exc_info=True)
+    return summary
+
+
+def _metric(name: str) -> tuple[str, str]:
+    """'rows{result="inserted"}' -> ('rows', '{result="inserted"}')"""
+    base, _, labels = name.partition("{")
+    return base, "{" + labels if labels else ""
+
+
+def render(all_totals: dict[str, dict[str, Any]] | None = None) -> str:
+    """Totals (default: this process) in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for kind, totals in sorted((_totals if all_totals is None else all_totals).items()):
+        prefix = f"rpa_{kind}"
+        lines += [f"# HELP {prefix}_runs_total Runs by outcome.", f"# TYPE {prefix}_runs_total counter"]
+        lines += [f'{prefix}_runs_total{{status="{s}"}} {n}' for s, n in sorted(totals["runs"].items())]
+        lines += [f"# HELP {prefix}_phase_seconds_total Busy time per phase.", f"# TYPE {prefix}_phase_seconds_total counter"]
+        lines += [f'{prefix}_phase_seconds_total{{phase="{p}"}} {s:.6f}' for p, s in sorted(totals["phases"].items())]
+        by_base: dict[str, list[tuple[str, int]]] = defaultdict(list)
+        for key, n in sorted(totals["counters"].items()):
+            base, labels = _metric(key)
+            by_base[base].append((labels, n))
+        for base, values in by_base.items():
+            lines.append(f"# TYPE {prefix}_{base}_total counter")
+            lines += [f"{prefix}_{base}_total{labels} {n}" for labels, n in values]
+        for name, hist in sorted(totals["histograms"].items()):
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            lines += [f'{metric}_bucket{{le="{bound}"}} {n}' for bound, n in zip(BUCKETS, hist["buckets"])]
+            lines += [f'{metric}_bucket{{le="+Inf"}} {hist["count"]}', f"{metric}_sum {hist['sum']:.6f}", f"{metric}_count {hist['count']}"]
+        lines += [
+            f"# TYPE {prefix}_last_run_seconds gauge", f"{prefix}_last_run_seconds {totals['last_seconds']:.3f}",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge", f"{prefix}_last_run_timestamp_seconds {totals['last_end']:.0f}",
+        ]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def exposition() -> str:
+    """Text for GET /metrics: METRICS_FILE if present (written by the syncing process), else this process."""
+    if METRICS_FILE is not None and METRICS_FILE.exists():
+        return METRICS_FILE.read_text(encoding="utf-8")
+    with _lock:
+        return render()
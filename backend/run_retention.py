@@ -0,0 +1,42 @@
+"""
+Retention: Roh-Jobs älter als N Tage löschen (vorher je Tag/Prozess/Robot in daily_process_stats
+verdichtet), alte sync_runs/data_generations/Regression-Flags aufräumen, Platz per incremental
+vacuum freigeben und das Ergebnis ausgeben. Richtlinien siehe backend/services/retention_service.py.
+Run: python -m backend.run_retention [days]   (Standard: RETENTION_JOBS_DAYS oder 180)
+"""
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.database import init_tables, stage_generation
+from backend.services import retention_service
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    days = retention_service.default_policy()["jobs"] or retention_service.DEFAULT_JOBS_DAYS
+    if len(sys.argv) > 1:
+        try:
+            days = int(sys.argv[1])
+        except ValueError:
+            pass
+    init_tables()
+    with stage_generation() as staging:
+        report = retention_service.apply_retention(retention_service.default_policy(jobs_days=days), session_factory=staging)
+    if not days or report["horizon"] is None:
+        print("Roh-Jobs: nichts entfernt (unbegrenzt aufbewahren).")
+    else:
+        print(f"Roh-Jobs vor {report['horizon']:%d.%m.%Y} entfernt, {report['rolled_up_days']} Tage verdichtet.")
+    for table, n in report["deleted"].items():
+        print(f"  {table}: {n} Zeilen gelöscht")
+    print(f"DB: {_mb(report['bytes_before'])} → {_mb(report['bytes_after'])} ({_mb(report['bytes_reclaimed'])} freigegeben, {report['vacuum'] or 'kein vacuum'})")
+
+
+if __name__ == "__main__":
+    main()
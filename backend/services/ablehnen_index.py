@@ -0,0 +1,209 @@
+"""
+Incremental ingestion of the Ablehnen exports (Claude Input/Ablehnen_Analyse/erledigt/*.csv).
+
+data/ablehnen_index.json maps every CSV (name → size, mtime_ns, sha1) to its per-day counts.
+Only new or changed files are parsed (a file whose content hash is unchanged is not re-parsed
+after a touch); timestamps are parsed vectorized with pd.to_datetime(format=...), files in
+parallel. Files that cannot be read are left out of the index (not cached as empty), so the
+next build retries them. The index is written atomically (tmp + os.replace), as is the summary CSV.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+ERLEDIGT_DIR = ROOT / "Claude Input" / "Ablehnen_Analyse" / "erledigt"
+INDEX_PATH = ROOT / "data" / "ablehnen_index.json"
+SUMMARY_CSV = ROOT / "data" / "ablehnen_messstellen_summary.csv"
+INDEX_VERSION = 2  # v1 konnte Lesefehler als leere Zählung enthalten
+TS_FORMAT = "%d.%m.%Y %H:%M:%S"
+TS_COLUMNS = ["RPA_Timestemp", "RPA_Timestemp ", "RPA_Timestamp"]
+MAX_WORKERS = 4
+_RE_DATES = re.compile(r"(\d{8})")
+
+_summary_cache: dict[Path, tuple[tuple[int, int], pd.DataFrame]] = {}
+
+
+def _read_csv(path: Path) -> pd.DataFrame | None:
+    for encoding in ("utf-8", "latin-1"):
+        try:
+            return pd.read_csv(path, sep=";", encoding=encoding, on_bad_lines="skip")
+        except Exception:
+            continue
+    return None
+
+
+def _file_date(path: Path) -> date | None:
+    """Letztes JJJJMMTT im Dateinamen (Fallback für Zeilen ohne gültigen Zeitstempel)."""
+    matches = _RE_DATES.findall(path.stem)
+    if not matches:
+        return None
+    try:
+        return datetime.strptime(matches[-1], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def parse_file(path: Path) -> dict[str, int] | None:
+    """
+    Per-day counts (ISO date → rows) of one export: timestamp column, else date from file name.
+    None if the file cannot be read.
+    """
+    df = _read_csv(path)
+    if df is None:
+        return None
+    if df.empty:
+        return {}
+    file_date = _file_date(path)
+    col_ts = next((c for c in TS_COLUMNS if c in df.columns), None)
+    if col_ts is None:
+        col_ts = next((c for c in df.columns if "timestemp" in c.lower() or "timestamp" in c.lower()), None)
+    if col_ts is None:
+        return {file_date.isoformat(): int(len(df))} if file_date is not None else {}
+    raw = df[col_ts]
+    text = raw.astype(str).str.strip()
+    parsed = pd.to_datetime(text.str[:19].where(raw.notna() & (text != "")), format=TS_FORMAT, errors="coerce")
+    days = parsed.dt.date
+    if file_date is not None:
+        # Leere oder ungültige Zeitstempel zählen zum Datum aus dem Dateinamen
+        days = days.where(parsed.notna(), file_date)
+    counts = days.dropna().value_counts()
+    return {d.isoformat(): int(n) for d, n in counts.items()}
+
+
+def _sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_atomic(path: Path, write: Any) -> None:
+    """write(tmp_path) then os.replace – readers never see a half-written file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def load_index(index_path: Path = INDEX_PATH) -> dict[str, Any]:
+    try:
+        data = json.loads(index_path.read_text(encoding="utf-8"))
+        if data.get("version") == INDEX_VERSION:
+            return data
+    except (OSError, ValueError):
+        pass
+    return {"version": INDEX_VERSION, "files": {}}
+
+
+def update_index(
+    erledigt_dir: Path = ERLEDIGT_DIR,
+    index_path: Path = INDEX_PATH,
+    workers: int | None = None,
+    persist: bool = True,
+) -> tuple[dict[str, Any], dict[str, int]]:
+    """
+    Bring the index up to date with erledigt_dir. Returns (index, stats) with stats
+    {"files", "parsed", "unchanged", "removed", "failed"}; failed files are not indexed.
+    persist=False keeps it in memory only.
+    """
+    index = load_index(index_path)
+    old_files: dict[str, Any] = index["files"]
+    files: dict[str, Any] = {}
+    to_parse: list[tuple[Path, dict[str, Any]]] = []
+    failed: list[str] = []
+    for path in sorted(erledigt_dir.glob("*.csv")):
+        try:
+            st = path.stat()
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            old = old_files.get(path.name)
+            if old and old["size"] == entry["size"] and old["mtime_ns"] == entry["mtime_ns"]:
+                files[path.name] = old
+                continue
+            entry["sha1"] = _sha1(path)
+        except OSError:
+            failed.append(path.name)
+            continue
+        if old and old.get("sha1") == entry["sha1"]:
+            files[path.name] = {**old, **entry}
+            continue
+        to_parse.append((path, entry))
+    if to_parse:
+        n_workers = max(1, min(workers or MAX_WORKERS, len(to_parse)))
+        if n_workers == 1:
+            results = [parse_file(p) for p, _ in to_parse]
+        else:
+            with ThreadPoolExecutor(max_workers=n_workers) as pool:
+                results = list(pool.map(parse_file, [p for p, _ in to_parse]))
+        for (path, entry), counts in zip(to_parse, results):
+            if counts is None:
+                failed.append(path.name)  # nicht indexieren, der nächste Lauf liest die Datei erneut
+                continue
+            files[path.name] = {**entry, "counts": counts}
+    if failed:
+        logger.warning("Ablehnen-Exporte nicht lesbar, beim nächsten Lauf erneut: %s", ", ".join(sorted(failed)))
+    parsed = sum(1 for path, _ in to_parse if path.name in files)
+    stats = {
+        "files": len(files),
+        "parsed": parsed,
+        "unchanged": len(files) - parsed,
+        "removed": len(set(old_files) - set(files) - set(failed)),
+        "failed": len(failed),
+    }
+    index = {"version": INDEX_VERSION, "files": files}
+    if persist and files != old_files:
+        try:
+            _write_atomic(index_path, lambda tmp: tmp.write_text(json.dumps(index, indent=1, sort_keys=True), encoding="utf-8"))
+        except OSError:
+            logger.warning("Ablehnen-Index konnte nicht geschrieben werden: %s", index_path, exc_info=True)
+    return index, stats
+
+
+def per_day_counts(index: dict[str, Any]) -> pd.DataFrame:
+    """Summed counts over all indexed files: DataFrame[date, n] sorted by date."""
+    totals: dict[str, int] = {}
+    for entry in index["files"].values():
+        for d, n in entry.get("counts", {}).items():
+            totals[d] = totals.get(d, 0) + n
+    if not totals:
+        return pd.DataFrame(columns=["date", "n"])
+    df = pd.DataFrame({"date": [date.fromisoformat(d) for d in totals], "n": list(totals.values())})
+    return df.sort_values("date").reset_index(drop=True)
+
+
+def write_summary(df: pd.DataFrame, path: Path = SUMMARY_CSV) -> None:
+    _write_atomic(path, lambda tmp: df.to_csv(tmp, index=False))
+
+
+def load_summary(path: Path = SUMMARY_CSV) -> pd.DataFrame | None:
+    """Summary CSV as DataFrame[date, n]; cached per (size, mtime) so reruns do not re-read it."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    key = (st.st_size, st.st_mtime_ns)
+    cached = _summary_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    df = pd.read_csv(path)
+    if df.empty or "date" not in df.columns or "n" not in df.columns:
+        return None
+    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
+    df = df.dropna(subset=["date", "n"]).sort_values("date").reset_index(drop=True)
+    _summary_cache[path] = (key, df)
+    return df
@@ -0,0 +1,264 @@
+"""
+Dashboard aggregates shared by the Streamlit app and backend.api.
+
+Everything goes through the job range cache (jobs), daily_utilization (rollup) and the shared
+result cache, so the dashboard and API clients reuse each other's results within one data
+generation. On first use the caches are seeded from the cold-start snapshot (backend.snapshot),
+so a fresh process renders the default ranges without touching the jobs table.
+"""
+import json
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from typing import Any
+
+import pandas as pd
+from sqlalchemy import exists
+
+import backend.cache as shared_cache
+from backend.database import Job, ReadSessionLocal
+from backend.services.job_loader import JobRangeCache, load_utilization_frame
+from backend.services.job_query import JobFilter, query_jobs
+
+logger = logging.getLogger(__name__)
+
+EUR_PER_IDLE_HOUR = 50.0
+TRENDS_DAYS = 90
+QUICKWINS_DAYS = 7
+
+# Optional: map robot_key / Host name to display names (Donald, Mickey); nur diese Roboter werden angezeigt
+ROBOT_NAME_MAP: dict[str, str] = {
+    "RPA-DONALD-001": "Donald",
+    "RPA-MICKY-002": "Mickey",
+    "RPA-MICKEY-002": "Mickey",
+}
+_raw = os.getenv("ROBOT_NAME_MAP")
+if _raw:
+    try:
+        ROBOT_NAME_MAP = {**ROBOT_NAME_MAP, **json.loads(_raw)}
+    except json.JSONDecodeError:
+        pass
+
+_snapshot_lock = threading.Lock()
+_snapshot_checked = False
+_snapshot_util: tuple[int, date, date, pd.DataFrame] | None = None  # (generation, from, to, frame)
+
+
+def _trends_range(today: date) -> tuple[date, date]:
+    return today - timedelta(days=TRENDS_DAYS + 7), today
+
+
+def _quickwins_range(today: date) -> tuple[date, date]:
+    return today - timedelta(days=QUICKWINS_DAYS + 1), today
+
+
+def _has_jobs() -> bool:
+    db = ReadSessionLocal()
+    try:
+        return db.query(exists().where(Job.id.isnot(None))).scalar()
+    finally:
+        db.close()
+
+
+def boot_from_snapshot() -> bool:
+    """
+    Seed the caches from the cold-start snapshot, once per process. The snapshot is used if the
+    DB contains the data_generations row it was built from (same fingerprint; days changed since
+    are reloaded incrementally) or has no jobs yet (e.g. fresh container before the first sync);
+    otherwise it belongs to other data (older generation, another database) and is ignored.
+    """
+    global _snapshot_checked, _snapshot_util
+    with _snapshot_lock:
+        if _snapshot_checked:
+            return _snapshot_util is not None
+        _snapshot_checked = True
+        from backend.snapshot import generation_fingerprint, load_snapshot
+
+        snap = load_snapshot()
+        if snap is None:
+            return False
+        gen = shared_cache.current_generation()
+        if gen == 0 and not _has_jobs():
+            stamp = 0
+        elif snap["fingerprint"] is not None and generation_fingerprint(snap["version"]) == snap["fingerprint"]:
+            stamp = snap["version"]
+        else:
+            logger.info("Snapshot v%s does not match the DB (generation %s), ignored", snap["version"], gen)
+            return False
+        job_range_cache.seed(snap["jobs"], snap["from"], snap["to"], stamp)
+        if snap["day"] == date.today():
+            aggregates = snap["aggregates"]
+            shared_cache.seed("weekly_trends", *_trends_range(snap["day"]), aggregates["weekly_trends"], stamp)
+            shared_cache.seed("quickwins", *_quickwins_range(snap["day"]), aggregates["quickwins"], stamp)
+        _snapshot_util = (stamp, snap["from"], snap["to"], snap["utilization"])
+        logger.info("Caches seeded from snapshot v%s (%d jobs)", snap["version"], len(snap["jobs"]))
+        return True
+
+
+def _utilization_from_snapshot(d_start: date, d_end: date) -> pd.DataFrame | None:
+    """Slice of the snapshot's daily_utilization if it covers the range and no day in it changed since."""
+    if _snapshot_util is None:
+        return None
+    stamp, s_from, s_to, frame = _snapshot_util
+    if d_start < s_from or d_end > s_to:
+        return None
+    if stamp != shared_cache.current_generation():
+        if any(lo <= d_end and hi >= d_start for lo, hi in shared_cache.changed_since(stamp)):
+            return None
+    return frame[(frame["date"] >= d_start) & (frame["date"] <= d_end)].reset_index(drop=True)
+
+
+def jobs_filter(d_start: date, d_end: date) -> JobFilter:
+    """Filter spec of the dashboard's jobs: robots in ROBOT_NAME_MAP (Unattended/RPA-SCRG-007 etc. ausgeblendet)."""
+    return {"date_from": d_start, "date_to": d_end, "robots": set(ROBOT_NAME_MAP)}
+
+
+# Superset-Cache nur mit den Dashboard-Robotern (Filter läuft in SQL)
+job_range_cache = JobRangeCache(load=lambda d_from, d_to: query_jobs(jobs_filter(d_from, d_to)))
+
+
+def load_jobs(d_start: date, d_end: date) -> pd.DataFrame:
+    """Jobs overlapping [d_start, d_end] of the robots in ROBOT_NAME_MAP."""
+    boot_from_snapshot()
+    return job_range_cache.get(d_start, d_end)
+
+
+PROCESS_JOB_COLUMNS = ["job_key", "process_name", "start_time", "end_time", "state"]
+
+
+def load_process_jobs(d_start: date, d_end: date, process_pattern: str) -> pd.DataFrame:
+    """Dashboard jobs of the processes whose name contains `process_pattern` (case-insensitive), few columns."""
+    spec: JobFilter = {**jobs_filter(d_start, d_end), "process_pattern": process_pattern, "columns": PROCESS_JOB_COLUMNS}
+    return shared_cache.get_or_compute("process_jobs", d_start, d_end, lambda: query_jobs(spec), extra=(process_pattern,))
+
+
+def load_utilization(d_start: date, d_end: date) -> pd.DataFrame:
+    boot_from_snapshot()
+
+    def compute() -> pd.DataFrame:
+        df = _utilization_from_snapshot(d_start, d_end)
+        return df if df is not None else load_utilization_frame(d_start, d_end)
+
+    return shared_cache.get_or_compute("utilization", d_start, d_end, compute)
+
+
+def kpi_utilization(df_util: pd.DataFrame, today: date) -> pd.DataFrame:
+    """Utilization rows used for KPIs: completed days only, RPA hosts if present."""
+    complete = df_util[df_util["date"] < today] if not df_util.empty else pd.DataFrame()
+    rpa = complete[complete["robot_name"].astype(str).str.contains("RPA-", na=False)] if not complete.empty else pd.DataFrame()
+    return rpa if not rpa.empty else complete
+
+
+def compute_kpis(df_jobs: pd.DataFrame, df_util: pd.DataFrame, today: date) -> dict[str, Any]:
+    """Übersicht-KPIs: Ø utilization %, idle hours, success rate %, business impact € (idle × 50 €/h)."""
+    df_kpi = kpi_utilization(df_util, today)
+    idle_hours_sum = float(df_kpi["idle_hours"].sum()) if not df_kpi.empty else 0.0
+    if not df_kpi.empty:
+        avg_util_raw = df_kpi["utilization_percent"].mean()
+    else:
+        avg_util_raw = df_util["utilization_percent"].mean() if not df_util.empty else 0.0
+    total = len(df_jobs)
+    success = int((df_jobs["state"] == "Successful").sum()) if not df_jobs.empty else 0
+    return {
+        "avg_util": min(100.0, float(avg_util_raw)),
+        "idle_hours_sum": idle_hours_sum,
+        "success_rate": (success / total * 100) if total else 0.0,
+        "impact": idle_hours_sum * EUR_PER_IDLE_HOUR,
+        "jobs": total,
+        "successful_jobs": success,
+    }
+
+
+def process_stats(df_jobs: pd.DataFrame) -> pd.DataFrame | None:
+    """Aggregate per process_name: runs, success_rate, duration mean/min/max (seconds). Returns None if no jobs."""
+    if df_jobs.empty or "end_time" not in df_jobs.columns:
+        return None
+    df = df_jobs.assign(duration_sec=(df_jobs["end_time"] - df_jobs["start_time"]).dt.total_seconds())
+    df = df[df["duration_sec"].notna() & (df["duration_sec"] >= 0)]
+    if df.empty:
+        return None
+    proc = df.groupby("process_name", observed=True).agg(
+        runs=("job_key", "count"),
+        success=("state", lambda s: (s == "Successful").sum()),
+        duration_mean=("duration_sec", "mean"),
+        duration_min=("duration_sec", "min"),
+        duration_max=("duration_sec", "max"),
+    ).reset_index()
+    proc["success_rate"] = (proc["success"] / proc["runs"] * 100).round(1)
+    return proc
+
+
+def process_daily_trend(df_jobs: pd.DataFrame, process_name: str, d_start: date, d_end: date) -> pd.DataFrame:
+    """
+    Runs and success rate per start day of one process: from the jobs, and for days before the
+    retention horizon (raw jobs purged) from the daily_process_stats rollup.
+    """
+    from backend.services import retention_service
+
+    proc = df_jobs[df_jobs["process_name"] == process_name] if not df_jobs.empty else df_jobs
+    if proc.empty:
+        by_day = pd.DataFrame(columns=["date", "runs", "success"])
+    else:
+        proc = proc.assign(date=proc["start_time"].dt.date)
+        by_day = proc.groupby("date").agg(runs=("job_key", "count"), success=("state", lambda s: (s == "Successful").sum())).reset_index()
+        by_day = by_day[by_day["date"] >= d_start]  # Übernacht-Jobs vom Vortag nicht als eigener Tag
+    horizon = shared_cache.get_or_compute("jobs_horizon", None, None, retention_service.jobs_horizon)
+    if horizon is not None and d_start < horizon:
+        db = ReadSessionLocal()
+        try:
+            rolled = retention_service.process_daily_rollup(db, process_name, d_start, min(d_end, horizon - timedelta(days=1)))
+        finally:
+            db.close()
+        if not rolled.empty:
+            by_day = pd.concat([rolled, by_day[by_day["date"] >= horizon]], ignore_index=True)
+    if by_day.empty:
+        return by_day.assign(success_rate=pd.Series(dtype=float))
+    by_day["success_rate"] = (by_day["success"] / by_day["runs"] * 100).round(1)
+    return by_day.sort_values("date").reset_index(drop=True)
+
+
+def weekly_trends(today: date) -> dict[str, Any]:
+    """Wochen-Vergleich der letzten TRENDS_DAYS Tage (shared cache; callers must not mutate)."""
+    from backend.services.trends_service import calculate_weekly_trends
+
+    boot_from_snapshot()
+
+    def compute() -> dict[str, Any]:
+        db = ReadSessionLocal()
+        try:
+            return calculate_weekly_trends(db, TRENDS_DAYS)
+        finally:
+            db.close()
+
+    return shared_cache.get_or_compute("weekly_trends", *_trends_range(today), compute)
+
+
+def quickwins(today: date) -> dict[str, Any]:
+    """Quick Wins der letzten QUICKWINS_DAYS Tage (shared cache; callers must not mutate)."""
+    from backend.services.quickwins_service import analyze_quickwins
+
+    boot_from_snapshot()
+
+    def compute() -> dict[str, Any]:
+        db = ReadSessionLocal()
+        try:
+            return analyze_quickwins(db, days=QUICKWINS_DAYS)
+        finally:
+            db.close()
+
+    return shared_cache.get_or_compute("quickwins", *_quickwins_range(today), compute)
+
+
+def idle_days(df_jobs: pd.DataFrame, d_start: date, d_end: date, last_n_days: int = 7) -> list[dict[str, Any]]:
+    """Leerlauf pro Tag (RPA-Hosts) for [d_start, d_end] (shared cache; callers must not mutate)."""
+    from backend.services.idle_service import idle_gaps
+
+    if df_jobs.empty or not df_jobs["end_time"].notna().any():
+        return []
+    rpa_robots = tuple(sorted(k for k in df_jobs["robot_key"].astype(str).unique() if "RPA-" in k))
+    return shared_cache.get_or_compute(
+        "idle_gaps", d_start, d_end,
+        lambda: idle_gaps(df_jobs, rpa_robots, (d_start, d_end), robot_names=ROBOT_NAME_MAP, last_n_days=last_n_days),
+        extra=(rpa_robots, last_n_days),
+    )
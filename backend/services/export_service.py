@@ -0,0 +1,274 @@
+"""
+Excel export of the dashboard range: KPIs, daily utilization, per-process stats and raw jobs.
+
+Written with openpyxl in write-only mode (rows are streamed to the xlsx, nothing is kept as
+cell objects) and fed straight from DB cursors: per-process stats come from one GROUP BY,
+raw jobs are fetched in chunks of EXPORT_CHUNK_ROWS (yield_per). The raw-jobs sheet is capped
+at EXPORT_MAX_ROWS; if the range has more jobs, the full list goes to a CSV (and Parquet, if
+pyarrow is installed) sidecar next to the xlsx. Ranges reaching before the archive horizon
+(job_archive) are read through job_loader.load_jobs_frame instead, which adds the archived jobs
+from Parquet; count, per-process stats and job rows then come from that frame, so the export
+matches the dashboard charts. Job counts, per-process stats and raw jobs cover
+the same robots as the dashboard's KPIs (ROBOT_NAME_MAP); dates and timestamps are written as
+real Excel dates with a German number format.
+"""
+import csv
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Collection, Iterable, Iterator
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from backend.database import DimProcess, DimState, Job
+from backend.services.dashboard_service import ROBOT_NAME_MAP
+from backend.services import job_archive
+from backend.services.job_loader import jobs_select, load_jobs_frame, robots_condition
+
+EXPORT_MAX_ROWS = int(os.getenv("EXPORT_MAX_ROWS", "100000"))
+EXPORT_CHUNK_ROWS = 5000
+JOB_EXPORT_COLUMNS = ["job_key", "robot_key", "robot_name", "process_name", "start_time", "end_time", "state"]
+JOB_HEADERS = ["Job-Key", "Host", "Robot", "Prozess", "Start", "Ende", "Status", "Dauer (min)"]
+DATE_FORMAT = "DD.MM.YYYY"
+DATETIME_FORMAT = "DD.MM.YYYY HH:MM:SS"
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet-Sidecar optional
+    pa = None
+    pq = None
+
+
+def _naive(value: Any) -> Any:
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    return value
+
+
+def _row(ws: Any, values: list | tuple) -> list:
+    """Row for ws.append: dates and timestamps as cells with an Excel number format."""
+    out = []
+    for value in values:
+        if isinstance(value, pd.Timestamp):
+            value = value.to_pydatetime()
+        if isinstance(value, date):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.number_format = DATETIME_FORMAT if isinstance(value, datetime) else DATE_FORMAT
+            value = cell
+        out.append(value)
+    return out
+
+
+def _header(ws: Any, titles: list[str], widths: list[int] | None = None) -> None:
+    for i, width in enumerate(widths or []):
+        ws.column_dimensions[chr(ord("A") + i)].width = width
+    ws.freeze_panes = "A2"
+    row = []
+    for title in titles:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = Font(bold=True)
+        row.append(cell)
+    ws.append(row)
+
+
+def _job_rows(
+    db: Session, date_start: date, date_end: date, robots: Collection[str], limit: int | None = None
+) -> Iterator[tuple]:
+    """Raw job rows (JOB_EXPORT_COLUMNS + Dauer in Minuten), streamed in chunks from the cursor."""
+    stmt = jobs_select(date_start, date_end, JOB_EXPORT_COLUMNS, robots=robots).execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    for row in db.execute(stmt):
+        start, end = _naive(row.start_time), _naive(row.end_time)
+        minutes = round((end - start).total_seconds() / 60.0, 2) if start and end else None
+        yield (row.job_key, row.robot_key, row.robot_name, row.process_name, start, end, row.state, minutes)
+
+
+def _count_jobs(db: Session, date_start: date, date_end: date, robots: Collection[str]) -> int:
+    sub = jobs_select(date_start, date_end, ["job_key"], robots=robots).order_by(None).subquery()
+    return db.execute(select(func.count()).select_from(sub)).scalar() or 0
+
+
+def archive_gap(date_start: date) -> date | None:
+    """Archive horizon if [date_start, …] reaches before it, else None (range entirely in SQLite)."""
+    horizon = job_archive.hot_horizon()
+    return horizon if horizon is not None and date_start < horizon else None
+
+
+def _frame_job_rows(df: pd.DataFrame, limit: int | None = None) -> Iterator[tuple]:
+    """Job rows like _job_rows, from a load_jobs_frame frame."""
+    if limit is not None:
+        df = df.head(limit)
+    for row in df.itertuples(index=False):
+        start = None if pd.isna(row.start_time) else row.start_time.to_pydatetime()
+        end = None if pd.isna(row.end_time) else row.end_time.to_pydatetime()
+        minutes = round((end - start).total_seconds() / 60.0, 2) if start and end else None
+        yield (row.job_key, str(row.robot_key), str(row.robot_name), str(row.process_name), start, end, str(row.state), minutes)
+
+
+def _frame_process_rows(df: pd.DataFrame) -> list[tuple]:
+    """Per-process stats like _process_rows, from a load_jobs_frame frame."""
+    if df.empty:
+        return []
+    stats = pd.DataFrame({
+        "process_name": df["process_name"].astype(str),
+        "success": (df["state"].astype(str) == "Successful").astype(int),
+        "minutes": (df["end_time"] - df["start_time"]).dt.total_seconds() / 60.0,
+    }).groupby("process_name", sort=False).agg(
+        runs=("success", "size"), success=("success", "sum"),
+        avg_min=("minutes", "mean"), min_min=("minutes", "min"), max_min=("minutes", "max"),
+    ).sort_values("runs", ascending=False, kind="stable")
+    out = []
+    for name, r in stats.iterrows():
+        runs, success = int(r["runs"]), int(r["success"])
+        out.append((
+            name or "(ohne Name)", runs, success, round(success / runs * 100.0, 1) if runs else 0.0,
+            round(float(r["avg_min"]), 2), round(float(r["min_min"]), 2), round(float(r["max_min"]), 2),
+        ))
+    return out
+
+
+def _process_rows(db: Session, date_start: date, date_end: date, robots: Collection[str]) -> list[tuple]:
+    """Runs, success rate and Ø/min/max duration per process (one GROUP BY in SQLite)."""
+    t_start = datetime.combine(date_start, datetime.min.time())
+    t_end = datetime.combine(date_end, datetime.max.time())
+    duration = (func.julianday(Job.end_time) - func.julianday(Job.start_time)) * 1440.0
+    process = func.coalesce(DimProcess.name, "")
+    stmt = (
+        select(
+            process.label("process_name"),
+            func.count().label("runs"),
+            func.sum(case((DimState.name == "Successful", 1), else_=0)).label("success"),
+            func.avg(duration).label("avg_min"),
+            func.min(duration).label("min_min"),
+            func.max(duration).label("max_min"),
+        )
+        .select_from(Job)
+        .outerjoin(DimProcess, DimProcess.id == Job.process_id)
+        .outerjoin(DimState, DimState.id == Job.state_id)
+        .where(Job.end_time.isnot(None), Job.start_time < t_end, Job.end_time >= t_start, robots_condition(robots))
+        .group_by(process)
+        .order_by(func.count().desc())
+    )
+    out = []
+    for r in db.execute(stmt):
+        rate = round(r.success / r.runs * 100.0, 1) if r.runs else 0.0
+        out.append((
+            r.process_name or "(ohne Name)", r.runs, r.success, rate,
+            round(r.avg_min or 0.0, 2), round(r.min_min or 0.0, 2), round(r.max_min or 0.0, 2),
+        ))
+    return out
+
+
+def _write_sidecars(rows: Iterable[tuple], fname: Path) -> list[Path]:
+    """All raw jobs as CSV (+ Parquet if available), written chunk by chunk."""
+    csv_path = fname.with_name(f"{fname.stem}_jobs.csv")
+    parquet_path = fname.with_name(f"{fname.stem}_jobs.parquet")
+    writer = None
+    schema = None
+    if pq is not None:
+        schema = pa.schema([
+            ("job_key", pa.string()), ("robot_key", pa.string()), ("robot_name", pa.string()),
+            ("process_name", pa.string()), ("start_time", pa.timestamp("us")), ("end_time", pa.timestamp("us")),
+            ("state", pa.string()), ("duration_minutes", pa.float64()),
+        ])
+        writer = pq.ParquetWriter(parquet_path, schema)
+    try:
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            out = csv.writer(f, delimiter=";")
+            out.writerow(JOB_HEADERS)
+            chunk: list[tuple] = []
+            for row in rows:
+                out.writerow(row)
+                if writer is not None:
+                    chunk.append(row)
+                    if len(chunk) >= EXPORT_CHUNK_ROWS:
+                        writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, r)) for r in chunk], schema=schema))
+                        chunk = []
+            if writer is not None and chunk:
+                writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, r)) for r in chunk], schema=schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    return [csv_path] + ([parquet_path] if writer is not None else [])
+
+
+def export_daily_summary(
+    db: Session,
+    date_start: date,
+    date_end: date,
+    kpi_metrics: dict[str, float],
+    df_util: pd.DataFrame,
+    fname: Path,
+    max_rows: int | None = None,
+    sidecar: bool | None = None,
+    robots: Collection[str] | None = None,
+) -> Path:
+    """
+    Write the xlsx for [date_start, date_end] to fname and return it.
+    sidecar: None = only if the jobs exceed the row cap, True = always, False = never.
+    robots: robot_keys of the job sheets (None = the dashboard's robots, ROBOT_NAME_MAP).
+    """
+    robots = set(ROBOT_NAME_MAP) if robots is None else set(robots)
+    horizon = archive_gap(date_start)
+    frame = None
+    if horizon is not None:
+        # Teil des Zeitraums liegt im Parquet-Archiv: alles über den archivfähigen Loader
+        frame = load_jobs_frame(date_start, date_end, JOB_EXPORT_COLUMNS, match={"robot_key": robots})
+
+    def job_rows(limit: int | None = None) -> Iterator[tuple]:
+        if frame is not None:
+            return _frame_job_rows(frame, limit)
+        return _job_rows(db, date_start, date_end, robots, limit=limit)
+
+    cap = EXPORT_MAX_ROWS if max_rows is None else max_rows
+    fname = Path(fname)
+    fname.parent.mkdir(parents=True, exist_ok=True)
+    n_jobs = len(frame) if frame is not None else _count_jobs(db, date_start, date_end, robots)
+    capped = n_jobs > cap
+    sidecars = _write_sidecars(job_rows(), fname) if (sidecar or (sidecar is None and capped)) else []
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("KPIs")
+    _header(ws, ["Kennzahl", "Wert"], [36, 24])
+    ws.append(["Zeitraum", f"{date_start:%d.%m.%Y} – {date_end:%d.%m.%Y}"])
+    ws.append(["Ø Utilization %", round(float(kpi_metrics.get("avg_util", 0.0)), 1)])
+    ws.append(["Leerlauf (Robot-Stunden)", round(float(kpi_metrics.get("idle_hours_sum", 0.0)), 1)])
+    ws.append(["Success Rate %", round(float(kpi_metrics.get("success_rate", 0.0)), 1)])
+    ws.append(["Business Impact (Idle) €", round(float(kpi_metrics.get("impact", 0.0)), 0)])
+    ws.append(["Jobs im Zeitraum", n_jobs])
+    ws.append(_row(ws, ["Erstellt", datetime.now().replace(microsecond=0)]))
+    if horizon is not None and not job_archive.available():
+        ws.append(["Hinweis", f"Jobs vor dem {horizon:%d.%m.%Y} sind archiviert und ohne pyarrow nicht lesbar – Jobs/Prozesse unvollständig"])
+    if capped:
+        ws.append(["Hinweis", f"Blatt „Jobs“ auf {cap} Zeilen begrenzt; vollständige Liste: {', '.join(p.name for p in sidecars)}"])
+
+    ws = wb.create_sheet("Utilization pro Tag")
+    _header(ws, ["Datum", "Robot", "Laufzeit (h)", "Leerlauf (h)", "Utilization %"], [12, 24, 14, 14, 14])
+    if df_util is not None and not df_util.empty:
+        util = df_util.sort_values(["date", "robot_name"])
+        for d, robot, runtime, idle, util_pct in zip(
+            util["date"], util["robot_name"], util["total_runtime_hours"], util["idle_hours"], util["utilization_percent"]
+        ):
+            d = d.date() if isinstance(d, datetime) else d  # Tageswert, auch aus datetime64-Spalten
+            ws.append(_row(ws, [d, str(robot), round(float(runtime), 2), round(float(idle), 2), round(float(util_pct), 1)]))
+
+    ws = wb.create_sheet("Prozesse")
+    _header(ws, ["Prozess", "Runs", "Erfolgreich", "Success Rate %", "Ø Dauer (min)", "Min (min)", "Max (min)"], [40, 8, 12, 14, 14, 12, 12])
+    process_rows = _frame_process_rows(frame) if frame is not None else _process_rows(db, date_start, date_end, robots)
+    for row in process_rows:
+        ws.append(row)
+
+    ws = wb.create_sheet("Jobs")
+    _header(ws, JOB_HEADERS, [38, 18, 18, 40, 20, 20, 12, 12])
+    for row in job_rows(limit=cap):
+        ws.append(_row(ws, row))
+
+    wb.save(fname)
+    return fname
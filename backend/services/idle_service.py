@@ -0,0 +1,241 @@
+"""
+Idle gaps per robot and day ("Leerlauf pro Tag"), computed vectorized in one pass.
+
+Jobs are exploded to the calendar days they overlap, clipped to 00:00–23:59:59.999999,
+sorted by (robot, day, start) and compared with the running maximum of previous ends per
+(robot, day) – everything before that maximum is busy, everything after it is idle.
+Shared by the dashboard, Quick Wins and the verify scripts.
+"""
+from datetime import date
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+from backend.database import Job
+
+DAY = pd.Timedelta(days=1)
+DAY_END_OFFSET = DAY - pd.Timedelta(microseconds=1)  # wie datetime.max.time()
+IDLE_LABEL = "— Leerlauf —"
+MIN_GAP_ROW_MINUTES = 1.0
+SEGMENT_COLUMNS = ["robot_key", "day", "start", "end", "kind", "process_name", "state", "minutes"]
+
+
+def jobs_frame(jobs: Iterable[Job]) -> pd.DataFrame:
+    """ORM jobs -> DataFrame with robot_key, process_name, state, start_time, end_time."""
+    rows = []
+    for j in jobs:
+        rows.append({
+            "robot_key": j.robot_key,
+            "process_name": j.process_name or "",
+            "state": j.state or "",
+            "start_time": j.start_time,
+            "end_time": j.end_time,
+        })
+    return pd.DataFrame(rows, columns=["robot_key", "process_name", "state", "start_time", "end_time"])
+
+
+def format_idle_minutes(minutes: float) -> str:
+    if minutes <= 0:
+        return "0 min"
+    h, m = divmod(int(minutes), 60)
+    if h > 0:
+        return f"{h}h {m}min"
+    return f"{int(minutes)} min"
+
+
+def _format_job_minutes(minutes: float) -> str:
+    sec = minutes * 60
+    if sec >= 3600:
+        return f"{int(sec // 3600)}h {int(sec % 3600 // 60)}min"
+    return f"{int(sec // 60)}min"
+
+
+def _naive(ts: pd.Series) -> pd.Series:
+    ts = pd.to_datetime(ts)
+    if getattr(ts.dt, "tz", None) is not None:
+        ts = ts.dt.tz_localize(None)
+    return ts.astype("datetime64[ns]")
+
+
+def _clip_to_days(
+    jobs: pd.DataFrame, robots: Iterable[str] | None, date_from: date, date_to: date
+) -> pd.DataFrame:
+    """One row per (job, overlapped day in range), clipped to the day; sorted by robot, day, start."""
+    empty = pd.DataFrame(columns=["robot_key", "day", "start", "end", "process_name", "state"])
+    if jobs.empty:
+        return empty
+    df = jobs[jobs["end_time"].notna()]
+    if robots is not None:
+        df = df[df["robot_key"].astype(str).isin(set(robots))]
+    if df.empty:
+        return empty
+    start = _naive(df["start_time"]).to_numpy()
+    end = _naive(df["end_time"]).to_numpy()
+    lo = np.datetime64(pd.Timestamp(date_from), "ns")
+    hi = np.datetime64(pd.Timestamp(date_to), "ns")
+    first_day = np.maximum(start.astype("datetime64[D]").astype("datetime64[ns]"), lo)
+    last_day = np.minimum(end.astype("datetime64[D]").astype("datetime64[ns]"), hi)
+    counts = ((last_day - first_day) // np.timedelta64(1, "D")).astype(np.int64) + 1
+    counts = np.where(end > start, np.maximum(counts, 0), 0)
+    if counts.sum() == 0:
+        return empty
+    idx = np.repeat(np.arange(len(df)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    day = first_day[idx] + k * np.timedelta64(1, "D")
+    s_in = np.maximum(start[idx], day)
+    e_in = np.minimum(end[idx], day + DAY_END_OFFSET.to_timedelta64())
+    keep = e_in > s_in
+    out = pd.DataFrame({
+        "robot_key": df["robot_key"].astype(str).to_numpy()[idx][keep],
+        "day": day[keep],
+        "start": s_in[keep],
+        "end": e_in[keep],
+        "process_name": df["process_name"].astype(str).to_numpy()[idx][keep] if "process_name" in df.columns else "",
+        "state": df["state"].astype(str).to_numpy()[idx][keep] if "state" in df.columns else "",
+    })
+    return out.sort_values(["robot_key", "day", "start"], kind="stable").reset_index(drop=True)
+
+
+def busy_idle_segments(
+    jobs: pd.DataFrame, robots: Iterable[str] | None, date_range: tuple[date, date]
+) -> pd.DataFrame:
+    """
+    Job and idle segments per (robot, day) within date_range (inclusive).
+    Only robot/day combinations with at least one job are returned (as in the dashboard).
+    """
+    clipped = _clip_to_days(jobs, robots, date_range[0], date_range[1])
+    if clipped.empty:
+        return pd.DataFrame(columns=SEGMENT_COLUMNS)
+    grp = clipped.groupby(["robot_key", "day"], sort=False)
+    run_max = grp["end"].cummax()
+    prev_end = run_max.groupby([clipped["robot_key"], clipped["day"]], sort=False).shift(1)
+    prev_end = prev_end.fillna(clipped["day"])
+    gap_mask = clipped["start"] > prev_end
+    gaps = pd.DataFrame({
+        "robot_key": clipped["robot_key"][gap_mask],
+        "day": clipped["day"][gap_mask],
+        "start": prev_end[gap_mask],
+        "end": clipped["start"][gap_mask],
+    })
+    last = run_max.groupby([clipped["robot_key"], clipped["day"]], sort=False).max().reset_index()
+    day_end = last["day"] + DAY_END_OFFSET
+    tail = last[last["end"] < day_end]
+    tails = pd.DataFrame({
+        "robot_key": tail["robot_key"],
+        "day": tail["day"],
+        "start": tail["end"],
+        "end": day_end[tail.index],
+    })
+    idle = pd.concat([gaps, tails], ignore_index=True)
+    idle["kind"] = "idle"
+    idle["process_name"] = IDLE_LABEL
+    idle["state"] = ""
+    job_rows = clipped.assign(kind="job")
+    seg = pd.concat([job_rows, idle], ignore_index=True)
+    seg["minutes"] = (seg["end"] - seg["start"]).dt.total_seconds() / 60.0
+    return seg.sort_values(["day", "start", "robot_key"], kind="stable").reset_index(drop=True)[SEGMENT_COLUMNS]
+
+
+def busy_intervals(
+    jobs: pd.DataFrame, robots: Iterable[str] | None, date_range: tuple[date, date]
+) -> pd.DataFrame:
+    """Merged busy blocks per (robot, day): robot_key, day, start, end."""
+    clipped = _clip_to_days(jobs, robots, date_range[0], date_range[1])
+    if clipped.empty:
+        return pd.DataFrame(columns=["robot_key", "day", "start", "end"])
+    keys = [clipped["robot_key"], clipped["day"]]
+    run_max = clipped.groupby(keys, sort=False)["end"].cummax()
+    prev_end = run_max.groupby(keys, sort=False).shift(1)
+    new_block = prev_end.isna() | (clipped["start"] > prev_end)
+    block = new_block.cumsum()
+    return (
+        clipped.assign(block=block)
+        .groupby("block", sort=False)
+        .agg(robot_key=("robot_key", "first"), day=("day", "first"), start=("start", "min"), end=("end", "max"))
+        .reset_index(drop=True)
+    )
+
+
+def job_pieces(
+    jobs: pd.DataFrame, robots: Iterable[str] | None, date_range: tuple[date, date]
+) -> pd.DataFrame:
+    """Jobs clipped to the days they overlap, not merged: robot_key, day, start, end, process_name, state."""
+    return _clip_to_days(jobs, robots, date_range[0], date_range[1])
+
+
+def busy_minutes_by_hour(busy: pd.DataFrame) -> pd.DataFrame:
+    """
+    Minutes per (robot_key, day, hour) of the given intervals: busy time for merged busy blocks,
+    summed job runtime (parallel jobs counted each) for job_pieces.
+    """
+    if busy.empty:
+        return pd.DataFrame(columns=["robot_key", "day", "hour", "minutes"])
+    start = busy["start"].to_numpy()
+    end = busy["end"].to_numpy()
+    h0 = start.astype("datetime64[h]")
+    h1 = (end - np.timedelta64(1, "ns")).astype("datetime64[h]")
+    counts = ((h1 - h0) // np.timedelta64(1, "h")).astype(np.int64) + 1
+    idx = np.repeat(np.arange(len(busy)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    hour_start = (h0[idx] + k * np.timedelta64(1, "h")).astype("datetime64[ns]")
+    s = np.maximum(start[idx], hour_start)
+    e = np.minimum(end[idx], hour_start + np.timedelta64(1, "h"))
+    out = pd.DataFrame({
+        "robot_key": busy["robot_key"].to_numpy()[idx],
+        "day": busy["day"].to_numpy()[idx],
+        "hour": pd.DatetimeIndex(hour_start).hour,
+        "minutes": (e - s) / np.timedelta64(1, "m"),
+    })
+    return out.groupby(["robot_key", "day", "hour"], as_index=False)["minutes"].sum()
+
+
+def idle_gaps(
+    jobs: pd.DataFrame,
+    robots: Iterable[str] | None,
+    date_range: tuple[date, date],
+    robot_names: dict[str, str] | None = None,
+    last_n_days: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Ready-to-render day tables, newest day first:
+    [{"date", "idle_minutes", "idle_str", "table": DataFrame(Von, Bis, Prozess, Robot, Dauer, Status, is_idle)}].
+    Idle rows shorter than 1 min are counted but not listed.
+    """
+    seg = busy_idle_segments(jobs, robots, date_range)
+    if seg.empty:
+        return []
+    names = robot_names or {}
+    days = sorted(seg["day"].unique(), reverse=True)
+    if last_n_days is not None:
+        days = days[:last_n_days]
+        seg = seg[seg["day"].isin(days)]
+    is_idle = seg["kind"] == "idle"
+    visible = seg[~is_idle | (seg["minutes"] >= MIN_GAP_ROW_MINUTES)]
+    table = pd.DataFrame({
+        "day": visible["day"],
+        "Von": visible["start"].dt.strftime("%H:%M"),
+        "Bis": visible["end"].dt.strftime("%H:%M"),
+        "Prozess": visible["process_name"].replace("", "(ohne Name)"),
+        "Robot": visible["robot_key"].map(lambda k: names.get(k, k)),
+        "Dauer": [
+            format_idle_minutes(m) if idle else _format_job_minutes(m)
+            for m, idle in zip(visible["minutes"], visible["kind"] == "idle")
+        ],
+        "Status": visible["state"],
+        "is_idle": visible["kind"] == "idle",
+    })
+    idle_sum = seg[is_idle].groupby("day")["minutes"].sum()
+    n_robots = seg.groupby("day")["robot_key"].nunique()
+    tables = dict(tuple(table.groupby("day", sort=False)))
+    out: list[dict[str, Any]] = []
+    for d in days:
+        idle_min = min(float(idle_sum.get(d, 0.0)), 24 * 60 * int(n_robots.get(d, 1)))
+        day_tbl = tables.get(d)
+        out.append({
+            "date": pd.Timestamp(d).date(),
+            "idle_minutes": idle_min,
+            "idle_str": format_idle_minutes(idle_min),
+            "table": day_tbl.drop(columns="day").reset_index(drop=True) if day_tbl is not None else pd.DataFrame(),
+        })
+    return out
@@ -0,0 +1,225 @@
+"""
+Cold storage for historical jobs: month-partitioned Parquet under data/archive/jobs/.
+
+archive_jobs() moves finished jobs that ended before the hot horizon (today - N days) out of
+SQLite into jobs_YYYY-MM.parquet (partitioned by start month, dictionary-encoded text columns,
+µs timestamps); a month that already has a file is merged by job_key. _index.json records the
+horizon and per partition its rows and [min_start, max_end], so read_jobs() opens only the
+partitions overlapping the requested range and pushes the time filter into the Parquet reader.
+The index is written only after the generation without the archived jobs is published
+(database.after_publish): if staging fails, the horizon stays where it was and the utilization
+of those days is still computed from SQLite.
+
+job_loader.load_jobs_frame unions hot SQLite and cold Parquet transparently for ranges before
+the horizon; calculate_utilization leaves days before the horizon untouched (their jobs are no
+longer in SQLite). Parquet needs pyarrow; without it nothing is archived or read.
+"""
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from backend.database import DATA_DIR, Job, SessionLocal, after_publish, release_space
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = DATA_DIR / "archive" / "jobs"
+INDEX_PATH = ARCHIVE_DIR / "_index.json"
+INDEX_VERSION = 1
+MIN_HOT_DAYS = 90  # Sync holt die letzten 90 Tage, der Job-Cache hält 90 Tage – nie davor archivieren
+ARCHIVE_AFTER_DAYS = int(os.getenv("JOB_ARCHIVE_AFTER_DAYS", "0"))  # 0 = nicht automatisch nach dem Sync
+ARCHIVE_COLUMNS = ["job_key", "robot_name", "machine_name", "process_name", "start_time", "end_time", "state"]
+TEXT_COLUMNS = ["robot_name", "machine_name", "process_name", "state"]
+
+try:
+    import pyarrow  # noqa: F401
+    import pyarrow.parquet as pq
+except ImportError:  # Archiv optional
+    pq = None
+
+_index_cache: tuple[tuple[int, int], dict[str, Any]] | None = None
+
+
+def available() -> bool:
+    return pq is not None
+
+
+def load_index() -> dict[str, Any]:
+    """Archive index (cached per size/mtime); empty index if there is no archive."""
+    global _index_cache
+    try:
+        st = INDEX_PATH.stat()
+    except OSError:
+        return {"version": INDEX_VERSION, "horizon": None, "partitions": {}}
+    key = (st.st_size, st.st_mtime_ns)
+    if _index_cache is not None and _index_cache[0] == key:
+        return _index_cache[1]
+    index = json.loads(INDEX_PATH.read_text(encoding="utf-8"))
+    _index_cache = (key, index)
+    return index
+
+
+def hot_horizon() -> date | None:
+    """First day whose jobs are all still in SQLite; None if nothing has been archived."""
+    horizon = load_index().get("horizon")
+    return date.fromisoformat(horizon) if horizon else None
+
+
+def _write_atomic(path: Path, write: Callable[[Path], None]) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Archive schema: text dimensions as categoricals (Parquet dictionary), naive µs timestamps."""
+    df = df[ARCHIVE_COLUMNS].copy()
+    df["job_key"] = df["job_key"].astype(str)
+    for c in TEXT_COLUMNS:
+        df[c] = df[c].astype("category")
+    for c in ("start_time", "end_time"):
+        ts = pd.to_datetime(df[c])
+        if getattr(ts.dt, "tz", None) is not None:
+            ts = ts.dt.tz_localize(None)
+        df[c] = ts.astype("datetime64[us]")
+    return df.sort_values("start_time", kind="stable").reset_index(drop=True)
+
+
+def archive_jobs(
+    older_than_days: int,
+    session_factory: Callable[[], Session] | None = None,
+    vacuum: bool = True,
+) -> dict[str, Any]:
+    """
+    Move finished jobs that ended before today - older_than_days into the Parquet archive and
+    delete them from the DB behind session_factory (e.g. database.stage_generation). Returns
+    {"horizon", "archived", "months"}. Parquet files are written before the delete (readers
+    de-duplicate by job_key in between), the index once the delete is published.
+    """
+    if pq is None:
+        raise RuntimeError("pyarrow fehlt – Archivierung nicht möglich (pip install pyarrow).")
+    if older_than_days < MIN_HOT_DAYS:
+        raise ValueError(f"older_than_days muss mindestens {MIN_HOT_DAYS} sein")
+    horizon = date.today() - timedelta(days=older_than_days)
+    previous = hot_horizon()
+    if previous is not None and previous > horizon:
+        horizon = previous  # Horizont wandert nie zurück
+    t_cut = datetime.combine(horizon, datetime.min.time())
+    index = load_index()
+
+    db = (session_factory or SessionLocal)()
+    try:
+        cond = (Job.end_time.isnot(None), Job.end_time < t_cut, Job.start_time < t_cut)
+        stmt = select(*[getattr(Job, c).label(c) for c in ARCHIVE_COLUMNS]).where(*cond)
+        df = pd.read_sql(stmt, db.connection())
+        partitions = dict(index.get("partitions", {}))
+        months: list[str] = []
+        if not df.empty:
+            df = _compact(df)
+            ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+            for month, part in df.groupby(df["start_time"].dt.strftime("%Y-%m"), sort=True):
+                path = ARCHIVE_DIR / f"jobs_{month}.parquet"
+                if path.exists():
+                    existing = pd.read_parquet(path)
+                    part = pd.concat(
+                        [existing.astype({c: "object" for c in TEXT_COLUMNS}), part.astype({c: "object" for c in TEXT_COLUMNS})],
+                        ignore_index=True,
+                    ).drop_duplicates("job_key", keep="last")
+                    part = _compact(part)
+                _write_atomic(path, lambda tmp, p=part: p.to_parquet(tmp, index=False, compression="zstd"))
+                partitions[month] = {
+                    "file": path.name,
+                    "rows": int(len(part)),
+                    "min_start": part["start_time"].min().isoformat(),
+                    "max_end": part["end_time"].max().isoformat(),
+                }
+                months.append(month)
+        index = {"version": INDEX_VERSION, "horizon": horizon.isoformat(), "partitions": partitions}
+        n = 0
+        if not df.empty:
+            n = db.execute(delete(Job).where(*cond)).rowcount
+        db.commit()
+
+        def write_index() -> None:
+            ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+            _write_atomic(INDEX_PATH, lambda tmp: tmp.write_text(json.dumps(index, indent=1, sort_keys=True), encoding="utf-8"))
+
+        after_publish(session_factory, write_index)  # der Löschvorgang ist committet, der Horizont folgt ihm
+        if n and vacuum:
+            release_space(db)  # freigewordene Seiten zurückgeben, damit die heiße DB klein bleibt
+        logger.info("Archived %d jobs before %s into %d month(s)", n, horizon, len(months))
+        return {"horizon": horizon, "archived": n, "months": months}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _robot_key(df: pd.DataFrame) -> pd.Series:
+    machine = df["machine_name"].astype(object).fillna("").astype(str).str.strip()
+    robot = df["robot_name"].astype(object).fillna("Unknown")
+    return machine.where(machine != "", robot)
+
+
+def read_jobs(
+    d_start: date, d_end: date, columns: list[str], match: dict[str, set[str]] | None = None
+) -> pd.DataFrame | None:
+    """
+    Archived jobs overlapping [d_start, d_end] with the job loader's columns (robot_key derived,
+    NULL process/state as ""); None if the range is entirely after the horizon or nothing matches.
+    match: {column: allowed names} as in job_loader.load_jobs_frame.
+    """
+    match = match or {}
+    index = load_index()
+    horizon = index.get("horizon")
+    if pq is None or not horizon or d_start >= date.fromisoformat(horizon):
+        return None
+    t_start = datetime.combine(d_start, datetime.min.time())
+    t_end = datetime.combine(d_end, datetime.max.time())
+    # Partition Pruning: nur Monate, deren [min_start, max_end] den Zeitraum schneidet
+    files = [
+        ARCHIVE_DIR / p["file"]
+        for _, p in sorted(index["partitions"].items())
+        if datetime.fromisoformat(p["min_start"]) < t_end and datetime.fromisoformat(p["max_end"]) >= t_start
+    ]
+    if not files:
+        return None
+    wanted = [*columns, *(c for c in match if c not in columns)]
+    read_cols = sorted(
+        {c for c in wanted if c in ARCHIVE_COLUMNS}
+        | ({"robot_name", "machine_name"} if "robot_key" in wanted else set())
+        | {"start_time", "end_time"}
+    )
+    filters = [("start_time", "<", pd.Timestamp(t_end)), ("end_time", ">=", pd.Timestamp(t_start))]
+    frames = [pq.read_table(f, columns=read_cols, filters=filters).to_pandas() for f in files if f.exists()]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return None
+    df = pd.concat(
+        [f.astype({c: "object" for c in TEXT_COLUMNS if c in f.columns}) for f in frames], ignore_index=True
+    )
+    if "robot_key" in wanted:
+        df["robot_key"] = _robot_key(df)
+    if "robot_name" in df.columns:
+        df["robot_name"] = df["robot_name"].fillna("Unknown")
+    if "machine_name" in df.columns:
+        df["machine_name"] = df["machine_name"].fillna("").astype(str).str.strip()
+    for c in ("process_name", "state"):
+        if c in df.columns:
+            df[c] = df[c].fillna("")
+    for c in ("start_time", "end_time"):
+        df[c] = df[c].astype("datetime64[us]")
+    for c, allowed in match.items():
+        df = df[df[c].isin(allowed)]
+    return df[columns] if not df.empty else None
@@ -0,0 +1,305 @@
+"""
+Columnar job loader: reads column-projected rows straight into a typed DataFrame.
+
+No ORM objects, no per-row dicts: a Core select goes through pd.read_sql; robot/machine/
+robot_key/process/state are read as their dimension ids and turned into categoricals straight
+from the codes (no string columns over the wire), timestamps become datetime64.
+
+JobRangeCache keeps one superset frame (default: last 90 days) sorted by start_time per data
+generation; contained ranges are answered by a binary-search slice, other ranges only fetch the
+missing edges, and new generations only re-fetch the days they changed: the cached jobs
+overlapping those days are replaced by the reloaded ones, so archived, purged or re-keyed jobs
+disappear. The superset spans at most SUPERSET_MAX_DAYS: days before the default window are
+dropped first, ranges that still do not fit are loaded directly without caching. Ranges before
+the archive horizon also read the month-partitioned Parquet archive (job_archive).
+"""
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable, Collection
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, or_, select
+from sqlalchemy.engine import Engine
+
+import backend.cache as shared_cache
+from backend.database import JOB_DIMENSIONS, DailyUtilization, Job, get_read_engine
+from backend.services import job_archive
+
+SUPERSET_DAYS = 90
+SUPERSET_MAX_DAYS = 400
+
+JOB_COLUMNS = ["job_key", "robot_name", "machine_name", "robot_key", "process_name", "start_time", "end_time", "state"]
+CATEGORY_COLUMNS = ["robot_name", "machine_name", "robot_key", "process_name", "state"]
+DATETIME_COLUMNS = ["start_time", "end_time"]
+
+
+# Loader-Spalte -> (FK-Spalte in jobs, Wert für NULL)
+DIMENSION_COLUMNS = {
+    "robot_name": ("robot_id", "Unknown"),
+    "machine_name": ("machine_id", ""),
+    "robot_key": ("robot_key_id", "Unknown"),
+    "process_name": ("process_id", ""),
+    "state": ("state_id", ""),
+}
+
+
+def dimension_table(column: str):
+    """dim_* model behind a loader column (robot_key -> DimRobotKey, ...)."""
+    fk, _ = DIMENSION_COLUMNS[column]
+    return JOB_DIMENSIONS[fk][1]
+
+
+def _job_column_exprs() -> dict:
+    exprs = {"job_key": Job.job_key, "start_time": Job.start_time, "end_time": Job.end_time}
+    for c, (_, default) in DIMENSION_COLUMNS.items():
+        exprs[c] = func.coalesce(dimension_table(c).name, default)
+    return exprs
+
+
+def _window(d_start: date, d_end: date) -> tuple:
+    t_start = datetime.combine(d_start, datetime.min.time())
+    t_end = datetime.combine(d_end, datetime.max.time())
+    return Job.end_time.isnot(None), Job.start_time < t_end, Job.end_time >= t_start
+
+
+def jobs_select(d_start: date, d_end: date, columns: list[str] | None = None, robots: Collection[str] | None = None):
+    """
+    Select of all finished jobs overlapping [d_start, d_end] (inkl. Übernacht-Jobs), names joined in.
+    robots: only these robot_keys (None = all).
+    """
+    exprs = _job_column_exprs()
+    cols = columns or JOB_COLUMNS
+    stmt = select(*[exprs[c].label(c) for c in cols]).select_from(Job)
+    for c in cols:
+        if c in DIMENSION_COLUMNS:
+            dim = dimension_table(c)
+            stmt = stmt.outerjoin(dim, dim.id == getattr(Job, DIMENSION_COLUMNS[c][0]))
+    stmt = stmt.where(*_window(d_start, d_end))
+    if robots is not None:
+        stmt = stmt.where(robots_condition(robots))
+    return stmt.order_by(Job.start_time)
+
+
+def robots_condition(robots: Collection[str]):
+    """WHERE condition for jobs of the given robot_keys (on the indexed foreign key)."""
+    return _match_condition("robot_key", set(robots))
+
+
+def _jobs_id_select(d_start: date, d_end: date, cols: list[str]):
+    """Like jobs_select, but dimension columns as their integer ids (no joins)."""
+    exprs = {c: getattr(Job, DIMENSION_COLUMNS[c][0]) if c in DIMENSION_COLUMNS else getattr(Job, c) for c in cols}
+    return select(*[exprs[c].label(c) for c in cols]).where(*_window(d_start, d_end)).order_by(Job.start_time)
+
+
+def _match_condition(column: str, allowed: set[str]):
+    """fk IN (ids of the allowed names) on the indexed foreign key; NULL counts as the default name."""
+    fk_name, default = DIMENSION_COLUMNS[column]
+    fk = getattr(Job, fk_name)
+    dim = dimension_table(column)
+    cond = fk.in_(select(dim.id).where(dim.name.in_(sorted(allowed))))
+    return or_(cond, fk.is_(None)) if default in allowed else cond
+
+
+def _decode(ids: pd.Series, names: dict[int, str], default: str) -> pd.Categorical:
+    """Dimension ids -> categorical via the codes (NULL -> default), only used categories kept."""
+    categories = list(dict.fromkeys([*names.values(), default]))
+    position = {name: i for i, name in enumerate(categories)}
+    lookup = np.full(max(names, default=0) + 2, position[default], dtype=np.int32)
+    for dim_id, name in names.items():
+        lookup[dim_id] = position[name]
+    codes = lookup[ids.fillna(len(lookup) - 1).to_numpy(dtype=np.int64)]
+    return pd.Categorical.from_codes(codes, categories=categories).remove_unused_categories()
+
+
+def apply_job_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Categoricals for dimension columns, naive datetime64 for timestamps."""
+    for c in CATEGORY_COLUMNS:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+    for c in DATETIME_COLUMNS:
+        if c in df.columns:
+            ts = pd.to_datetime(df[c])
+            if getattr(ts.dt, "tz", None) is not None:
+                ts = ts.dt.tz_localize(None)
+            df[c] = ts
+    return df
+
+
+def load_jobs_frame(
+    d_start: date,
+    d_end: date,
+    columns: list[str] | None = None,
+    bind: Engine | None = None,
+    match: dict[str, set[str]] | None = None,
+) -> pd.DataFrame:
+    """
+    Jobs overlapping [d_start, d_end] as a typed DataFrame, sorted by start_time.
+    match: {dimension column: allowed names}, e.g. {"robot_key": {...}}; filtered in SQL on the
+    foreign keys (archived jobs by name). Filter specs with patterns: job_query.query_jobs.
+    """
+    cols = columns or JOB_COLUMNS
+    match = match or {}
+    with (bind or get_read_engine()).connect() as conn:
+        stmt = _jobs_id_select(d_start, d_end, cols).where(*[_match_condition(c, a) for c, a in match.items()])
+        df = pd.read_sql(stmt, conn)
+        for c in cols:
+            if c in DIMENSION_COLUMNS:
+                dim = dimension_table(c)
+                names = dict(conn.execute(select(dim.id, dim.name)).all())
+                df[c] = _decode(df[c], names, DIMENSION_COLUMNS[c][1])
+    cold = job_archive.read_jobs(d_start, d_end, cols, match)
+    if cold is not None:
+        # Vor dem Horizont: archivierte Jobs dazu (heiße Zeile gewinnt bei gleichem job_key)
+        df = pd.concat([cold, df], ignore_index=True) if not df.empty else cold
+        if "job_key" in df.columns:
+            df = df.drop_duplicates("job_key", keep="last")
+        if "start_time" in df.columns:
+            df = df.sort_values("start_time", kind="stable").reset_index(drop=True)
+    if df.empty:
+        df = pd.DataFrame({c: pd.Series(dtype="object") for c in cols})
+    return apply_job_dtypes(df)
+
+
+def load_utilization_frame(d_start: date, d_end: date, bind: Engine | None = None) -> pd.DataFrame:
+    """daily_utilization rows in [d_start, d_end] (date stays a Python date for comparisons)."""
+    stmt = select(
+        DailyUtilization.date,
+        DailyUtilization.robot_name,
+        DailyUtilization.total_runtime_hours,
+        DailyUtilization.idle_hours,
+        DailyUtilization.utilization_percent,
+    ).where(DailyUtilization.date >= d_start, DailyUtilization.date <= d_end)
+    with (bind or get_read_engine()).connect() as conn:
+        return pd.read_sql(stmt, conn)
+
+
+def _overlaps(frame: pd.DataFrame, d_start: date, d_end: date) -> pd.Series:
+    """Rows of a job frame that load_jobs_frame(d_start, d_end) would return (same window)."""
+    t_start = pd.Timestamp(datetime.combine(d_start, datetime.min.time()))
+    t_end = pd.Timestamp(datetime.combine(d_end, datetime.max.time()))
+    return (frame["start_time"] < t_end) & (frame["end_time"] >= t_start)
+
+
+def _replace_window(base: pd.DataFrame, d_start: date, d_end: date, patch: pd.DataFrame) -> pd.DataFrame:
+    """Drop the jobs of `base` overlapping [d_start, d_end] and merge in `patch` (freshly loaded for that window)."""
+    kept = base[~_overlaps(base, d_start, d_end)]
+    if patch.empty:
+        return kept.reset_index(drop=True)
+    return _merge_frames(kept, patch)
+
+
+def _merge_frames(base: pd.DataFrame, patch: pd.DataFrame) -> pd.DataFrame:
+    """Union by job_key (patch wins), sorted by start_time, dtypes re-applied."""
+    if patch.empty:
+        return base
+    merged = pd.concat([base.astype({c: "object" for c in CATEGORY_COLUMNS if c in base.columns}),
+                        patch.astype({c: "object" for c in CATEGORY_COLUMNS if c in patch.columns})],
+                       ignore_index=True)
+    merged = merged.drop_duplicates("job_key", keep="last").sort_values("start_time", kind="stable")
+    return apply_job_dtypes(merged.reset_index(drop=True))
+
+
+class JobRangeCache:
+    """Superset job frame with binary-search slicing for contained date ranges (shared by all sessions)."""
+
+    def __init__(
+        self,
+        superset_days: int = SUPERSET_DAYS,
+        load: Callable[[date, date], pd.DataFrame] | None = None,
+        max_days: int = SUPERSET_MAX_DAYS,
+    ) -> None:
+        self.superset_days = superset_days
+        self.max_days = max_days
+        self._load = load or load_jobs_frame  # z. B. gefiltert über job_query.query_jobs
+        self._lock = threading.Lock()
+        self._frame: pd.DataFrame | None = None
+        self._from: date | None = None
+        self._to: date | None = None
+        self._generation = -1
+        self._starts: np.ndarray | None = None
+        self._max_duration = pd.Timedelta(0)
+
+    def _set(self, frame: pd.DataFrame, d_from: date, d_to: date) -> None:
+        self._frame = frame
+        self._from, self._to = d_from, d_to
+        self._starts = frame["start_time"].to_numpy()
+        dur = (frame["end_time"] - frame["start_time"]).max() if not frame.empty else pd.Timedelta(0)
+        self._max_duration = dur if pd.notna(dur) else pd.Timedelta(0)
+
+    def _refresh(self, d_start: date, d_end: date) -> bool:
+        """Bring the superset up to date and extend it to [d_start, d_end]; False if that would exceed max_days."""
+        gen = shared_cache.current_generation()
+        today = date.today()
+        default_from = today - timedelta(days=self.superset_days - 1)
+        if self._frame is None:
+            d_from, d_to = min(d_start, default_from), max(d_end, today)
+            if (d_to - d_from).days + 1 > self.max_days:
+                d_from, d_to = default_from, today
+            self._set(self._load(d_from, d_to), d_from, d_to)
+            self._generation = gen
+            return d_from <= d_start and d_end <= d_to
+        frame, d_from, d_to = self._frame, self._from, self._to
+        if gen != self._generation:
+            # Nur die geänderten Tage innerhalb des Supersets neu laden; deren Jobs werden ersetzt
+            changed = [
+                (max(lo, d_from), min(hi, d_to))
+                for lo, hi in shared_cache.changed_since(self._generation)
+                if lo <= d_to and hi >= d_from
+            ]
+            if changed:
+                lo = min(c[0] for c in changed)
+                hi = max(c[1] for c in changed)
+                frame = _replace_window(frame, lo, hi, self._load(lo, hi))
+            self._generation = gen
+        fits = (max(d_to, d_end) - min(d_from, d_start)).days + 1 <= self.max_days
+        if not fits and d_to < default_from:  # Superset liegt ganz vor dem Standardfenster: neu aufbauen
+            self._frame = None
+            return self._refresh(d_start, d_end)
+        if not fits and d_from < default_from:
+            # Superset zu groß: Tage vor dem Standardfenster verwerfen (frühere Sonderbereiche, Zeit vergangen)
+            frame = frame[_overlaps(frame, default_from, d_to)].reset_index(drop=True)
+            d_from = default_from
+            fits = (max(d_to, d_end) - min(d_from, d_start)).days + 1 <= self.max_days
+        if fits:
+            # Fehlende Ränder nachladen (eigener Bereich außerhalb des Supersets, neuer Tag)
+            if d_start < d_from:
+                frame = _merge_frames(frame, self._load(d_start, d_from - timedelta(days=1)))
+                d_from = d_start
+            if d_end > d_to:
+                frame = _merge_frames(frame, self._load(d_to + timedelta(days=1), d_end))
+                d_to = d_end
+        if frame is not self._frame or (d_from, d_to) != (self._from, self._to):
+            self._set(frame, d_from, d_to)
+        return fits
+
+    def get(self, d_start: date, d_end: date) -> pd.DataFrame:
+        """
+        Jobs overlapping [d_start, d_end]; a slice of the superset (callers must not mutate it).
+        Ranges that would grow the superset beyond max_days are loaded directly, not cached.
+        """
+        with self._lock:
+            cached = self._refresh(d_start, d_end)
+            frame, starts, max_dur = self._frame, self._starts, self._max_duration
+        if not cached:
+            return self._load(d_start, d_end)
+        t_start = pd.Timestamp(datetime.combine(d_start, datetime.min.time()))
+        t_end = pd.Timestamp(datetime.combine(d_end, datetime.max.time()))
+        # start_time < t_end; Jobs, die vor t_start starten, können höchstens max_dur vorher beginnen
+        hi = int(np.searchsorted(starts, t_end.to_datetime64(), side="left"))
+        lo = int(np.searchsorted(starts, (t_start - max_dur).to_datetime64(), side="left"))
+        window = frame.iloc[lo:hi]
+        return window[window["end_time"] >= t_start]
+
+    def seed(self, frame: pd.DataFrame, d_from: date, d_to: date, generation: int) -> None:
+        """Install a preloaded superset (e.g. from the cold-start snapshot) valid for `generation`."""
+        with self._lock:
+            if self._frame is None:
+                self._set(apply_job_dtypes(frame), d_from, d_to)
+                self._generation = generation
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frame = None
+            self._generation = -1
+
@@ -0,0 +1,83 @@
+"""
+Job queries from a typed filter spec, compiled into indexed SQL with column projection.
+
+A JobFilter names the date range and optionally robots, processes and states – as exact sets or
+case-insensitive substring patterns – plus the columns a caller needs. Patterns are resolved
+against the small dim_* tables first, so the jobs table is only filtered by its start_time
+window and integer IN lists on the indexed foreign keys (robot_key_id, process_id, state_id);
+only the projected columns leave the database. Archived jobs (job_archive) get the same filter
+by name, so a spec covers hot and cold ranges alike.
+
+    query_jobs({"date_from": d0, "date_to": d1, "process_pattern": "Ablehnen",
+                "columns": ["job_key", "start_time", "end_time", "state"]})
+"""
+from collections.abc import Collection
+from datetime import date
+from typing import TypedDict
+
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine
+
+from backend.database import get_read_engine
+from backend.services.job_loader import JOB_COLUMNS, dimension_table, load_jobs_frame
+
+
+class JobFilter(TypedDict, total=False):
+    date_from: date  # Pflicht: Jobs, die [date_from, date_to] überlappen
+    date_to: date
+    robots: Collection[str]  # robot_key (Host, sonst Robot-Name)
+    robot_pattern: str  # Teilstring von robot_key, z. B. "RPA-"
+    processes: Collection[str]
+    process_pattern: str  # Teilstring des Prozessnamens, z. B. "Ablehnen"
+    states: Collection[str]  # Successful, Faulted, Stopped, ...
+    columns: list[str]  # Teilmenge von JOB_COLUMNS (Standard: alle)
+
+
+SET_FIELDS = {"robots": "robot_key", "processes": "process_name", "states": "state"}
+PATTERN_FIELDS = {"robot_pattern": "robot_key", "process_pattern": "process_name"}
+
+
+def validate_filter(spec: JobFilter) -> None:
+    """Raise ValueError for a spec without date range, with unknown fields or unknown columns."""
+    unknown = set(spec) - set(JobFilter.__annotations__)
+    if unknown:
+        raise ValueError(f"Unbekannte Filterfelder: {', '.join(sorted(unknown))}")
+    if not isinstance(spec.get("date_from"), date) or not isinstance(spec.get("date_to"), date):
+        raise ValueError("date_from und date_to (date) sind Pflicht")
+    if spec["date_from"] > spec["date_to"]:
+        raise ValueError("date_from liegt nach date_to")
+    bad = [c for c in spec.get("columns") or [] if c not in JOB_COLUMNS]
+    if bad:
+        raise ValueError(f"Unbekannte Spalten: {', '.join(bad)}")
+    for field in SET_FIELDS:
+        if isinstance(spec.get(field), str):
+            raise ValueError(f"{field} muss eine Menge von Namen sein, kein String")
+
+
+def resolve_filter(spec: JobFilter, conn: Connection) -> dict[str, set[str]]:
+    """
+    {dimension column: allowed names} for job_loader.load_jobs_frame(match=...). Patterns become
+    the matching names of the dimension table (intersected with an explicit set of the same column).
+    """
+    match: dict[str, set[str]] = {}
+    for field, column in SET_FIELDS.items():
+        if spec.get(field) is not None:
+            match[column] = set(spec[field])
+    for field, column in PATTERN_FIELDS.items():
+        pattern = spec.get(field)
+        if not pattern:
+            continue
+        dim = dimension_table(column)
+        names = set(conn.execute(select(dim.name).where(dim.name.icontains(pattern, autoescape=True))).scalars())
+        match[column] = match[column] & names if column in match else names
+    return match
+
+
+def query_jobs(spec: JobFilter, bind: Engine | None = None) -> pd.DataFrame:
+    """Jobs matching `spec` as the job loader's typed DataFrame (only spec["columns"]), sorted by start_time."""
+    validate_filter(spec)
+    engine = bind or get_read_engine()
+    with engine.connect() as conn:
+        match = resolve_filter(spec, conn)
+    return load_jobs_frame(spec["date_from"], spec["date_to"], spec.get("columns"), bind=engine, match=match)
@@ -1,13 +1,15 @@
 """
 Quick Wins analysis: recurring idle patterns and underutilized time windows.
 """
-from collections import defaultdict
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta
 from typing import Any
 
+import pandas as pd
 from sqlalchemy.orm import Session
 
 from backend.database import Job
+from backend.services.idle_service import busy_intervals, busy_minutes_by_hour, job_pieces, jobs_frame
+from backend.services.schedule_optimizer import build_trigger_plan, idle_gaps_from_busy, process_duration_profiles
 
 EUR_PER_HOUR = 50.0
 WEEKS_PER_MONTH = 4.33
@@ -31,65 +33,52 @@ def _to_naive(dt: datetime | None) -> datetime | None:
     return dt
 
 
-def _robot_key(job: Job) -> str:
-    mn = (job.machine_name or "").strip()
-    rn = job.robot_name or "Unknown"
-    return mn if mn else rn
+def _analysis_days(days: int) -> list:
+    """The last `days` completed days, oldest first."""
+    end_date = datetime.now().date()
+    return [end_date - timedelta(days=days - i) for i in range(days)]
+
 
+def _rpa_busy(jobs: list[Job], days: int, merged: bool = True) -> pd.DataFrame:
+    """
+    Intervals (robot_key, day, start, end) of RPA-* robots over the last `days` completed days:
+    merged busy blocks, or with merged=False the jobs themselves clipped to the days.
+    """
+    frame = jobs_frame(jobs)
+    robots = [k for k in frame["robot_key"].unique() if "RPA-" in (k or "")]
+    analysed = _analysis_days(days)
+    return (busy_intervals if merged else job_pieces)(frame, robots, (analysed[0], analysed[-1]))
 
-def _job_overlaps_hour(start: datetime, end: datetime, day: datetime.date, hour: int) -> float:
-    """Return minutes of job runtime within the given day and hour (0-23)."""
-    day_start = datetime.combine(day, time(hour, 0, 0))
-    day_end = datetime.combine(day, time(hour, 59, 59, 999999))
-    s = max(start, day_start)
-    e = min(end, day_end)
-    if e <= s:
-        return 0.0
-    return (e - s).total_seconds() / 60.0
+
+def _rpa_runtime_by_hour(jobs: list[Job], days: int) -> pd.DataFrame:
+    """
+    Job runtime minutes per (robot, day, hour) for RPA-* robots over the last `days` completed
+    days; parallel jobs of a robot are summed, as the Quick-Wins thresholds were calibrated on.
+    """
+    return busy_minutes_by_hour(_rpa_busy(jobs, days, merged=False))
 
 
 def find_recurring_idle(jobs: list[Job], days: int) -> list[dict[str, Any]]:
     """
     Find time slots that are consistently idle (>= IDLE_DAYS_THRESHOLD days idle,
     and average idle duration in that hour > IDLE_AVG_MINUTES_THRESHOLD).
+    Runtime per hour is the summed job runtime (RPA-* only, see _rpa_runtime_by_hour).
     """
-    from datetime import date as date_type
-    # Filter RPA-* only and normalize to naive datetime
-    rpa_jobs: list[tuple[str, datetime, datetime]] = []
-    for j in jobs:
-        key = _robot_key(j)
-        if "RPA-" not in (key or ""):
-            continue
-        start = _to_naive(j.start_time)
-        end = _to_naive(j.end_time)
-        if start is None or end is None or end <= start:
-            continue
-        rpa_jobs.append((key, start, end))
-
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=days)
-    date_list = [start_date + timedelta(days=i) for i in range(days)]
-
-    # Per (robot, day, hour): runtime minutes in that hour
-    robot_hour_day_runtime: dict[str, dict[int, dict[date_type, float]]] = defaultdict(
-        lambda: defaultdict(lambda: defaultdict(float))
-    )
-    for robot, start, end in rpa_jobs:
-        for d in date_list:
-            for hour in range(24):
-                mins = _job_overlaps_hour(start, end, d, hour)
-                if mins > 0:
-                    robot_hour_day_runtime[robot][hour][d] += mins
-
+    by_hour = _rpa_runtime_by_hour(jobs, days)
     result: list[dict[str, Any]] = []
-    for robot in sorted(robot_hour_day_runtime.keys()):
+    if by_hour.empty:
+        return result
+    # Pro (Robot, Stunde): Laufzeit je Tag; Tage ohne Jobs in der Stunde = 60 min idle
+    runtime = by_hour.pivot_table(index=["robot_key", "hour"], columns="day", values="minutes", aggfunc="sum")
+    for robot in sorted(by_hour["robot_key"].unique()):
         for hour in range(24):
-            day_runtime = robot_hour_day_runtime[robot][hour]
+            if (robot, hour) in runtime.index:
+                day_runtime = runtime.loc[(robot, hour)].fillna(0.0).to_numpy()
+            else:
+                day_runtime = []
             # For each day in range: idle = 60 - runtime (0 if no jobs that day = 60 min idle)
-            idle_minutes_per_day: list[float] = []
-            for d in date_list:
-                runtime = day_runtime.get(d, 0.0)
-                idle_minutes_per_day.append(max(0.0, 60.0 - runtime))
+            idle_minutes_per_day = [max(0.0, 60.0 - r) for r in day_runtime]
+            idle_minutes_per_day += [60.0] * (days - len(idle_minutes_per_day))
             days_idle = sum(1 for idle in idle_minutes_per_day if idle >= IDLE_AVG_MINUTES_THRESHOLD)
             total_idle_min = sum(idle_minutes_per_day)
             avg_idle = total_idle_min / days if days > 0 else 0.0
@@ -99,6 +88,7 @@ def find_recurring_idle(jobs: list[Job], days: int) -> list[dict[str, Any]]:
                 priority = "HIGH" if impact_euro_month >= 1000 else "MEDIUM" if impact_euro_month >= 500 else "LOW"
                 result.append({
                     "robot": robot,
+                    "hour": hour,
                     "time_slot": f"{hour:02d}:00-{hour + 1:02d}:00",
                     "frequency": f"{days_idle} von {days} Tagen",
                     "avg_idle_minutes": round(avg_idle, 1),
@@ -111,34 +101,14 @@ def find_recurring_idle(jobs: list[Job], days: int) -> list[dict[str, Any]]:
 
 def find_underutilized_windows(jobs: list[Job], days: int) -> list[dict[str, Any]]:
     """Find broad time windows with utilization < 40%."""
-    rpa_jobs: list[tuple[datetime, datetime]] = []
-    for j in jobs:
-        key = _robot_key(j)
-        if "RPA-" not in (key or ""):
-            continue
-        start = _to_naive(j.start_time)
-        end = _to_naive(j.end_time)
-        if start is None or end is None or end <= start:
-            continue
-        rpa_jobs.append((start, end))
-
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=days)
-    date_list = [start_date + timedelta(days=i) for i in range(days)]
+    by_hour = _rpa_runtime_by_hour(jobs, days)
 
     result: list[dict[str, Any]] = []
     for window_name, (h_start, h_end) in WINDOWS.items():
         window_hours = h_end - h_start
         available_robot_hours = 2 * window_hours * days
-        runtime_minutes = 0.0
-        for start, end in rpa_jobs:
-            for d in date_list:
-                day_start = datetime.combine(d, time(h_start, 0, 0))
-                day_end = datetime.combine(d, time(h_end - 1, 59, 59, 999999)) if h_end <= 24 else datetime.combine(d, time(23, 59, 59, 999999))
-                s = max(start, day_start)
-                e = min(end, day_end)
-                if e > s:
-                    runtime_minutes += (e - s).total_seconds() / 60.0
+        in_window = by_hour[(by_hour["hour"] >= h_start) & (by_hour["hour"] < h_end)] if not by_hour.empty else by_hour
+        runtime_minutes = float(in_window["minutes"].sum()) if not in_window.empty else 0.0
         runtime_hours = runtime_minutes / 60.0
         utilization = runtime_hours / available_robot_hours if available_robot_hours > 0 else 0.0
         if utilization < WINDOW_UTILIZATION_TARGET:
@@ -182,7 +152,8 @@ def _process_avg_durations_minutes(jobs: list[Job]) -> list[tuple[str, float]]:
 def analyze_quickwins(db: Session, days: int = 7) -> dict[str, Any]:
     """
     Analyze last N days for optimization opportunities.
-    Returns recurring_idle, underutilized_windows, totals, impact, and suggested processes per slot.
+    Returns recurring_idle, underutilized_windows, totals, impact, suggested processes per slot
+    and a packed trigger_plan (see schedule_optimizer).
     """
     end_date = datetime.now().date()
     start_date = end_date - timedelta(days=days)
@@ -207,7 +178,7 @@ def analyze_quickwins(db: Session, days: int = 7) -> dict[str, Any]:
         db.query(Job)
         .filter(
             Job.end_time.isnot(None),
-            Job.process_name.isnot(None),
+            Job.process_id.isnot(None),
             Job.start_time < t_end,
             Job.end_time >= t_start_dur,
         )
@@ -232,6 +203,12 @@ def analyze_quickwins(db: Session, days: int = 7) -> dict[str, Any]:
         fitting = [(name, round(dur, 1)) for name, dur in process_durations if 1 <= dur <= window_max_min][:max_suggestions]
         u["suggested_processes"] = fitting if fitting else [(name, round(dur, 1)) for name, dur in process_durations[:max_suggestions]]
 
+    # Konkreter Trigger-Plan: welche Prozesse passen gemeinsam (p95) in welche gemessene Idle-Lücke welches Robots
+    profiles = process_duration_profiles(jobs_for_durations) or process_duration_profiles(jobs)
+    gaps = idle_gaps_from_busy(_rpa_busy(jobs, days), _analysis_days(days), IDLE_DAYS_THRESHOLD)
+    trigger_plan = build_trigger_plan(gaps, profiles)
+    trigger_plan["impact_euro_month"] = round(trigger_plan["recovered_hours_week"] * WEEKS_PER_MONTH * EUR_PER_HOUR, 0)
+
     total_hours = sum(r["potential_hours_week"] for r in recurring) + sum(u["potential_hours_week"] for u in underutilized)
     total_impact = total_hours * WEEKS_PER_MONTH * EUR_PER_HOUR
 
@@ -240,4 +217,5 @@ def analyze_quickwins(db: Session, days: int = 7) -> dict[str, Any]:
         "underutilized_windows": sorted(underutilized, key=lambda x: x["impact_euro_month"], reverse=True),
         "total_potential_hours_week": round(total_hours, 1),
         "total_impact_euro_month": round(total_impact, 0),
+        "trigger_plan": trigger_plan,
     }
@@ -0,0 +1,165 @@
+"""
+Runtime regression detection per process: streaming CUSUM over durations and failure rate.
+
+Runs after each sync and only reads jobs that finished after their process's watermark
+(process_runtime_state.last_end_time, per process, so a job of one process synced late is not
+skipped because another process already saw later jobs); the detector state (reference
+mean/variance, recent EWMA, CUSUM sums) lives in process_runtime_state, so history is never
+rescanned. Flags are written to process_regression_flags.
+
+- Laufzeit: z = (x - ref_mean) / ref_sd, S = max(0, S + z - K); Flag bei S > H und
+  recent_duration >= ref_mean * (1 + MIN_SLOWDOWN).
+- Fehlerrate (Bernoulli-CUSUM): S = max(0, S + x - ref_rate - FAIL_K); Flag bei S > FAIL_H.
+Die Referenz lernt langsam nach (nur solange S < H/2) und wird nach einem Flag neu gesetzt.
+"""
+import logging
+import math
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from backend.database import DimProcess, Job, ProcessRegressionFlag, ProcessRuntimeState
+
+logger = logging.getLogger(__name__)
+
+WARMUP_RUNS = 20
+REF_ALPHA = 0.01
+RECENT_ALPHA = 0.2
+CUSUM_K = 0.5
+CUSUM_H = 5.0
+MIN_SLOWDOWN = 0.10  # mind. +10 % ggü. Referenz
+MIN_REL_SD = 0.05  # sd mind. 5 % des Mittels (sonst flaggen Prozesse mit konstanter Dauer bei jeder Sekunde)
+FAILED_STATES = {"Faulted"}
+FAIL_REF_ALPHA = 0.02
+FAIL_K = 0.10  # halbe zu erkennende Erhöhung (+20 Prozentpunkte)
+FAIL_H = 3.0
+
+
+def _to_naive(dt: datetime | None) -> datetime | None:
+    if dt is None:
+        return None
+    if hasattr(dt, "tzinfo") and dt.tzinfo:
+        return dt.replace(tzinfo=None)
+    return dt
+
+
+def _new_state(name: str) -> ProcessRuntimeState:
+    return ProcessRuntimeState(
+        process_name=name, n_runs=0,
+        ref_duration_mean=0.0, ref_duration_var=0.0, recent_duration=0.0, cusum_duration=0.0,
+        ref_fail_rate=0.0, recent_fail_rate=0.0, cusum_fail=0.0, last_end_time=None,
+    )
+
+
+def _observe(st: ProcessRuntimeState, job: Job, duration: float) -> list[dict[str, Any]]:
+    """Update one process state with one finished job; return new flags (as dicts)."""
+    flags: list[dict[str, Any]] = []
+    failed = 1.0 if (job.state or "") in FAILED_STATES else 0.0
+    st.n_runs += 1
+    n = st.n_runs
+    st.recent_duration = duration if n == 1 else st.recent_duration + RECENT_ALPHA * (duration - st.recent_duration)
+    st.recent_fail_rate = failed if n == 1 else st.recent_fail_rate + RECENT_ALPHA * (failed - st.recent_fail_rate)
+
+    if n <= WARMUP_RUNS:
+        # Welford: Referenz aus den ersten Läufen
+        delta = duration - st.ref_duration_mean
+        st.ref_duration_mean += delta / n
+        st.ref_duration_var += (delta * (duration - st.ref_duration_mean) - st.ref_duration_var) / n
+        st.ref_fail_rate += (failed - st.ref_fail_rate) / n
+        return flags
+
+    sd = max(math.sqrt(max(st.ref_duration_var, 0.0)), MIN_REL_SD * st.ref_duration_mean, 1.0)
+    z = (duration - st.ref_duration_mean) / sd
+    st.cusum_duration = max(0.0, st.cusum_duration + z - CUSUM_K)
+    if st.cusum_duration > CUSUM_H and st.recent_duration >= st.ref_duration_mean * (1 + MIN_SLOWDOWN):
+        flags.append({
+            "kind": "slowdown",
+            "baseline_value": st.ref_duration_mean,
+            "current_value": st.recent_duration,
+            "change_percent": (st.recent_duration / st.ref_duration_mean - 1) * 100 if st.ref_duration_mean else None,
+        })
+        st.ref_duration_mean = st.recent_duration
+        st.cusum_duration = 0.0
+    elif st.cusum_duration < CUSUM_H / 2:
+        delta = duration - st.ref_duration_mean
+        st.ref_duration_mean += REF_ALPHA * delta
+        st.ref_duration_var = (1 - REF_ALPHA) * (st.ref_duration_var + REF_ALPHA * delta * delta)
+
+    st.cusum_fail = max(0.0, st.cusum_fail + failed - st.ref_fail_rate - FAIL_K)
+    if st.cusum_fail > FAIL_H:
+        flags.append({
+            "kind": "failure_rate",
+            "baseline_value": st.ref_fail_rate,
+            "current_value": st.recent_fail_rate,
+            "change_percent": (st.recent_fail_rate - st.ref_fail_rate) * 100,  # Prozentpunkte
+        })
+        st.ref_fail_rate = st.recent_fail_rate
+        st.cusum_fail = 0.0
+    elif st.cusum_fail < FAIL_H / 2:
+        st.ref_fail_rate += FAIL_REF_ALPHA * (failed - st.ref_fail_rate)
+    return flags
+
+
+def update_regressions(db: Session) -> int:
+    """
+    Feed all jobs finished after their process's watermark into the per-process detectors.
+    Commits state and new flags; returns number of new flags.
+    """
+    states = {s.process_name: s for s in db.query(ProcessRuntimeState).all()}
+    watermark = (
+        select(ProcessRuntimeState.last_end_time)
+        .join(DimProcess, DimProcess.name == ProcessRuntimeState.process_name)
+        .where(DimProcess.id == Job.process_id)
+        .scalar_subquery()
+    )
+    q = db.query(Job).filter(
+        Job.end_time.isnot(None),
+        Job.process_id.isnot(None),
+        or_(watermark.is_(None), Job.end_time > watermark),
+    )
+    new_flags = 0
+    for job in q.order_by(Job.end_time).yield_per(1000):
+        name = (job.process_name or "").strip()
+        start = _to_naive(job.start_time)
+        end = _to_naive(job.end_time)
+        if not name or start is None or end is None or end <= start:
+            continue
+        st = states.get(name)
+        if st is None:
+            st = _new_state(name)
+            states[name] = st
+            db.add(st)
+        last = _to_naive(st.last_end_time)
+        if last is not None and end <= last:
+            continue
+        for flag in _observe(st, job, (end - start).total_seconds()):
+            db.add(ProcessRegressionFlag(process_name=name, detected_at=end, job_key=job.job_key, **flag))
+            new_flags += 1
+        st.last_end_time = end
+    db.commit()
+    if new_flags:
+        logger.info("Regression detection: %d new flags", new_flags)
+    return new_flags
+
+
+def recent_flags(db: Session, since: datetime) -> list[dict[str, Any]]:
+    """Flags detected since `since`, newest first."""
+    rows = (
+        db.query(ProcessRegressionFlag)
+        .filter(ProcessRegressionFlag.detected_at >= since)
+        .order_by(ProcessRegressionFlag.detected_at.desc())
+        .all()
+    )
+    return [
+        {
+            "process_name": r.process_name,
+            "kind": r.kind,
+            "detected_at": r.detected_at,
+            "baseline_value": r.baseline_value,
+            "current_value": r.current_value,
+            "change_percent": r.change_percent,
+        }
+        for r in rows
+    ]
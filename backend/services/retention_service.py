@@ -0,0 +1,229 @@
+"""
+Retention and compaction: purge old rows in batches, keep rollups, give the space back.
+
+Policies in days (0 = keep forever), from the environment:
+  RETENTION_JOBS_DAYS         raw jobs (CLI default 180; after a sync only if set)
+  RETENTION_SYNC_RUNS_DAYS    finished sync_runs (30)
+  RETENTION_GENERATIONS_DAYS  data_generations, newest row always kept (30)
+  RETENTION_FLAGS_DAYS        process_regression_flags (365)
+  RETENTION_UTILIZATION_DAYS  daily_utilization (0)
+
+Before raw jobs of a day are purged, the day is rolled up into daily_process_stats (runs,
+successes, runtime per process and robot; daily_utilization already is the per-robot rollup),
+so process trends keep working for purged days. Deletes run in batches of RETENTION_BATCH_ROWS,
+each committed on its own; afterwards freed pages are released with incremental vacuum (a DB
+created before auto_vacuum was enabled is converted once by a full VACUUM). Every run is
+recorded in retention_runs with the bytes reclaimed; calculate_utilization leaves days before
+the jobs horizon untouched.
+"""
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Callable
+
+import pandas as pd
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from backend.database import (
+    DailyProcessStats,
+    DailyUtilization,
+    DataGeneration,
+    Job,
+    ProcessRegressionFlag,
+    RetentionRun,
+    RunsSessionLocal,
+    SessionLocal,
+    SyncRunRecord,
+    record_data_generation,
+    release_space,
+)
+from backend.services.job_loader import load_jobs_frame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DAYS = 180
+MIN_JOBS_DAYS = 90  # Sync und Job-Cache arbeiten auf den letzten 90 Tagen
+BATCH_ROWS = int(os.getenv("RETENTION_BATCH_ROWS", "5000"))
+ROLLUP_CHUNK_DAYS = 31
+
+
+def _env_days(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def default_policy(jobs_days: int | None = None) -> dict[str, int]:
+    """Retention per table in days (0 = keep); jobs_days overrides RETENTION_JOBS_DAYS."""
+    return {
+        "jobs": jobs_days if jobs_days is not None else _env_days("RETENTION_JOBS_DAYS", 0),
+        "sync_runs": _env_days("RETENTION_SYNC_RUNS_DAYS", 30),
+        "data_generations": _env_days("RETENTION_GENERATIONS_DAYS", 30),
+        "regression_flags": _env_days("RETENTION_FLAGS_DAYS", 365),
+        "daily_utilization": _env_days("RETENTION_UTILIZATION_DAYS", 0),
+    }
+
+
+def jobs_horizon(db: Session | None = None) -> date | None:
+    """First day whose raw jobs are still complete after retention; None if never purged."""
+    own = db is None
+    db = db or SessionLocal()
+    try:
+        return db.execute(select(func.max(RetentionRun.jobs_horizon))).scalar()
+    finally:
+        if own:
+            db.close()
+
+
+def _file_bytes(db: Session) -> int:
+    conn = db.connection()
+    return conn.exec_driver_sql("PRAGMA page_size").scalar() * conn.exec_driver_sql("PRAGMA page_count").scalar()
+
+
+def _purge(db: Session, model: Any, *conditions: Any) -> int:
+    """Delete matching rows in batches of BATCH_ROWS, one commit per batch. Returns rows deleted."""
+    pk = model.__table__.primary_key.columns.values()[0]
+    total = 0
+    while True:
+        batch = select(pk).where(*conditions).limit(BATCH_ROWS)
+        n = db.execute(delete(model).where(pk.in_(batch))).rowcount or 0
+        db.commit()
+        total += n
+        if n < BATCH_ROWS:
+            return total
+
+
+def rollup_process_days(db: Session, d_from: date, d_to: date) -> int:
+    """
+    (Re)build daily_process_stats for [d_from, d_to] from the raw jobs (hot DB + archive),
+    grouped by job start day. Returns the number of days with jobs.
+    """
+    days = 0
+    chunk_start = d_from
+    while chunk_start <= d_to:
+        chunk_end = min(d_to, chunk_start + timedelta(days=ROLLUP_CHUNK_DAYS - 1))
+        df = load_jobs_frame(
+            chunk_start, chunk_end, ["process_name", "robot_key", "start_time", "end_time", "state"], bind=db.get_bind()
+        )
+        db.execute(delete(DailyProcessStats).where(DailyProcessStats.date >= chunk_start, DailyProcessStats.date <= chunk_end))
+        if not df.empty:
+            df = df[(df["start_time"].dt.date >= chunk_start) & (df["start_time"].dt.date <= chunk_end)]
+            minutes = (df["end_time"] - df["start_time"]).dt.total_seconds() / 60.0
+            agg = (
+                df.assign(
+                    day=df["start_time"].dt.date,
+                    process_name=df["process_name"].astype(str),
+                    robot_key=df["robot_key"].astype(str),
+                    ok=(df["state"] == "Successful").astype(int),
+                    faulted=(df["state"] == "Faulted").astype(int),
+                    minutes=minutes.clip(lower=0),
+                )
+                .groupby(["day", "process_name", "robot_key"], observed=True)
+                .agg(runs=("ok", "size"), successful=("ok", "sum"), faulted=("faulted", "sum"),
+                     total=("minutes", "sum"), longest=("minutes", "max"))
+                .reset_index()
+            )
+            db.add_all([
+                DailyProcessStats(
+                    date=r.day, process_name=r.process_name, robot_key=r.robot_key, runs=int(r.runs),
+                    successful=int(r.successful), faulted=int(r.faulted),
+                    total_runtime_minutes=float(r.total), max_runtime_minutes=float(r.longest),
+                )
+                for r in agg.itertuples(index=False)
+            ])
+            days += agg["day"].nunique()
+        db.commit()
+        chunk_start = chunk_end + timedelta(days=1)
+    return days
+
+
+def apply_retention(
+    policy: dict[str, int] | None = None,
+    session_factory: Callable[[], Session] | None = None,
+) -> dict[str, Any]:
+    """
+    Apply `policy` (default_policy()) to the DB behind session_factory (e.g. the staging generation).
+    Returns the report: horizon, rolled_up_days, deleted rows per table, bytes before/after/reclaimed.
+    """
+    policy = policy or default_policy()
+    if 0 < policy["jobs"] < MIN_JOBS_DAYS:
+        raise ValueError(f"Rohdaten-Jobs müssen mindestens {MIN_JOBS_DAYS} Tage behalten werden")
+    today = date.today()
+    db = (session_factory or SessionLocal)()
+    try:
+        bytes_before = _file_bytes(db)
+        deleted: dict[str, int] = {}
+        horizon = previous = jobs_horizon(db)
+        rolled_up = 0
+        if policy["jobs"]:
+            horizon = today - timedelta(days=policy["jobs"])
+            if previous is not None and previous > horizon:
+                horizon = previous
+            t_cut = datetime.combine(horizon, datetime.min.time())
+            first = db.execute(select(func.min(Job.start_time)).where(Job.start_time < t_cut)).scalar()
+            if first is not None:
+                # Erst verdichten, dann löschen; Tage ab dem alten Horizont sind noch vollständig
+                d_from = pd.Timestamp(first).date()
+                if previous is not None:
+                    d_from = max(d_from, previous)
+                rolled_up = rollup_process_days(db, d_from, horizon - timedelta(days=1))
+            deleted["jobs"] = _purge(db, Job, Job.start_time < t_cut, Job.end_time < t_cut)
+            if deleted["jobs"] and first is not None:
+                # Caches (Job-Cache, Ergebnis-Cache) für die gelöschten Tage invalidieren
+                record_data_generation(db, "retention", {d_from, horizon - timedelta(days=1)})
+                db.commit()
+        if policy["sync_runs"]:
+            cut = datetime.now() - timedelta(days=policy["sync_runs"])
+            runs_db = RunsSessionLocal()  # eigene Datei, nicht Teil der Generation
+            try:
+                deleted["sync_runs"] = _purge(runs_db, SyncRunRecord, SyncRunRecord.status != "running", SyncRunRecord.started_at < cut)
+            finally:
+                runs_db.close()
+        if policy["data_generations"]:
+            cut = datetime.now() - timedelta(days=policy["data_generations"])
+            newest = db.execute(select(func.max(DataGeneration.id))).scalar() or 0
+            deleted["data_generations"] = _purge(db, DataGeneration, DataGeneration.created_at < cut, DataGeneration.id < newest)
+        if policy["regression_flags"]:
+            cut = datetime.now() - timedelta(days=policy["regression_flags"])
+            deleted["regression_flags"] = _purge(db, ProcessRegressionFlag, ProcessRegressionFlag.detected_at < cut)
+        if policy["daily_utilization"]:
+            cut = today - timedelta(days=policy["daily_utilization"])
+            deleted["daily_utilization"] = _purge(db, DailyUtilization, DailyUtilization.date < cut)
+        vacuum = release_space(db) if any(n for k, n in deleted.items() if k != "sync_runs") else None
+        bytes_after = _file_bytes(db)
+        n_other = sum(n for k, n in deleted.items() if k != "jobs")
+        db.add(RetentionRun(
+            run_at=datetime.now(), jobs_horizon=horizon, rolled_up_days=rolled_up,
+            deleted_jobs=deleted.get("jobs", 0), deleted_other=n_other,
+            bytes_before=bytes_before, bytes_after=bytes_after,
+        ))
+        db.commit()
+        report = {
+            "horizon": horizon,
+            "rolled_up_days": rolled_up,
+            "deleted": deleted,
+            "vacuum": vacuum,
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "bytes_reclaimed": max(0, bytes_before - bytes_after),
+        }
+        logger.info("Retention: %s", report)
+        return report
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def process_daily_rollup(db: Session, process_name: str, d_start: date, d_end: date) -> pd.DataFrame:
+    """daily_process_stats of one process summed over robots: DataFrame[date, runs, success]."""
+    rows = db.execute(
+        select(DailyProcessStats.date, func.sum(DailyProcessStats.runs), func.sum(DailyProcessStats.successful))
+        .where(
+            DailyProcessStats.process_name == process_name,
+            DailyProcessStats.date >= d_start,
+            DailyProcessStats.date <= d_end,
+        )
+        .group_by(DailyProcessStats.date)
+    ).all()
+    return pd.DataFrame(rows, columns=["date", "runs", "success"])
@@ -0,0 +1,230 @@
+"""
+Schedule packing for Quick Wins: fits candidate processes into recurring idle gaps per robot.
+
+Gaps are measured idle intervals: per robot and minute of the day, the analysed days on which
+the robot had no job at that minute are counted (merged busy intervals of idle_service); runs
+of minutes idle on at least min_idle_days days form a gap. Each process is described by its
+p50/p95 runtime; a process fits into a gap if its p95 (worst case) fits into the remaining
+minutes, and triggers are laid out back to back from the gap start, so every planned run
+including its worst case lies inside the measured idle interval. The objective is the recovered
+robot time (sum of p50). Small instances are solved exactly (branch & bound), larger ones with
+best-fit decreasing.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from backend.database import Job
+
+MINUTES_PER_DAY = 24 * 60
+MIN_GAP_MINUTES = 15
+MIN_RUNS_FOR_PROFILE = 3
+MIN_PROCESS_MINUTES = 1.0
+EXACT_MAX_ITEMS = 12
+EXACT_MAX_GAPS = 6
+EXACT_MAX_NODES = 200_000
+
+
+def _to_naive(dt: datetime | None) -> datetime | None:
+    if dt is None:
+        return None
+    if hasattr(dt, "tzinfo") and dt.tzinfo:
+        return dt.replace(tzinfo=None)
+    return dt
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..1) of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def process_duration_profiles(jobs: list[Job]) -> list[dict[str, Any]]:
+    """Pro Prozess: runs, p50 und p95 der Dauer in Minuten (nur Prozesse mit genug Läufen)."""
+    by_process: dict[str, list[float]] = defaultdict(list)
+    for j in jobs:
+        name = (j.process_name or "").strip()
+        start = _to_naive(j.start_time)
+        end = _to_naive(j.end_time)
+        if not name or start is None or end is None or end <= start:
+            continue
+        by_process[name].append((end - start).total_seconds() / 60.0)
+    profiles: list[dict[str, Any]] = []
+    for name, durs in by_process.items():
+        if len(durs) < MIN_RUNS_FOR_PROFILE:
+            continue
+        durs.sort()
+        p50 = _percentile(durs, 0.50)
+        p95 = _percentile(durs, 0.95)
+        if p50 < MIN_PROCESS_MINUTES:
+            continue
+        profiles.append({"process_name": name, "runs": len(durs), "p50": p50, "p95": max(p50, p95)})
+    profiles.sort(key=lambda p: p["p50"], reverse=True)
+    return profiles
+
+
+def _clock(minute: int) -> str:
+    """Minute of the day -> "HH:MM" (24:00 as 00:00)."""
+    minute %= MINUTES_PER_DAY
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def idle_gaps_from_busy(busy: pd.DataFrame, days: list, min_idle_days: int) -> list[dict[str, Any]]:
+    """
+    Recurring idle intervals per robot from merged busy blocks (robot_key, day, start, end):
+    runs of at least MIN_GAP_MINUTES minutes of the day that were idle on >= min_idle_days of
+    `days`. Returns gaps with robot, start_minute, end_minute and capacity_minutes.
+    """
+    gaps: list[dict[str, Any]] = []
+    if busy.empty or not days:
+        return gaps
+    day_index = {pd.Timestamp(d): i for i, d in enumerate(days)}
+    for robot, blocks in busy.groupby("robot_key", sort=True):
+        grid = np.zeros((len(days), MINUTES_PER_DAY), dtype=bool)
+        for day, start, end in zip(blocks["day"], blocks["start"], blocks["end"]):
+            row = day_index.get(pd.Timestamp(day).normalize())
+            if row is None:
+                continue
+            midnight = pd.Timestamp(day).normalize()
+            m0 = int((pd.Timestamp(start) - midnight) // pd.Timedelta(minutes=1))
+            m1 = int(-(-(pd.Timestamp(end) - midnight) // pd.Timedelta(minutes=1)))  # angebrochene Minute belegt
+            grid[row, max(0, m0):min(MINUTES_PER_DAY, m1)] = True
+        idle = (len(days) - grid.sum(axis=0)) >= min_idle_days
+        # Läufe zusammenhängender Idle-Minuten
+        edges = np.diff(np.concatenate(([0], idle.astype(np.int8), [0])))
+        for m0, m1 in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+            if m1 - m0 >= MIN_GAP_MINUTES:
+                gaps.append({
+                    "robot": str(robot), "start_minute": int(m0), "end_minute": int(m1), "capacity_minutes": float(m1 - m0),
+                })
+    return gaps
+
+
+def _pack_greedy(sizes: list[float], values: list[float], capacities: list[float]) -> list[int]:
+    """Best-fit decreasing by value: assign each item to the fitting gap with least remaining room."""
+    remaining = list(capacities)
+    assignment = [-1] * len(sizes)
+    for i in sorted(range(len(sizes)), key=lambda k: values[k], reverse=True):
+        best = -1
+        for g, room in enumerate(remaining):
+            if sizes[i] <= room and (best < 0 or room < remaining[best]):
+                best = g
+        if best >= 0:
+            remaining[best] -= sizes[i]
+            assignment[i] = best
+    return assignment
+
+
+def _pack_exact(
+    sizes: list[float], values: list[float], capacities: list[float], incumbent: list[int]
+) -> tuple[list[int], bool]:
+    """
+    Branch & bound over (item -> gap | skip). Bound: fractional knapsack over the total remaining
+    capacity. Returns (assignment, proven_optimal); stops at EXACT_MAX_NODES with the best found.
+    """
+    n = len(sizes)
+    order = sorted(range(n), key=lambda k: values[k] / sizes[k], reverse=True)
+    best_assign = list(incumbent)
+    best_value = sum(values[i] for i in range(n) if incumbent[i] >= 0)
+    current = [-1] * n
+    remaining = list(capacities)
+    nodes = 0
+    exhausted = False
+
+    def bound(pos: int, value: float) -> float:
+        room = sum(remaining)
+        for k in order[pos:]:
+            if sizes[k] <= room:
+                room -= sizes[k]
+                value += values[k]
+            else:
+                return value + values[k] * room / sizes[k]
+        return value
+
+    def search(pos: int, value: float) -> None:
+        nonlocal best_value, best_assign, nodes, exhausted
+        nodes += 1
+        if nodes > EXACT_MAX_NODES:
+            exhausted = True
+            return
+        if value > best_value:
+            best_value = value
+            best_assign = list(current)
+        if pos == n or bound(pos, value) <= best_value + 1e-9:
+            return
+        i = order[pos]
+        tried: set[float] = set()
+        for g in range(len(remaining)):
+            room = remaining[g]
+            # Gaps mit identischer Restkapazität sind austauschbar – nur einmal probieren
+            if sizes[i] > room or room in tried:
+                continue
+            tried.add(room)
+            remaining[g] -= sizes[i]
+            current[i] = g
+            search(pos + 1, value + values[i])
+            current[i] = -1
+            remaining[g] += sizes[i]
+        search(pos + 1, value)
+
+    search(0, 0.0)
+    return best_assign, not exhausted
+
+
+def build_trigger_plan(gaps: list[dict[str, Any]], profiles: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Pack processes (each at most once per day) into measured idle gaps (idle_gaps_from_busy).
+    Returns plan rows (robot, trigger time, process, p50/p95), recovered hours/week and solver info.
+    """
+    items = [p for p in profiles if np.ceil(p["p95"]) <= max((g["capacity_minutes"] for g in gaps), default=0.0)]
+    empty = {
+        "plan": [],
+        "recovered_hours_week": 0.0,
+        "solver": "none",
+        "optimal": True,
+    }
+    if not gaps or not items:
+        return empty
+
+    sizes = [float(np.ceil(p["p95"])) for p in items]  # ganze Minuten: Trigger liegen auf Minuten
+    values = [p["p50"] for p in items]
+    capacities = [g["capacity_minutes"] for g in gaps]
+    assignment = _pack_greedy(sizes, values, capacities)
+    solver, optimal = "greedy", False
+    if len(items) <= EXACT_MAX_ITEMS and len(gaps) <= EXACT_MAX_GAPS:
+        assignment, optimal = _pack_exact(sizes, values, capacities, assignment)
+        solver = "exact"
+
+    plan: list[dict[str, Any]] = []
+    for g_idx, gap in enumerate(gaps):
+        assigned = [i for i, g in enumerate(assignment) if g == g_idx]
+        # Längste zuerst: der Worst-Case-Puffer liegt am Ende des Gaps
+        assigned.sort(key=lambda i: sizes[i], reverse=True)
+        offset = 0.0
+        for i in assigned:
+            trigger_min = gap["start_minute"] + int(offset)
+            plan.append({
+                "robot": gap["robot"],
+                "gap": f"{_clock(gap['start_minute'])}-{_clock(gap['end_minute'])}",
+                "trigger_time": _clock(trigger_min),
+                "process_name": items[i]["process_name"],
+                "p50_minutes": round(values[i], 1),
+                "p95_minutes": round(items[i]["p95"], 1),
+            })
+            offset += sizes[i]
+    plan.sort(key=lambda r: (r["robot"], r["trigger_time"]))
+
+    recovered_hours_week = sum(values[i] for i, g in enumerate(assignment) if g >= 0) * 7 / 60.0
+    return {
+        "plan": plan,
+        "recovered_hours_week": round(recovered_hours_week, 1),
+        "solver": solver,
+        "optimal": optimal,
+    }
@@ -0,0 +1,200 @@
+"""
+What-if simulation for robot capacity: replays the stored job history as a discrete-event model.
+
+Historical jobs arrive at their original start time with their original duration. A job runs on its
+original robot if that robot exists and is free, otherwise on any free robot, otherwise it waits in a
+global FIFO queue (like an unattended folder in Orchestrator). Scenarios can add/remove robots and
+inject additional scheduled processes whose durations are sampled from the empirical distribution.
+
+Arrivals are pre-sorted once per history; only finish events live in the heap (size <= robots), so
+one run is O(n log r). run_scenarios() loads the history once and evaluates many scenarios on it.
+"""
+import heapq
+import random
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from backend.database import Job
+
+SIM_ROBOT_PREFIX = "SIM-ROBOT-"
+
+
+def _to_naive(dt: datetime | None) -> datetime | None:
+    if dt is None:
+        return None
+    if hasattr(dt, "tzinfo") and dt.tzinfo:
+        return dt.replace(tzinfo=None)
+    return dt
+
+
+def load_history(db: Session, days: int = 30, robots: set[str] | None = None) -> dict[str, Any]:
+    """
+    Load the last `days` full days of finished jobs as simulation input.
+    Returns start/end of the horizon, robots, sorted arrivals (offset_sec, duration_sec, robot, process)
+    and per-process empirical durations in seconds.
+    """
+    end_date = datetime.now().date()
+    t_start = datetime.combine(end_date - timedelta(days=days), datetime.min.time())
+    t_end = datetime.combine(end_date, datetime.min.time())
+    jobs = (
+        db.query(Job)
+        .filter(Job.end_time.isnot(None), Job.start_time >= t_start, Job.start_time < t_end)
+        .order_by(Job.start_time)
+        .all()
+    )
+    arrivals: list[tuple[float, float, str, str]] = []
+    durations: dict[str, list[float]] = {}
+    robot_set: set[str] = set()
+    for j in jobs:
+        start = _to_naive(j.start_time)
+        end = _to_naive(j.end_time)
+        if start is None or end is None or end <= start:
+            continue
+        key = j.robot_key
+        if robots is not None and key not in robots:
+            continue
+        dur = (end - start).total_seconds()
+        name = (j.process_name or "").strip()
+        arrivals.append(((start - t_start).total_seconds(), dur, key, name))
+        durations.setdefault(name, []).append(dur)
+        robot_set.add(key)
+    arrivals.sort(key=lambda a: a[0])
+    return {
+        "start": t_start,
+        "end": t_end,
+        "horizon_sec": (t_end - t_start).total_seconds(),
+        "robots": sorted(robots if robots is not None else robot_set),
+        "arrivals": arrivals,
+        "durations": durations,
+    }
+
+
+def _injected_arrivals(
+    history: dict[str, Any], extra: dict[str, Any], rng: random.Random
+) -> list[tuple[float, float, str, str]]:
+    """
+    Arrivals of an injected process: runs_per_day triggers from start_hour every interval_minutes
+    (default: evenly spread over the day). Duration fixed (duration_minutes) or sampled from history.
+    """
+    name = extra["process_name"]
+    runs_per_day = max(1, int(extra.get("runs_per_day", 1)))
+    start_min = float(extra.get("start_hour", 0)) * 60.0
+    interval_min = float(extra.get("interval_minutes") or 24 * 60 / runs_per_day)
+    fixed = extra.get("duration_minutes")
+    sample = history["durations"].get(name) or []
+    if fixed is None and not sample:
+        raise ValueError(f"Keine Laufzeiten für Prozess '{name}' – duration_minutes angeben.")
+    days = int(history["horizon_sec"] // 86400)
+    out: list[tuple[float, float, str, str]] = []
+    for d in range(days):
+        for k in range(runs_per_day):
+            t = d * 86400.0 + (start_min + k * interval_min) * 60.0
+            if t >= history["horizon_sec"]:
+                continue
+            dur = float(fixed) * 60.0 if fixed is not None else rng.choice(sample)
+            out.append((t, dur, "", name))
+    return out
+
+
+def simulate(history: dict[str, Any], scenario: dict[str, Any] | None = None, seed: int = 0) -> dict[str, Any]:
+    """
+    Run one scenario over a loaded history.
+    scenario keys (all optional): name, add_robots (int), remove_robots (list[str]),
+    extra_processes (list of {process_name, runs_per_day, start_hour, interval_minutes, duration_minutes}).
+    """
+    scenario = scenario or {}
+    rng = random.Random(seed)
+    removed = set(scenario.get("remove_robots") or [])
+    robots = [r for r in history["robots"] if r not in removed]
+    robots += [f"{SIM_ROBOT_PREFIX}{i + 1}" for i in range(int(scenario.get("add_robots", 0)))]
+    horizon = history["horizon_sec"]
+    if not robots:
+        raise ValueError("Szenario ohne Roboter.")
+
+    arrivals = history["arrivals"]
+    extra = [a for e in (scenario.get("extra_processes") or []) for a in _injected_arrivals(history, e, rng)]
+    if extra:
+        arrivals = sorted(arrivals + extra, key=lambda a: a[0])
+
+    index = {r: i for i, r in enumerate(robots)}
+    free = set(range(len(robots)))
+    busy_sec = [0.0] * len(robots)
+    finish_heap: list[tuple[float, int]] = []  # (finish time, robot index)
+    queue: deque[tuple[float, float]] = deque()  # (arrival time, duration)
+    waits: list[float] = []
+
+    def start_job(now: float, robot: int, arrival: float, dur: float) -> None:
+        free.discard(robot)
+        waits.append(now - arrival)
+        busy_sec[robot] += max(0.0, min(now + dur, horizon) - now)
+        heapq.heappush(finish_heap, (now + dur, robot))
+
+    i = 0
+    n = len(arrivals)
+    while i < n or finish_heap:
+        next_arrival = arrivals[i][0] if i < n else float("inf")
+        next_finish = finish_heap[0][0] if finish_heap else float("inf")
+        now = min(next_arrival, next_finish)
+        if now >= horizon:
+            break
+        if next_finish <= next_arrival:
+            _, robot = heapq.heappop(finish_heap)
+            if queue:
+                arrival, dur = queue.popleft()
+                start_job(now, robot, arrival, dur)
+            else:
+                free.add(robot)
+            continue
+        t, dur, home, _name = arrivals[i]
+        i += 1
+        home_idx = index.get(home)
+        if home_idx is not None and home_idx in free:
+            start_job(now, home_idx, t, dur)
+        elif free:
+            start_job(now, min(free), t, dur)
+        else:
+            queue.append((t, dur))
+
+    backlog_jobs = len(queue) + (n - i)
+    backlog_sec = sum(d for _, d in queue) + sum(a[1] for a in arrivals[i:])
+    waits.sort()
+    per_robot = [
+        {
+            "robot": r,
+            "utilization_percent": round(busy_sec[k] / horizon * 100.0, 1) if horizon else 0.0,
+            "idle_hours": round(max(0.0, horizon - busy_sec[k]) / 3600.0, 1),
+        }
+        for r, k in index.items()
+    ]
+    total_busy = sum(busy_sec)
+    return {
+        "name": scenario.get("name") or "Szenario",
+        "robots": len(robots),
+        "jobs": n,
+        "utilization_percent": round(total_busy / (horizon * len(robots)) * 100.0, 1) if horizon else 0.0,
+        "idle_hours": round(max(0.0, horizon * len(robots) - total_busy) / 3600.0, 1),
+        "avg_wait_minutes": round(sum(waits) / len(waits) / 60.0, 1) if waits else 0.0,
+        "p95_wait_minutes": round(waits[int(0.95 * (len(waits) - 1))] / 60.0, 1) if waits else 0.0,
+        "max_wait_minutes": round(waits[-1] / 60.0, 1) if waits else 0.0,
+        "backlog_jobs": backlog_jobs,
+        "backlog_hours": round(backlog_sec / 3600.0, 1),
+        "per_robot": per_robot,
+    }
+
+
+def run_scenarios(
+    db: Session,
+    scenarios: list[dict[str, Any]],
+    days: int = 30,
+    robots: set[str] | None = None,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Load history once and simulate the baseline (Ist-Zustand) plus every scenario."""
+    history = load_history(db, days=days, robots=robots)
+    results = [simulate(history, {"name": "Ist-Zustand"}, seed=seed)]
+    for k, sc in enumerate(scenarios):
+        results.append(simulate(history, sc, seed=seed + k + 1))
+    return results
@@ -0,0 +1,122 @@
+"""
+Level-of-detail for the job Gantt timeline.
+
+Up to GANTT_MAX_JOBS jobs are drawn one bar per job. Above that, jobs of the same robot and
+state are merged into one bar per time bucket: jobs are split at bucket borders, overlapping
+pieces are merged (as in idle_service.busy_intervals), and the bar starts at the first busy
+moment of the bucket and is as long as the merged busy time. Idle gaps inside a bucket thus do
+not count as busy and no bar reaches into the next bucket. The bucket width is the smallest
+step from BUCKET_STEPS that keeps robots × states × buckets <= GANTT_MAX_JOBS; for spans
+beyond the largest step it is derived from the span (whole days), so the figure payload stays
+bounded no matter how long the range is.
+"""
+import math
+import os
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from backend.services.idle_service import format_idle_minutes
+
+GANTT_MAX_JOBS = int(os.getenv("GANTT_MAX_JOBS", "1500"))
+BUCKET_STEPS = [
+    pd.Timedelta(minutes=15), pd.Timedelta(minutes=30), pd.Timedelta(hours=1), pd.Timedelta(hours=2),
+    pd.Timedelta(hours=3), pd.Timedelta(hours=6), pd.Timedelta(hours=12), pd.Timedelta(days=1),
+    pd.Timedelta(days=2), pd.Timedelta(days=7), pd.Timedelta(days=14), pd.Timedelta(days=28),
+]
+TIMELINE_COLUMNS = ["robot", "state", "Start", "End", "label", "n_jobs"]
+
+
+def _pick_bucket(span: pd.Timedelta, n_lanes: int, max_rows: int) -> pd.Timedelta:
+    for step in BUCKET_STEPS:
+        if (span / step + 1) * n_lanes <= max_rows:
+            return step
+    # Längere Zeiträume: so viele ganze Tage pro Block, dass die Zeilenzahl begrenzt bleibt
+    per_lane = max(1, max_rows // n_lanes - 1)
+    return pd.Timedelta(days=max(BUCKET_STEPS[-1].days, math.ceil(span / per_lane / pd.Timedelta(days=1))))
+
+
+def _label(processes: pd.Series, n: int, busy_minutes: float) -> str:
+    names = processes.value_counts().index.tolist()
+    shown = ", ".join(str(p) for p in names[:3] if p)
+    more = " …" if len(names) > 3 else ""
+    busy = f", {format_idle_minutes(busy_minutes)} belegt"
+    return f"{n} Jobs{busy} ({shown}{more})" if shown else f"{n} Jobs{busy}"
+
+
+def _split_at_buckets(df: pd.DataFrame, bucket: pd.Timedelta) -> pd.DataFrame:
+    """One piece per (job, bucket it overlaps), clipped to the bucket: index, bucket, start, end."""
+    start = df["start_time"].to_numpy()
+    end = np.maximum(df["end_time"].to_numpy(), start)
+    step = bucket.to_timedelta64()
+    b0 = df["start_time"].dt.floor(bucket).to_numpy()
+    b1 = pd.Series(end - np.timedelta64(1, "ns")).dt.floor(bucket).to_numpy()
+    counts = np.maximum((b1 - b0) // step + 1, 1).astype(np.int64)
+    idx = np.repeat(np.arange(len(df)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    bucket_start = b0[idx] + k * step
+    return pd.DataFrame({
+        "row": idx,
+        "bucket": bucket_start,
+        "start": np.maximum(start[idx], bucket_start),
+        "end": np.minimum(end[idx], bucket_start + step),
+    })
+
+
+def timeline_frame(
+    jobs: pd.DataFrame, robot_col: str = "robot_key", max_jobs: int | None = None
+) -> tuple[pd.DataFrame, dict[str, Any]]:
+    """
+    Rows to plot (robot, state, Start, End, label, n_jobs) plus info
+    {"aggregated": bool, "bucket": Timedelta | None, "n_jobs": int}.
+    """
+    limit = max_jobs or GANTT_MAX_JOBS
+    df = jobs[jobs["end_time"].notna()]
+    info: dict[str, Any] = {"aggregated": False, "bucket": None, "n_jobs": len(df)}
+    if df.empty:
+        return pd.DataFrame(columns=TIMELINE_COLUMNS), info
+    robot = df[robot_col].astype(str)
+    state = df["state"].astype(str)
+    if len(df) <= limit:
+        out = pd.DataFrame({
+            "robot": robot,
+            "state": state,
+            "Start": df["start_time"],
+            "End": df["end_time"],
+            "label": df["process_name"].astype(str),
+            "n_jobs": 1,
+        })
+        return out.reset_index(drop=True), info
+
+    span = df["end_time"].max() - df["start_time"].min()
+    n_lanes = robot.nunique() * state.nunique()
+    bucket = _pick_bucket(span, n_lanes, limit)
+    pieces = _split_at_buckets(df, bucket)
+    work = pd.DataFrame({
+        "robot": robot.to_numpy()[pieces["row"]],
+        "state": state.to_numpy()[pieces["row"]],
+        "bucket": pieces["bucket"],
+        "start": pieces["start"],
+        "end": pieces["end"],
+        "process": df["process_name"].astype(str).to_numpy()[pieces["row"]],
+    }).sort_values(["robot", "state", "bucket", "start"], ignore_index=True)
+    # Überlappende Stücke je (Robot, Status, Block) verschmelzen: belegte Zeit ohne Lücken
+    keys = [work["robot"], work["state"], work["bucket"]]
+    prev_end = work.groupby(keys, sort=False)["end"].cummax().groupby(keys, sort=False).shift(1)
+    work["merged"] = (prev_end.isna() | (work["start"] > prev_end)).cumsum()
+    merged = work.groupby("merged", sort=False).agg(
+        robot=("robot", "first"), state=("state", "first"), bucket=("bucket", "first"),
+        start=("start", "min"), end=("end", "max"),
+    )
+    merged["busy"] = merged["end"] - merged["start"]
+    out = merged.groupby(["robot", "state", "bucket"], sort=True).agg(Start=("start", "min"), busy=("busy", "sum")).reset_index()
+    grouped = work.groupby(["robot", "state", "bucket"], sort=True)
+    out["n_jobs"] = grouped.size().to_numpy()
+    out["End"] = out["Start"] + out["busy"]
+    busy_minutes = (out["busy"] / pd.Timedelta(minutes=1)).to_numpy()
+    out["label"] = [
+        _label(p, len(p), m) for (_, p), m in zip(grouped["process"], busy_minutes)
+    ]
+    info.update(aggregated=True, bucket=bucket)
+    return out[TIMELINE_COLUMNS], info
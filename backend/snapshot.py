@@ -0,0 +1,159 @@
+"""
+Cold-start snapshot of the dashboard data, written after every sync (background runner and
+python -m backend.sync_jobs).
+Run: python -m backend.snapshot
+
+data/snapshot/manifest.json stamps the bundle with the data generation it was built from and
+points to the dashboard's jobs (ROBOT_NAME_MAP robots) and the daily_utilization frames of the
+last SUPERSET_DAYS days (Parquet, or pandas table JSON without pyarrow) plus the weekly trends /
+Quick Wins of that day (JSON). Generation ids only mean something within one database, so the
+manifest also carries a fingerprint of that data_generations row (id, source, days, created_at);
+on boot the dashboard seeds its caches from the snapshot (see dashboard_service.boot_from_snapshot)
+only if the DB has the same row, i.e. descends from the snapshotted data, or has no data yet.
+Ranges outside the snapshot and days changed since are loaded live.
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+import backend.cache as shared_cache
+from backend.database import DATA_DIR, DataGeneration, ReadSessionLocal, init_tables
+from backend.services.job_loader import SUPERSET_DAYS, load_utilization_frame
+from backend.services.job_query import query_jobs
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = DATA_DIR / "snapshot"
+MANIFEST_PATH = SNAPSHOT_DIR / "manifest.json"
+SNAPSHOT_FORMAT = 3  # 2: Jobs nur der Dashboard-Roboter; 3: Fingerprint, Aggregate als JSON
+
+try:
+    import pyarrow  # noqa: F401
+    FRAME_SUFFIX = ".parquet"
+except ImportError:  # Parquet optional, sonst JSON (orient="table" behält die Spaltentypen)
+    FRAME_SUFFIX = ".json"
+
+
+def _write_frame(df: pd.DataFrame, path: Path) -> None:
+    if path.suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_json(path, orient="table", index=False, date_format="iso", date_unit="us")
+
+
+def _read_frame(path: Path) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    df = pd.read_json(path, orient="table")
+    if "date" in df.columns:  # daily_utilization.date bleibt ein Python-date (wie load_utilization_frame)
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+    return df
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "item"):  # numpy-Skalare
+        return value.item()
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def generation_fingerprint(generation: int) -> str | None:
+    """Hash of the data_generations row `generation` in the published DB; None if there is no such row."""
+    if generation <= 0:
+        return None
+    db = ReadSessionLocal()
+    try:
+        row = db.get(DataGeneration, generation)
+        if row is None:
+            return None
+        key = f"{row.id}|{row.source}|{row.day_from}|{row.day_to}|{row.n_changed}|{row.created_at}"
+    finally:
+        db.close()
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def write_snapshot(days: int = SUPERSET_DAYS) -> Path:
+    """Build the bundle for the current data generation; the manifest is replaced atomically."""
+    from backend.services import dashboard_service
+
+    init_tables()
+    generation = shared_cache.current_generation(force=True)
+    today = date.today()
+    d_from = today - timedelta(days=days - 1)
+    jobs = query_jobs(dashboard_service.jobs_filter(d_from, today))
+    util = load_utilization_frame(d_from, today)
+    aggregates = {
+        "weekly_trends": dashboard_service.weekly_trends(today),
+        "quickwins": dashboard_service.quickwins(today),
+    }
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    tag = f"{generation}-{uuid.uuid4().hex[:8]}"
+    files = {
+        "jobs": f"jobs-{tag}{FRAME_SUFFIX}",
+        "utilization": f"utilization-{tag}{FRAME_SUFFIX}",
+        "aggregates": f"aggregates-{tag}.json",
+    }
+    _write_frame(jobs, SNAPSHOT_DIR / files["jobs"])
+    _write_frame(util, SNAPSHOT_DIR / files["utilization"])
+    (SNAPSHOT_DIR / files["aggregates"]).write_text(json.dumps(aggregates, default=_json_default), encoding="utf-8")
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": generation,
+        "fingerprint": generation_fingerprint(generation),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "day": today.isoformat(),
+        "from": d_from.isoformat(),
+        "to": today.isoformat(),
+        "rows": {"jobs": len(jobs), "utilization": len(util)},
+        "files": files,
+    }
+    tmp = MANIFEST_PATH.with_name(f".manifest.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    os.replace(tmp, MANIFEST_PATH)
+    # Dateien älterer Snapshots entfernen (Manifest zeigt nur noch auf die neuen)
+    for path in SNAPSHOT_DIR.iterdir():
+        if path.name != MANIFEST_PATH.name and path.name not in files.values() and not path.name.startswith("."):
+            path.unlink(missing_ok=True)
+    logger.info("Snapshot v%s written: %d jobs, %d utilization rows", generation, len(jobs), len(util))
+    return MANIFEST_PATH
+
+
+def load_snapshot() -> dict[str, Any] | None:
+    """{"version", "fingerprint", "day", "from", "to", "jobs", "utilization", "aggregates"} or None if missing/unreadable."""
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            return None
+        files = manifest["files"]
+        aggregates = json.loads((SNAPSHOT_DIR / files["aggregates"]).read_text(encoding="utf-8"))
+        return {
+            "version": int(manifest["version"]),
+            "fingerprint": manifest.get("fingerprint"),
+            "day": date.fromisoformat(manifest["day"]),
+            "from": date.fromisoformat(manifest["from"]),
+            "to": date.fromisoformat(manifest["to"]),
+            "jobs": _read_frame(SNAPSHOT_DIR / files["jobs"]),
+            "utilization": _read_frame(SNAPSHOT_DIR / files["utilization"]),
+            "aggregates": aggregates,
+        }
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("Snapshot unreadable, falling back to live queries", exc_info=True)
+        return None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Snapshot geschrieben: {write_snapshot()}")
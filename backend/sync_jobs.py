@@ -2,13 +2,27 @@
 Sync jobs from UiPath Orchestrator into the local SQLite DB.
 Run: python -m backend.sync_jobs [days]
 Default: last 90 days. For Streamlit Cloud use fewer days (e.g. 30) to avoid timeout.
+
+The sync is a pipeline of stages joined by bounded asyncio queues: fetch OData pages ->
+parse into batches -> upsert on one writer thread, which also tracks the dirty days and
+updates daily_utilization incrementally for them (calculate_utilization.rollup_utilization),
+so the next pages download while earlier ones are written. Queue sizes and batch size come
+from SYNC_QUEUE_PAGES / SYNC_BATCH_ROWS. Every phase is timed (backend.metrics); run_sync returns
+the JSON summary, the Prometheus text goes to METRICS_FILE.
 """
 import asyncio
+import json
 import logging
 import os
 import sys
-from datetime import date, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from pathlib import Path
+from typing import Any, Callable
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
@@ -16,8 +30,12 @@ from dotenv import load_dotenv
 
 load_dotenv(Path(__file__).resolve().parent.parent / ".env")
 
-from backend.clients.uipath_client import UiPathClient
-from backend.database import SessionLocal, Job, init_tables
+from backend.calculate_utilization import rollup_utilization, utilization_horizon
+from backend.clients.uipath_client import UiPathClient, parse_job
+from backend import metrics as sync_metrics
+from backend.database import JOB_DIMENSIONS, SessionLocal, Job, init_tables, job_dimension_ids, record_data_generation, stage_generation
+from backend.services.regression_service import update_regressions
+from backend.snapshot import write_snapshot
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -43,60 +61,248 @@ def _make_client() -> UiPathClient:
     )
 
 
-async def sync_jobs(days: int = 90) -> int:
+def _job_days(start: datetime | None, end: datetime | None) -> set[date]:
+    """Calendar days a job touches (for cache invalidation)."""
+    if start is None:
+        return set()
+    d_start = start.date()
+    d_end = (end or start).date()
+    return {d_start + timedelta(days=i) for i in range(max(0, (d_end - d_start).days) + 1)}
+
+
+QUEUE_PAGES = int(os.getenv("SYNC_QUEUE_PAGES", "8"))  # rohe Seiten zwischen Fetch und Parse
+BATCH_ROWS = int(os.getenv("SYNC_BATCH_ROWS", "1000"))  # Jobs pro Upsert-Batch
+QUEUE_BATCHES = 2  # Batches zwischen Parse und Writer
+_END = None  # Ende-Markierung in den Queues
+
+
+class _Writer:
+    """
+    DB side of the pipeline. Every method runs on the one writer thread, so the session never
+    changes threads. Upserts batches (one SELECT per batch for the existing keys, bulk INSERT /
+    UPDATE), collects the dirty days and rolls up daily_utilization for dirty days that the
+    StartTime-ordered stream has already passed; everything is committed in finish().
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        progress: Callable[..., None] | None,
+        rollup: bool,
+        metrics: sync_metrics.RunMetrics,
+    ) -> None:
+        self.db = session_factory()
+        self.progress = progress
+        self.metrics = metrics
+        self.rollup = rollup
+        self.horizon = utilization_horizon(self.db) if rollup else None
+        self.count = 0
+        self.changed_days: set[date] = set()  # Tage mit geänderten Jobs (Cache-Invalidierung)
+        self.dirty: set[date] = set()  # davon noch nicht verdichtet
+        self.frontier: date | None = None  # größter Starttag bisher; spätere Seiten starten nicht davor
+        self.util_rows = 0
+        self.util_changed: set[date] = set()
+
+    def _report(self) -> None:
+        if self.progress:
+            self.progress(rows_upserted=self.count, util_days=self.util_rows)
+
+    def _rollup(self, days: set[date]) -> None:
+        n, changed = rollup_utilization(self.db, days, self.horizon, metrics=self.metrics)
+        self.util_rows += n
+        self.util_changed |= changed
+        self.dirty -= days
+
+    def upsert(self, batch: list[dict]) -> None:
+        with self.metrics.span("upsert"):
+            self._upsert(batch)
+        if self.rollup:
+            last_start = max(row["start_time"] for row in batch).date()
+            self.frontier = max(self.frontier or last_start, last_start)
+            # Tage vor dem Starttag der letzten Zeile bekommen keine neuen Jobs mehr (StartTime asc);
+            # kommt doch einer (z. B. geänderter alter Job), ist der Tag wieder dirty und wird neu verdichtet
+            closed = {d for d in self.dirty if d < self.frontier}
+            if closed:
+                self._rollup(closed)
+        self._report()
+
+    def _upsert(self, batch: list[dict]) -> None:
+        rows = {row["job_key"]: row for row in batch}  # doppelte Keys: letzte Version gewinnt
+        existing = {
+            r.job_key: r
+            for r in self.db.execute(
+                select(Job.id, Job.job_key, *[getattr(Job, c) for c in JOB_DIMENSIONS], Job.start_time, Job.end_time)
+                .where(Job.job_key.in_(list(rows)))
+            )
+        }
+        inserts: list[dict] = []
+        updates: list[dict] = []
+        for key, row in rows.items():
+            start_time, end_time = row["start_time"], row["end_time"]
+            values = {
+                "start_time": start_time,
+                "end_time": end_time,
+                **job_dimension_ids(self.db, row.get("robot_name"), row.get("machine_name"), row.get("process_name"), row.get("state")),
+            }
+            old = existing.get(key)
+            if old is None:
+                inserts.append({"job_key": key, **values})
+                days = _job_days(start_time, end_time)
+            elif any(getattr(old, c) != v for c, v in values.items()):
+                updates.append({"id": old.id, **values})
+                days = _job_days(old.start_time, old.end_time) | _job_days(start_time, end_time)
+            else:
+                days = set()
+            self.changed_days |= days
+            self.dirty |= days
+        if inserts:
+            self.db.execute(insert(Job), inserts)
+        if updates:
+            self.db.execute(update(Job), updates)
+        self.count += len(batch)
+        self.metrics.inc("rows", len(inserts), result="inserted")
+        self.metrics.inc("rows", len(updates), result="updated")
+        self.metrics.inc("rows", len(rows) - len(inserts) - len(updates), result="unchanged")
+
+    def finish(self) -> int:
+        """Roll up the remaining dirty days, record data generations, commit; then regression detection."""
+        if self.rollup and self.dirty:
+            if self.progress:
+                self.progress(phase="utilization")
+            self._rollup(set(self.dirty))
+        self._report()
+        with self.metrics.span("commit"):
+            record_data_generation(self.db, "sync_jobs", self.changed_days)
+            record_data_generation(self.db, "calculate_utilization", self.util_changed)
+            self.db.commit()
+        self.metrics.inc("changed_days", len(self.changed_days))
+        self.metrics.inc("util_rows", self.util_rows)
+        try:
+            with self.metrics.span("regressions"):
+                update_regressions(self.db)
+        except Exception:
+            self.db.rollback()
+            logger.exception("Regression detection failed")
+        return self.count
+
+    def close(self) -> None:
+        self.db.rollback()  # nach finish() ein No-op, nach einem Fehler verwirft es den Batch-Stand
+        self.db.close()
+
+
+async def _run_stages(*stages: Any) -> None:
+    """Run the pipeline stages concurrently; if one fails, cancel the others and re-raise."""
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def sync_jobs(
+    days: int = 90,
+    progress: Callable[..., None] | None = None,
+    session_factory: Callable[[], Session] | None = None,
+    rollup: bool = True,
+    client: Any = None,
+) -> dict[str, Any]:
     """
     Fetch jobs from UiPath for the last `days` days and upsert into jobs table.
-    Returns number of jobs upserted.
+    Returns the run summary of backend.metrics (jobs = number of jobs upserted, busy seconds per
+    phase: token, fetch, parse, upsert, utilization_*, commit, regressions; rows inserted/updated/
+    unchanged; page latency statistics); the same numbers go to the Prometheus metrics file.
+
+    Staged pipeline: fetch pages -> parse into batches of BATCH_ROWS -> upsert on a dedicated
+    writer thread (+ dirty days -> incremental daily_utilization if `rollup`), connected by
+    bounded queues, so the download of the next pages overlaps parsing and writing and the
+    wall time approaches the slowest stage. progress(**counts) receives pages/rows_fetched,
+    rows_upserted and util_days; everything is one transaction, committed at the end.
+    session_factory: e.g. the staging generation (database.stage_generation); default SessionLocal.
+    client: anything with UiPathClient.iter_job_pages (e.g. backend.synth.SynthClient); default from .env.
     """
     init_tables()
-    client = _make_client()
+    metrics = sync_metrics.RunMetrics("sync")
+    client = client or _make_client()
     end_date = date.today()
     start_date = end_date - timedelta(days=days - 1)
-    raw_jobs = await client.get_jobs(start_date, end_date)
+    loop = asyncio.get_running_loop()
+    pages_q: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_PAGES)
+    batches_q: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_BATCHES)
 
-    db = SessionLocal()
-    try:
-        count = 0
-        for row in raw_jobs:
-            job_key = str(row.get("job_key") or "")
-            if not job_key:
-                continue
-            existing = db.query(Job).filter(Job.job_key == job_key).first()
-            start_time = row.get("start_time")
-            end_time = row.get("end_time")
-            if not start_time:
-                continue
-            if existing:
-                existing.robot_name = row.get("robot_name")
-                existing.machine_name = row.get("machine_name")
-                existing.process_name = row.get("process_name")
-                existing.start_time = start_time
-                existing.end_time = end_time
-                existing.state = row.get("state")
-            else:
-                db.add(Job(
-                    job_key=job_key,
-                    robot_name=row.get("robot_name"),
-                    machine_name=row.get("machine_name"),
-                    process_name=row.get("process_name"),
-                    start_time=start_time,
-                    end_time=end_time,
-                    state=row.get("state"),
-                ))
-            count += 1
-        db.commit()
-        logger.info("Synced %d jobs (%s to %s)", count, start_date, end_date)
-        return count
-    except Exception:
-        db.rollback()
-        raise
-    finally:
-        db.close()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="sync-writer") as pool:
+        def on_writer(fn: Callable[..., Any], *args: Any) -> Any:
+            return loop.run_in_executor(pool, fn, *args)
+
+        async def fetch() -> None:
+            if hasattr(client, "get_access_token"):
+                with metrics.span("token"):
+                    await client.get_access_token()
+            pages = rows = 0
+            page_iter = aiter(client.iter_job_pages(start_date, end_date))
+            while True:
+                t = time.perf_counter()
+                try:
+                    value = await anext(page_iter)
+                except StopAsyncIteration:
+                    break
+                latency = time.perf_counter() - t
+                metrics.add_time("fetch", latency)
+                metrics.observe("page_latency", latency)
+                metrics.inc("pages")
+                metrics.inc("rows_fetched", len(value))
+                await pages_q.put(value)
+                pages += 1
+                rows += len(value)
+                if progress:
+                    progress(pages=pages, rows_fetched=rows)
+            await pages_q.put(_END)
+
+        async def parse() -> None:
+            batch: list[dict] = []
+            while (value := await pages_q.get()) is not _END:
+                with metrics.span("parse"):
+                    for item in value:
+                        row = parse_job(item)
+                        if row["job_key"] and row["start_time"]:
+                            batch.append(row)
+                if len(batch) >= BATCH_ROWS:
+                    await batches_q.put(batch)
+                    batch = []
+            if batch:
+                await batches_q.put(batch)
+            await batches_q.put(_END)
+
+        async def write() -> None:
+            while (batch := await batches_q.get()) is not _END:
+                await on_writer(writer.upsert, batch)
+
+        try:
+            writer = await on_writer(_Writer, session_factory or SessionLocal, progress, rollup, metrics)
+            try:
+                await _run_stages(fetch(), parse(), write())
+                count = await on_writer(writer.finish)
+            finally:
+                await on_writer(writer.close)
+        except BaseException:
+            sync_metrics.publish(metrics, "failed")
+            raise
+    summary = {"jobs": count, "days": days, **sync_metrics.publish(metrics)}
+    logger.info("Synced %d jobs (%s to %s): %s", count, start_date, end_date, summary["phases"])
+    return summary
 
 
-def run_sync(days: int = 90) -> int:
-    """Synchronous entry point for use from Streamlit. Returns number of jobs synced."""
-    return asyncio.run(sync_jobs(days=days))
+def run_sync(
+    days: int = 90,
+    progress: Callable[..., None] | None = None,
+    session_factory: Callable[[], Session] | None = None,
+    rollup: bool = True,
+    client: Any = None,
+) -> dict[str, Any]:
+    """Synchronous entry point (CLI, background sync runner). Returns the run summary (see sync_jobs)."""
+    return asyncio.run(sync_jobs(days=days, progress=progress, session_factory=session_factory, rollup=rollup, client=client))
 
 
 if __name__ == "__main__":
@@ -106,5 +312,11 @@ if __name__ == "__main__":
             days = int(sys.argv[1])
         except ValueError:
             pass
-    n = run_sync(days=days)
-    print(f"Synced {n} jobs.")
+    with stage_generation() as staging:
+        summary = run_sync(days=days, session_factory=staging)
+    try:
+        write_snapshot()
+    except Exception:
+        logger.warning("Cold-start snapshot not written after sync", exc_info=True)
+    print(f"Synced {summary['jobs']} jobs.")
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,326 @@
+"""
+Background sync runner: UiPath sync + utilization in a worker thread, with live progress.
+
+The dashboard submits a run and polls it; the worker keeps counters (pages fetched, rows
+upserted, utilization days) in a process-wide registry, so a browser refresh re-attaches to
+the running sync instead of abandoning it. Until the worker commits, readers keep seeing the
+previous data generation: sync and utilization are written into a staging copy of the DB that
+is published as a whole when both succeeded (database.stage_generation). After a successful
+run the cold-start snapshot is rewritten (backend.snapshot).
+
+Single-flight across sessions and processes: every run is a row in `sync_runs`, inserted with
+INSERT … WHERE NOT EXISTS (running row), which SQLite executes atomically; the table lives in
+its own file outside the generations (database.RunsSessionLocal), so progress written while
+the staging copy is open is not lost when it is published. A request that
+finds a running row attaches to it (progress is read from the row, kept fresh by a heartbeat);
+a request within SYNC_FRESH_SECONDS after a completed run gets that run's result. Running rows
+without heartbeat for SYNC_STALE_SECONDS (crashed process) no longer block new runs.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import DateTime, Integer, String, exists, insert, literal, select
+from sqlalchemy.exc import OperationalError
+
+import backend.sync_jobs as sync_jobs_module
+from backend.database import RunsSessionLocal, SyncRunRecord, init_tables, stage_generation
+from backend.services import job_archive, retention_service
+from backend.snapshot import write_snapshot
+
+logger = logging.getLogger(__name__)
+
+MAX_FINISHED_RUNS = 10
+FRESH_SECONDS = int(os.getenv("SYNC_FRESH_SECONDS", "120"))
+STALE_SECONDS = int(os.getenv("SYNC_STALE_SECONDS", "300"))
+HEARTBEAT_SECONDS = 5.0
+REMOTE_REFRESH_SECONDS = 1.0
+OWNER = f"{socket.gethostname()}:{os.getpid()}"[:100]
+PHASE_LABELS = {
+    "queued": "Wartet",
+    "fetch": "Lade Jobs von UiPath",
+    "upsert": "Lade und schreibe Jobs",
+    "utilization": "Berechne Utilization",
+    "done": "Fertig",
+    "failed": "Fehlgeschlagen",
+}
+PROGRESS_FIELDS = ("phase", "pages", "rows_fetched", "rows_upserted", "util_days", "n_jobs", "n_util", "error", "finished_at")
+
+
+class SyncRun:
+    """
+    State of one background sync; all fields are updated under the run's lock.
+    remote=True: executed by another process, state is re-read from its sync_runs row.
+    reused=True: a completed run handed out to a later request (freshness threshold).
+    """
+
+    def __init__(self, days: int, run_id: str | None = None, remote: bool = False, reused: bool = False) -> None:
+        self.id = run_id or uuid.uuid4().hex[:12]
+        self.days = days
+        self.phase = "queued"
+        self.pages = 0
+        self.rows_fetched = 0
+        self.rows_upserted = 0
+        self.util_days = 0
+        self.n_jobs: int | None = None
+        self.n_util: int | None = None
+        self.error: str | None = None
+        self.started_at = datetime.now()
+        self.finished_at: datetime | None = None
+        self.remote = remote
+        self.reused = reused
+        self._lock = threading.Lock()
+        self._refreshed_at = 0.0
+
+    @classmethod
+    def from_record(cls, rec: SyncRunRecord, remote: bool = False, reused: bool = False) -> "SyncRun":
+        run = cls(rec.days, run_id=rec.id, remote=remote, reused=reused)
+        run._apply_record(rec)
+        return run
+
+    def _apply_record(self, rec: SyncRunRecord) -> None:
+        with self._lock:
+            for k in PROGRESS_FIELDS:
+                setattr(self, k, getattr(rec, k))
+            self.started_at = rec.started_at
+            if rec.status == "running" and rec.heartbeat_at < datetime.now() - timedelta(seconds=STALE_SECONDS):
+                self.phase = "failed"
+                self.error = "Sync-Prozess antwortet nicht mehr (kein Heartbeat)."
+            elif rec.status in ("done", "failed"):
+                self.phase = rec.status
+            self._refreshed_at = time.monotonic()
+
+    def _refresh_remote(self) -> None:
+        if not self.remote or self.phase in ("done", "failed"):
+            return
+        if time.monotonic() - self._refreshed_at < REMOTE_REFRESH_SECONDS:
+            return
+        db = RunsSessionLocal()
+        try:
+            rec = db.get(SyncRunRecord, self.id)
+        finally:
+            db.close()
+        if rec is not None:
+            self._apply_record(rec)
+
+    @property
+    def running(self) -> bool:
+        self._refresh_remote()
+        return self.phase not in ("done", "failed")
+
+    def update(self, phase: str | None = None, **counts: Any) -> None:
+        with self._lock:
+            if phase is not None:
+                self.phase = phase
+            elif "rows_upserted" in counts and self.phase == "fetch":
+                self.phase = "upsert"
+            for k, v in counts.items():
+                setattr(self, k, v)
+
+    def snapshot(self) -> dict[str, Any]:
+        self._refresh_remote()
+        with self._lock:
+            return {
+                "id": self.id,
+                "days": self.days,
+                "phase": self.phase,
+                "phase_label": PHASE_LABELS.get(self.phase, self.phase),
+                "running": self.phase not in ("done", "failed"),
+                "remote": self.remote,
+                "reused": self.reused,
+                "pages": self.pages,
+                "rows_fetched": self.rows_fetched,
+                "rows_upserted": self.rows_upserted,
+                "util_days": self.util_days,
+                "n_jobs": self.n_jobs,
+                "n_util": self.n_util,
+                "error": self.error,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "elapsed_seconds": round(((self.finished_at or datetime.now()) - self.started_at).total_seconds(), 1),
+            }
+
+
+_lock = threading.Lock()
+_runs: "OrderedDict[str, SyncRun]" = OrderedDict()
+
+
+def _try_acquire(run: SyncRun) -> bool:
+    """Insert the run's row unless a (non-stale) run is active. One statement, atomic in SQLite."""
+    now = datetime.now()
+    active = exists().where(
+        SyncRunRecord.status == "running",
+        SyncRunRecord.heartbeat_at >= now - timedelta(seconds=STALE_SECONDS),
+    )
+    values = {
+        "id": literal(run.id, String), "owner": literal(OWNER, String), "days": literal(run.days, Integer),
+        "status": literal("running", String), "phase": literal("queued", String),
+        "started_at": literal(now, DateTime), "heartbeat_at": literal(now, DateTime),
+    }
+    stmt = insert(SyncRunRecord).from_select(list(values), select(*values.values()).where(~active))
+    db = RunsSessionLocal()
+    try:
+        # Abgebrochene Läufe (Prozess weg) als fehlgeschlagen markieren
+        db.query(SyncRunRecord).filter(
+            SyncRunRecord.status == "running",
+            SyncRunRecord.heartbeat_at < now - timedelta(seconds=STALE_SECONDS),
+        ).update({"status": "failed", "error": "Abgebrochen (kein Heartbeat)", "finished_at": now})
+        acquired = db.execute(stmt).rowcount == 1
+        db.commit()
+        return acquired
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _find_run(days: int) -> SyncRunRecord | None:
+    """Active run, or a completed run covering `days` within the freshness threshold."""
+    now = datetime.now()
+    db = RunsSessionLocal()
+    try:
+        active = (
+            db.query(SyncRunRecord)
+            .filter(SyncRunRecord.status == "running", SyncRunRecord.heartbeat_at >= now - timedelta(seconds=STALE_SECONDS))
+            .order_by(SyncRunRecord.started_at.desc())
+            .first()
+        )
+        if active is not None:
+            return active
+        return (
+            db.query(SyncRunRecord)
+            .filter(
+                SyncRunRecord.status == "done",
+                SyncRunRecord.days >= days,
+                SyncRunRecord.finished_at >= now - timedelta(seconds=FRESH_SECONDS),
+            )
+            .order_by(SyncRunRecord.finished_at.desc())
+            .first()
+        )
+    finally:
+        db.close()
+
+
+def _write_progress(run: SyncRun, status: str = "running", attempts: int = 1) -> None:
+    """Copy the run's counters to its row (= heartbeat). The sync's own write transaction may hold the lock."""
+    snap = run.snapshot()
+    values = {k: snap[k] for k in PROGRESS_FIELDS}
+    values.update(status=status, heartbeat_at=datetime.now())
+    for attempt in range(attempts):
+        db = RunsSessionLocal()
+        try:
+            db.query(SyncRunRecord).filter(SyncRunRecord.id == run.id).update(values)
+            db.commit()
+            return
+        except OperationalError:
+            db.rollback()
+            logger.debug("sync_runs heartbeat for %s skipped (database locked)", run.id)
+            if attempt + 1 < attempts:
+                time.sleep(1.0)
+        finally:
+            db.close()
+    if attempts > 1:
+        logger.warning("Could not record final state of sync run %s", run.id)
+
+
+def _heartbeat(run: SyncRun, stop: threading.Event) -> None:
+    while not stop.wait(HEARTBEAT_SECONDS):
+        _write_progress(run)
+
+
+def _work(run: SyncRun) -> None:
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(run, stop), name=f"sync-heartbeat-{run.id}", daemon=True).start()
+    try:
+        run.update(phase="fetch")
+        # Sync + Utilization in eine Staging-Kopie; Leser sehen erst nach dem Umschalten beides
+        with stage_generation() as staging:
+            # Pipeline: Fetch, Upsert und inkrementelle Utilization der geänderten Tage überlappen
+            summary = sync_jobs_module.run_sync(days=run.days, progress=run.update, session_factory=staging)
+            n_jobs = summary["jobs"]
+            n_util = run.util_days
+            run.update(n_jobs=n_jobs)
+            if job_archive.ARCHIVE_AFTER_DAYS:
+                try:
+                    job_archive.archive_jobs(job_archive.ARCHIVE_AFTER_DAYS, session_factory=staging)
+                except Exception:
+                    logger.warning("Job archiving after sync %s failed", run.id, exc_info=True)
+            if retention_service.default_policy()["jobs"]:
+                try:
+                    retention_service.apply_retention(session_factory=staging)
+                except Exception:
+                    # Sync und Utilization trotzdem veröffentlichen; der nächste Lauf räumt erneut auf
+                    logger.warning("Retention after sync %s failed", run.id, exc_info=True)
+        try:
+            write_snapshot()
+        except Exception:
+            logger.warning("Cold-start snapshot not written after sync %s", run.id, exc_info=True)
+        run.update(phase="done", n_util=n_util, finished_at=datetime.now())
+    except Exception as e:
+        logger.exception("Background sync %s failed", run.id)
+        run.update(phase="failed", error=str(e)[:500], finished_at=datetime.now())
+    finally:
+        stop.set()
+        _write_progress(run, status=run.phase, attempts=10)
+
+
+def _register(run: SyncRun) -> SyncRun:
+    """Add to the registry (caller holds _lock); keeps the last MAX_FINISHED_RUNS finished runs."""
+    existing = _runs.get(run.id)
+    if existing is not None:
+        return existing
+    _runs[run.id] = run
+    finished = [k for k, r in _runs.items() if r.phase in ("done", "failed")]
+    for k in finished[:-MAX_FINISHED_RUNS]:
+        _runs.pop(k, None)
+    return run
+
+
+def submit(days: int = 90) -> SyncRun:
+    """
+    Request a sync of the last `days` days. Returns the run already in flight (this or another
+    process), a fresh completed run (reused=True), or a newly started one.
+    """
+    init_tables()
+    with _lock:
+        for run in _runs.values():
+            if not run.remote and run.phase not in ("done", "failed"):
+                return run
+        for _ in range(3):
+            rec = _find_run(days)
+            if rec is not None:
+                if rec.status == "running":
+                    # Eigener Lauf ist schon registriert (_register liefert ihn), sonst anderer Prozess
+                    return _register(SyncRun.from_record(rec, remote=True))
+                return _register(SyncRun.from_record(rec, reused=True))
+            run = SyncRun(days)
+            if _try_acquire(run):
+                _register(run)
+                break
+        else:
+            raise RuntimeError("Sync konnte nicht gestartet werden (sync_runs ist belegt).")
+    threading.Thread(target=_work, args=(run,), name=f"sync-{run.id}", daemon=True).start()
+    return run
+
+
+def get(run_id: str | None) -> SyncRun | None:
+    if run_id is None:
+        return None
+    with _lock:
+        return _runs.get(run_id)
+
+
+def latest() -> SyncRun | None:
+    """Most recent run known to this process; attaches to a run started by another process."""
+    rec = _find_run(days=0)
+    with _lock:
+        if rec is not None and rec.status == "running" and rec.id not in _runs:
+            _register(SyncRun.from_record(rec, remote=True))
+        return next(reversed(_runs.values()), None)
@@ -0,0 +1,276 @@
+"""
+Synthetische Job-Historie für Last- und Benchmark-Tests (statt Echtdaten des Tenants).
+Run: python -m backend.synth db|odata|csv [--robots 3] [--days 30] [--seed 0] [--end YYYY-MM-DD] [--out PATH]
+
+  db     füllt die DB über den echten Sync-Pfad (sync_jobs mit SynthClient: Parse, Batch-Upsert,
+         inkrementelle Utilization, Regressionen) in eine Staging-Generation
+  odata  schreibt OData-Seiten wie GET odata/Jobs (eine Seite {"value": [...]} pro Zeile, JSON Lines)
+  csv    schreibt einen Orchestrator-Export (Spalten wie verify_13_02_from_orchestrator_csv.py)
+
+Every host runs `slots` independent job chains (slots > 1 = parallel jobs on one host). A chain
+draws the next process by weight, a log-normal duration around the process median and an
+exponential gap; weekends are quieter, outages pause a chain for hours, and late in the evening a
+long night batch may start and run past midnight. Durations, gaps, failure rates and the shares
+of night batches/outages are configurable. The output depends only on the arguments: same seed
+and --end give identical jobs (with the default --end=today, jobs after "now" are cut off and
+still-running ones have no end, so fix --end for benchmark runs).
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import random
+import sys
+import uuid
+from collections.abc import AsyncIterator, Iterator
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# (Prozess, Gewicht, Median-Laufzeit in Minuten, Streuung sigma der Log-Normalverteilung, Fehlerquote)
+PROCESSES: list[tuple[str, float, float, float, float]] = [
+    ("Reklamation Ablehnen", 4.0, 12.0, 0.5, 0.04),
+    ("Rechnungseingang Verarbeiten", 3.0, 25.0, 0.6, 0.06),
+    ("Zählerstände Import", 2.0, 8.0, 0.4, 0.02),
+    ("Mahnlauf Vorbereiten", 1.0, 45.0, 0.7, 0.08),
+    ("Stammdaten Abgleich", 1.0, 90.0, 0.5, 0.05),
+    ("Report Export", 0.5, 5.0, 0.3, 0.01),
+]
+NIGHT_PROCESS = ("Nachtlauf Abrechnung", 150.0, 0.4, 0.10)  # startet 22:00–23:45, läuft über Mitternacht
+ROBOT_NAME = "Unattended"
+PAGE_SIZE = 100  # wie UiPathClient ($top)
+CSV_COLUMNS = ["Key", "Process", "Robot", "Hostname", "State", "Started (absolute)", "Ended (absolute)"]
+
+DEFAULTS: dict[str, Any] = {
+    "robots": 3,
+    "days": 30,
+    "seed": 0,
+    "slots": 1,  # parallele Job-Ketten pro Host
+    "gap_minutes": 20.0,  # mittlere Pause zwischen zwei Jobs einer Kette
+    "duration_scale": 1.0,  # Faktor auf alle Median-Laufzeiten
+    "failure_rate": None,  # None = Quote je Prozess, sonst für alle Prozesse
+    "night_rate": 0.3,  # Anteil Host-Tage mit Nachtlauf
+    "outage_rate": 0.05,  # Anteil Ketten-Tage mit Ausfall (1–6 h keine Jobs)
+    "weekend_factor": 3.0,  # Pausen am Wochenende x Faktor
+}
+
+
+def host_names(n: int) -> list[str]:
+    """The dashboard's hosts (ROBOT_NAME_MAP, one per display name) first, then RPA-SYN-004, ..."""
+    from backend.services.dashboard_service import ROBOT_NAME_MAP
+
+    known: list[str] = []
+    for host, name in ROBOT_NAME_MAP.items():
+        if name not in {ROBOT_NAME_MAP[h] for h in known}:
+            known.append(host)
+    return (known + [f"RPA-SYN-{i:03d}" for i in range(len(known) + 1, n + 1)])[:n]
+
+
+def _minutes(m: float) -> timedelta:
+    return timedelta(milliseconds=round(m * 60000))  # ms-Auflösung wie die Orchestrator-Zeitstempel
+
+
+def _lognormal(rnd: random.Random, median: float, sigma: float) -> float:
+    return median * math.exp(rnd.gauss(0.0, sigma))
+
+
+def _state(rnd: random.Random, failure_rate: float) -> str:
+    x = rnd.random()
+    if x < failure_rate:
+        return "Faulted"
+    return "Stopped" if x < failure_rate * 1.2 else "Successful"
+
+
+def generate_jobs(end: date | None = None, now: datetime | None = None, **options: Any) -> Iterator[list[dict[str, Any]]]:
+    """
+    Synthetic jobs of `days` days up to `end` (default today), one list per day ordered by start_time,
+    in the shape of clients.uipath_client.parse_job. Options: see DEFAULTS. Jobs starting after `now`
+    (default: now if end >= today) are not generated; jobs still running at `now` have no end_time.
+    """
+    opts = {**DEFAULTS, **{k: v for k, v in options.items() if v is not None}}
+    unknown = set(opts) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unbekannte Optionen: {', '.join(sorted(unknown))}")
+    end = end or date.today()
+    if now is None and end >= date.today():
+        now = datetime.now().replace(microsecond=0)
+    rnd = random.Random(opts["seed"])
+    hosts = host_names(opts["robots"])
+    names = [p[0] for p in PROCESSES]
+    weights = [p[1] for p in PROCESSES]
+    profile = {p[0]: p[2:] for p in PROCESSES}
+    first = end - timedelta(days=opts["days"] - 1)
+    # Nächster Start je Kette (Host, Slot), versetzt über den ersten Vormittag
+    chains = {
+        (host, slot): datetime.combine(first, time()) + _minutes(rnd.uniform(0, 240))
+        for host in hosts for slot in range(opts["slots"])
+    }
+
+    for i in range(opts["days"]):
+        day = first + timedelta(days=i)
+        day_end = datetime.combine(day, time()) + timedelta(days=1)
+        gap_mean = opts["gap_minutes"] * (opts["weekend_factor"] if day.weekday() >= 5 else 1.0)
+        jobs: list[dict[str, Any]] = []
+        for (host, slot), t in chains.items():
+            night = slot == 0 and rnd.random() < opts["night_rate"]
+            night_start = datetime.combine(day, time(22)) + _minutes(rnd.uniform(0, 105))
+            outage_at = datetime.combine(day, time()) + _minutes(rnd.uniform(0, 24 * 60)) if rnd.random() < opts["outage_rate"] else None
+            while t < day_end:
+                if outage_at is not None and t >= outage_at:
+                    t += _minutes(rnd.uniform(60, 360))
+                    outage_at = None
+                    continue
+                if night and t >= night_start:
+                    process, (median, sigma, failure) = NIGHT_PROCESS[0], NIGHT_PROCESS[1:]
+                    night = False
+                else:
+                    process = rnd.choices(names, weights)[0]
+                    median, sigma, failure = profile[process]
+                duration = _minutes(max(0.5, _lognormal(rnd, median * opts["duration_scale"], sigma)))
+                state = _state(rnd, failure if opts["failure_rate"] is None else opts["failure_rate"])
+                key = str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+                stop = t + duration
+                if now is None or t <= now:
+                    jobs.append({
+                        "job_key": key,
+                        "robot_name": ROBOT_NAME,
+                        "machine_name": host,
+                        "process_name": process,
+                        "start_time": t,
+                        "end_time": stop if now is None or stop <= now else None,
+                        "state": state if now is None or stop <= now else "Running",
+                    })
+                t = stop + _minutes(rnd.expovariate(1.0 / gap_mean) if gap_mean > 0 else 0.0)
+            chains[(host, slot)] = t
+        jobs.sort(key=lambda j: j["start_time"])
+        yield jobs
+
+
+def _iso(dt: datetime | None) -> str | None:
+    return dt.isoformat(timespec="milliseconds") + "Z" if dt else None
+
+
+def to_odata(job: dict[str, Any]) -> dict[str, Any]:
+    """Job dict -> OData job item as returned by GET odata/Jobs?$expand=Robot (parse_job inverts it)."""
+    return {
+        "Key": job["job_key"],
+        "StartTime": _iso(job["start_time"]),
+        "EndTime": _iso(job["end_time"]),
+        "State": job["state"],
+        "ReleaseName": job["process_name"],
+        "HostMachineName": job["machine_name"],
+        "Robot": {"Name": job["robot_name"], "MachineName": job["machine_name"]},
+    }
+
+
+def odata_pages(jobs: Iterator[list[dict[str, Any]]], date_from: date | None = None, date_to: date | None = None) -> Iterator[list[dict[str, Any]]]:
+    """OData items in pages of PAGE_SIZE, StartTime ascending, optionally only StartTime in [date_from, date_to]."""
+    page: list[dict[str, Any]] = []
+    for day_jobs in jobs:
+        for job in day_jobs:
+            d = job["start_time"].date()
+            if (date_from and d < date_from) or (date_to and d > date_to):
+                continue
+            page.append(to_odata(job))
+            if len(page) == PAGE_SIZE:
+                yield page
+                page = []
+    if page:
+        yield page
+
+
+class SynthClient:
+    """Stand-in for UiPathClient in sync_jobs(client=...): synthetic pages instead of the API."""
+
+    def __init__(self, end: date | None = None, page_delay: float = 0.0, **options: Any) -> None:
+        self.end = end
+        self.page_delay = page_delay  # simulierte Latenz pro Seite in Sekunden
+        self.options = options
+
+    async def iter_job_pages(self, date_from: date, date_to: date) -> AsyncIterator[list[dict[str, Any]]]:
+        for page in odata_pages(generate_jobs(self.end, **self.options), date_from, date_to):
+            if self.page_delay:
+                await asyncio.sleep(self.page_delay)
+            yield page
+
+
+def write_odata(path: Path | None, jobs: Iterator[list[dict[str, Any]]]) -> int:
+    out = path.open("w", encoding="utf-8") if path else sys.stdout
+    n = 0
+    try:
+        for page in odata_pages(jobs):
+            out.write(json.dumps({"value": page}, ensure_ascii=False) + "\n")
+            n += len(page)
+    finally:
+        if path:
+            out.close()
+    return n
+
+
+def write_csv(path: Path | None, jobs: Iterator[list[dict[str, Any]]]) -> int:
+    out = path.open("w", newline="", encoding="utf-8") if path else sys.stdout
+    n = 0
+    try:
+        writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for day_jobs in jobs:
+            for job in day_jobs:
+                writer.writerow({
+                    "Key": job["job_key"],
+                    "Process": job["process_name"],
+                    "Robot": job["robot_name"],
+                    "Hostname": job["machine_name"],
+                    "State": job["state"],
+                    "Started (absolute)": job["start_time"].isoformat(" ", timespec="milliseconds"),
+                    "Ended (absolute)": job["end_time"].isoformat(" ", timespec="milliseconds") if job["end_time"] else "",
+                })
+                n += 1
+    finally:
+        if path:
+            out.close()
+    return n
+
+
+def fill_db(end: date | None = None, **options: Any) -> int:
+    """Load the synthetic history into the DB via sync_jobs (staging generation). Returns jobs synced."""
+    from backend.database import init_tables, stage_generation
+    from backend.sync_jobs import run_sync
+
+    init_tables()
+    days = max(1, (date.today() - (end or date.today())).days + (options.get("days") or DEFAULTS["days"]))
+    with stage_generation() as staging:
+        return run_sync(days=days, session_factory=staging, client=SynthClient(end, **options))["jobs"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("target", choices=["db", "odata", "csv"])
+    parser.add_argument("--robots", type=int, default=DEFAULTS["robots"], help="Anzahl Hosts")
+    parser.add_argument("--days", type=int, default=DEFAULTS["days"])
+    parser.add_argument("--seed", type=int, default=DEFAULTS["seed"])
+    parser.add_argument("--end", type=date.fromisoformat, help="letzter Tag (Standard: heute)")
+    parser.add_argument("--slots", type=int, default=DEFAULTS["slots"], help="parallele Jobs pro Host")
+    parser.add_argument("--gap-minutes", type=float, default=DEFAULTS["gap_minutes"])
+    parser.add_argument("--duration-scale", type=float, default=DEFAULTS["duration_scale"])
+    parser.add_argument("--failure-rate", type=float, help="Fehlerquote für alle Prozesse (Standard: je Prozess)")
+    parser.add_argument("--night-rate", type=float, default=DEFAULTS["night_rate"])
+    parser.add_argument("--outage-rate", type=float, default=DEFAULTS["outage_rate"])
+    parser.add_argument("--weekend-factor", type=float, default=DEFAULTS["weekend_factor"])
+    parser.add_argument("--out", type=Path, help="Zieldatei für odata/csv (Standard: stdout)")
+    args = parser.parse_args()
+
+    options = {k: getattr(args, k) for k in DEFAULTS}
+    if args.target == "db":
+        n = fill_db(args.end, **options)
+        print(f"{n} synthetische Jobs synchronisiert.")
+        return
+    jobs = generate_jobs(args.end, **options)
+    n = (write_odata if args.target == "odata" else write_csv)(args.out, jobs)
+    print(f"{n} synthetische Jobs geschrieben{f' nach {args.out}' if args.out else ''}.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
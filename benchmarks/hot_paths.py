@@ -0,0 +1,256 @@
+"""
+Backend hot paths on synthetic datasets of increasing size: wall time, peak RSS, rows/s.
+Run: python benchmarks/hot_paths.py [--sizes 10000,100000,1000000] [--cases ...] [--compare] [--save-baseline]
+
+For every size a temporary DB is filled by sync_jobs from backend.synth.SynthClient (the local
+stand-in for the Orchestrator API, fixed seed, 90 days up to yesterday; the number of hosts is
+chosen so the history has about `size` jobs). Then each case runs in its own subprocess, so peak
+RSS is that case's alone (including its untimed setup, e.g. loading the jobs for idle_days):
+
+  sync_jobs            pipeline fetch/parse/upsert against the stand-in (without utilization)
+  calculate_and_store  full daily_utilization rebuild
+  load_jobs            dashboard job frame of the last 90 days (query_jobs, cold cache)
+  weekly_trends        calculate_weekly_trends, 30 days
+  quickwins            analyze_quickwins, 7 days
+  idle_days            idle_service.idle_gaps over the last 90 days (RPA hosts)
+
+Every run is appended to benchmarks/history.json. --save-baseline stores the run as
+benchmarks/baseline.json; --compare flags cases that got slower or bigger than the baseline by
+more than --tolerance (exit code 1 if any).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+CASES = ["sync_jobs", "calculate_and_store", "load_jobs", "weekly_trends", "quickwins", "idle_days"]
+DAYS = 90
+JOBS_PER_HOST_DAY = 25  # Standardprofil von backend.synth (ein Slot pro Host)
+SEED = 42
+HISTORY_PATH = ROOT / "benchmarks" / "history.json"
+BASELINE_PATH = ROOT / "benchmarks" / "baseline.json"
+MIN_DELTA_SECONDS = 0.05  # kleinere Zeitunterschiede gelten als Rauschen
+
+
+def _robots(size: int) -> int:
+    return max(1, round(size / (DAYS * JOBS_PER_HOST_DAY)))
+
+
+def _peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MB (None if the platform offers no counter)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class Counters(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                    (name, ctypes.c_size_t) for name in (
+                        "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                        "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage",
+                    )
+                ]
+
+            counters = Counters()
+            counters.cb = ctypes.sizeof(Counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return None
+            return counters.PeakWorkingSetSize / (1024 * 1024)
+        except (AttributeError, OSError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # macOS: Bytes, Linux: KB
+
+
+def _count_jobs(d_from: date | None = None) -> int:
+    from sqlalchemy import func, select
+
+    from backend.database import Job, get_read_engine
+
+    query = select(func.count()).select_from(Job)
+    if d_from is not None:
+        query = query.where(Job.start_time >= datetime.combine(d_from, datetime.min.time()))
+    with get_read_engine().connect() as conn:
+        return conn.execute(query).scalar() or 0
+
+
+def run_case(case: str, args: argparse.Namespace) -> dict:
+    """One case inside its subprocess (DATABASE_URL and ROBOT_NAME_MAP already set). Returns seconds and rows."""
+    from backend.database import ReadSessionLocal, init_tables
+
+    init_tables()
+    today = date.today()
+    d_from = today - timedelta(days=DAYS - 1)
+    if case == "sync_jobs":
+        from backend.synth import SynthClient
+        from backend.sync_jobs import run_sync
+
+        client = SynthClient(today - timedelta(days=1), robots=_robots(args.size), days=DAYS, seed=SEED, page_delay=args.page_delay)
+        t = time.perf_counter()
+        rows = run_sync(days=DAYS + 1, rollup=False, client=client)["jobs"]
+    elif case == "calculate_and_store":
+        from backend.calculate_utilization import calculate_and_store
+
+        rows = _count_jobs()
+        t = time.perf_counter()
+        calculate_and_store()
+    elif case == "load_jobs":
+        from backend.services.dashboard_service import jobs_filter
+        from backend.services.job_query import query_jobs
+
+        t = time.perf_counter()
+        rows = len(query_jobs(jobs_filter(d_from, today)))
+    elif case in ("weekly_trends", "quickwins"):
+        from backend.services.quickwins_service import analyze_quickwins
+        from backend.services.trends_service import calculate_weekly_trends
+
+        db = ReadSessionLocal()
+        try:
+            if case == "weekly_trends":
+                rows = _count_jobs(today - timedelta(days=29))
+                t = time.perf_counter()
+                calculate_weekly_trends(db, 30)
+            else:
+                rows = _count_jobs(today - timedelta(days=7))
+                t = time.perf_counter()
+                analyze_quickwins(db, days=7)
+        finally:
+            db.close()
+    elif case == "idle_days":
+        from backend.services.dashboard_service import ROBOT_NAME_MAP, jobs_filter
+        from backend.services.idle_service import idle_gaps
+        from backend.services.job_query import query_jobs
+
+        df = query_jobs(jobs_filter(d_from, today))
+        robots = tuple(sorted(k for k in df["robot_key"].astype(str).unique() if "RPA-" in k))
+        rows = len(df)
+        t = time.perf_counter()
+        idle_gaps(df, robots, (d_from, today), robot_names=ROBOT_NAME_MAP)
+    else:
+        raise ValueError(f"Unbekannter Fall: {case}")
+    return {"seconds": time.perf_counter() - t, "rows": rows}
+
+
+def _run_subprocess(case: str, size: int, env: dict, args: argparse.Namespace) -> dict:
+    cmd = [sys.executable, __file__, "--case", case, "--size", str(size), "--page-delay", str(args.page_delay)]
+    out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+    r = json.loads(out.strip().splitlines()[-1])
+    return {
+        "seconds": round(r["seconds"], 3),
+        "peak_rss_mb": round(r["peak_rss_mb"], 1) if r["peak_rss_mb"] is not None else None,
+        "rows": r["rows"],
+        "rows_per_s": round(r["rows"] / r["seconds"]) if r["seconds"] > 0 else None,
+    }
+
+
+def run_size(size: int, cases: list[str], args: argparse.Namespace) -> dict[str, dict]:
+    from backend.synth import host_names
+
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(tmp) / 'bench.db'}",
+            "ROBOT_NAME_MAP": json.dumps({h: h for h in host_names(_robots(size))}),  # alle Hosts im Dashboard-Filter
+            "PYTHONPATH": str(ROOT),
+            "METRICS_FILE": "",  # keine data/metrics.prom aus Benchmark-Läufen
+        }
+        for case in ["sync_jobs"] + [c for c in cases if c != "sync_jobs"]:  # sync_jobs füllt die DB
+            r = _run_subprocess(case, size, env, args)
+            if case in cases:
+                results[case] = r
+                print(
+                    f"{size:>9} {case:<20} {r['seconds']:>9.3f} {r['peak_rss_mb'] if r['peak_rss_mb'] is not None else '–':>9} "
+                    f"{r['rows']:>9} {r['rows_per_s'] or '–':>10}",
+                    flush=True,
+                )
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(run: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of `run` against `baseline`: slower or bigger than baseline * (1 + tolerance)."""
+    found = []
+    for size, cases in run["results"].items():
+        for case, r in cases.items():
+            base = baseline["results"].get(size, {}).get(case)
+            if not base:
+                continue
+            if r["seconds"] > base["seconds"] * (1 + tolerance) and r["seconds"] - base["seconds"] > MIN_DELTA_SECONDS:
+                found.append(f"{size} {case}: {base['seconds']:.3f} s → {r['seconds']:.3f} s")
+            if r["peak_rss_mb"] and base.get("peak_rss_mb") and r["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+                found.append(f"{size} {case}: {base['peak_rss_mb']} MB → {r['peak_rss_mb']} MB Peak-RSS")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000", help="Jobs je Datensatz, z. B. 10000,100000,1000000")
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--page-delay", type=float, default=0.0, help="simulierte API-Latenz pro Seite in Sekunden")
+    parser.add_argument("--history", type=Path, default=HISTORY_PATH)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="diesen Lauf als Baseline speichern")
+    parser.add_argument("--compare", action="store_true", help="gegen die Baseline vergleichen (Exit-Code 1 bei Regression)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="erlaubte Verschlechterung (0.2 = 20 %%)")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        r = run_case(args.case, args)
+        print(json.dumps({**r, "peak_rss_mb": _peak_rss_mb()}))
+        return
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"unbekannte Fälle: {', '.join(unknown)}")
+    print(f"{'Jobs':>9} {'Fall':<20} {'Sekunden':>9} {'Peak MB':>9} {'Zeilen':>9} {'Zeilen/s':>10}")
+    run = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {size: run_size(int(size), cases, args) for size in args.sizes.split(",")},
+    }
+
+    history = json.loads(args.history.read_text(encoding="utf-8")) if args.history.exists() else []
+    history.append(run)
+    args.history.write_text(json.dumps(history, indent=2), encoding="utf-8")
+    print(f"\nLauf an {args.history} angehängt.")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(run, indent=2), encoding="utf-8")
+        print(f"Baseline gespeichert: {args.baseline}")
+    if args.compare:
+        if not args.baseline.exists():
+            sys.exit(f"Keine Baseline unter {args.baseline} (erst mit --save-baseline anlegen).")
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(run, baseline, args.tolerance)
+        print(f"\nVergleich mit Baseline {baseline.get('commit') or ''} vom {baseline['timestamp']}:")
+        for line in regressions or ["keine Regressionen"]:
+            print(f"  {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
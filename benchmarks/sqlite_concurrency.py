@@ -0,0 +1,201 @@
+"""
+Reader latency while a bulk sync is writing: WAL + pragmas vs. rollback journal.
+Run: python benchmarks/sqlite_concurrency.py [--rows 100000] [--readers 4] [--cases wal,legacy]
+
+Each case runs in its own subprocess on a fresh temporary DB (the engines are configured at
+import time from the SQLITE_* variables): "wal" uses the defaults of backend.database, "legacy"
+the previous setup (rollback journal, SQLite's default 2 MB page cache, no mmap). The DB is
+seeded with --seed-rows jobs, then a writer process inserts --rows jobs in one transaction like
+sync_jobs (ORM, flush every --flush-every rows) while --readers threads load 7-day job windows
+through the read engine. Prints reader latency percentiles, failed reads (database is locked)
+and the writer's duration.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+CASES = {
+    "wal": {},
+    "legacy": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_CACHE_SIZE_KB": "2000", "SQLITE_MMAP_SIZE_MB": "0"},
+}
+ROBOTS = [("RPA-DONALD-001", "Donald"), ("RPA-MICKEY-002", "Mickey"), ("RPA-SCRG-007", "Scrooge")]
+PROCESSES = [f"Prozess_{i:02d}" for i in range(30)]
+STATES = ["Successful"] * 8 + ["Faulted", "Stopped"]
+
+
+def _job_rows(n: int, offset: int, days: int) -> list[dict]:
+    rnd = random.Random(offset)
+    t0 = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+    rows = []
+    for i in range(offset, offset + n):
+        machine, robot = rnd.choice(ROBOTS)
+        start = t0 + timedelta(seconds=rnd.randrange(days * 86400))
+        rows.append({
+            "job_key": f"bench-{i}",
+            "robot_name": robot,
+            "machine_name": machine,
+            "process_name": rnd.choice(PROCESSES),
+            "start_time": start,
+            "end_time": start + timedelta(minutes=rnd.uniform(1, 45)),
+            "state": rnd.choice(STATES),
+        })
+    return rows
+
+
+def _with_dimension_ids(db, rows: list[dict]) -> list[dict]:
+    from backend.database import job_dimension_ids
+
+    return [
+        {
+            "job_key": r["job_key"], "start_time": r["start_time"], "end_time": r["end_time"],
+            **job_dimension_ids(db, r["robot_name"], r["machine_name"], r["process_name"], r["state"]),
+        }
+        for r in rows
+    ]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def run_writer(args: argparse.Namespace) -> None:
+    """Bulk sync stand-in (own process): all rows in one transaction, periodic flushes."""
+    from backend.database import Job, SessionLocal
+
+    rows = _job_rows(args.rows, args.seed_rows, args.days)
+    t = time.perf_counter()
+    db = SessionLocal()
+    try:
+        for i, row in enumerate(_with_dimension_ids(db, rows), 1):
+            db.add(Job(**row))
+            if i % args.flush_every == 0:
+                db.flush()
+        db.commit()
+    finally:
+        db.close()
+    print(json.dumps({"writer_seconds": time.perf_counter() - t}))
+
+
+def run_case(args: argparse.Namespace) -> dict:
+    """One case, executed inside the subprocess (env already set); the writer is a child process."""
+    from sqlalchemy import insert
+
+    from backend.database import Job, SessionLocal, get_engine, init_tables
+    from backend.services.job_loader import load_jobs_frame
+
+    init_tables()
+    engine = get_engine()
+    db = SessionLocal()
+    try:
+        for chunk in range(0, args.seed_rows, 10000):
+            rows = _with_dimension_ids(db, _job_rows(min(10000, args.seed_rows - chunk), chunk, args.days))
+            db.execute(insert(Job), rows)
+        db.commit()
+    finally:
+        db.close()
+    with engine.connect() as conn:
+        journal = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+
+    stop = threading.Event()
+    latencies: list[float] = []
+    errors: list[str] = []
+    lock = threading.Lock()
+
+    def reader(seed: int) -> None:
+        rnd = random.Random(seed)
+        while not stop.is_set():
+            d_end = date.today() - timedelta(days=rnd.randrange(args.days))
+            t = time.perf_counter()
+            try:
+                load_jobs_frame(d_end - timedelta(days=6), d_end)
+                with lock:
+                    latencies.append((time.perf_counter() - t) * 1000.0)
+            except Exception as e:
+                with lock:
+                    errors.append(type(e).__name__)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(args.readers)]
+    for th in threads:
+        th.start()
+    time.sleep(0.5)  # Baseline-Lesezugriffe ohne Schreiber
+    baseline = len(latencies)
+    writer = subprocess.run(
+        [sys.executable, __file__, "--writer", "--rows", str(args.rows), "--seed-rows", str(args.seed_rows),
+         "--days", str(args.days), "--flush-every", str(args.flush_every)],
+        capture_output=True, text=True, check=True,
+    )
+    stop.set()
+    for th in threads:
+        th.join()
+    during = latencies[baseline:]
+    return {
+        "journal_mode": journal,
+        "writer_seconds": round(json.loads(writer.stdout.strip().splitlines()[-1])["writer_seconds"], 2),
+        "reads": len(during),
+        "failed_reads": len(errors),
+        "p50_ms": round(_percentile(during, 0.50), 1),
+        "p95_ms": round(_percentile(during, 0.95), 1),
+        "max_ms": round(max(during), 1) if during else None,
+        "mean_ms": round(statistics.fmean(during), 1) if during else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000, help="Jobs, die der Schreiber upsertet")
+    parser.add_argument("--seed-rows", type=int, default=50000, help="Jobs in der DB vor dem Lauf")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--flush-every", type=int, default=2000)
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--writer", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.writer:
+        run_writer(args)
+        return
+    if args.case:
+        print(json.dumps(run_case(args)))
+        return
+
+    print(f"{'Fall':<8} {'Journal':<8} {'Schreiber s':>11} {'Reads':>6} {'Fehler':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for case in args.cases.split(","):
+        case = case.strip()
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                **CASES[case],
+                "DATABASE_URL": f"sqlite:///{Path(tmp) / 'bench.db'}",
+                "PYTHONPATH": str(ROOT),
+            }
+            cmd = [
+                sys.executable, __file__, "--case", case, "--rows", str(args.rows), "--seed-rows", str(args.seed_rows),
+                "--days", str(args.days), "--readers", str(args.readers), "--flush-every", str(args.flush_every),
+            ]
+            out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+        print(
+            f"{case:<8} {r['journal_mode']:<8} {r['writer_seconds']:>11} {r['reads']:>6} {r['failed_reads']:>6} "
+            f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['max_ms']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
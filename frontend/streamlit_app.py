@@ -1,7 +1,7 @@
 """
 RPA Performance Dashboard - Streamlit. Run: streamlit run frontend/streamlit_app.py
 """
-import json
+import copy
 import os
 import sys
 from pathlib import Path
@@ -86,26 +86,13 @@ def check_authentication() -> bool:
 # Authentifizierung prüfen (muss vor allem anderen passieren)
 check_authentication()
 
-from backend.database import SessionLocal, Job, DailyUtilization, init_tables
-import backend.sync_jobs as sync_jobs_module
-import backend.calculate_utilization as calc_util_module
+from backend.database import ReadSessionLocal, init_tables
+import backend.sync_runner as sync_runner
+from backend.services import dashboard_service
+from backend.services.dashboard_service import ROBOT_NAME_MAP
 
 init_tables()
 
-# Optional: map robot_key / Host name to display names (Donald, Mickey)
-ROBOT_NAME_MAP: dict[str, str] = {
-    "RPA-DONALD-001": "Donald",
-    "RPA-MICKY-002": "Mickey",
-    "RPA-MICKEY-002": "Mickey",
-}
-_raw = os.getenv("ROBOT_NAME_MAP")
-if _raw:
-    try:
-        ROBOT_NAME_MAP = {**ROBOT_NAME_MAP, **json.loads(_raw)}
-    except json.JSONDecodeError:
-        pass
-
-
 def _display_robot_name(name: str) -> str:
     return ROBOT_NAME_MAP.get(name, name)
 
@@ -125,45 +112,55 @@ def _format_duration(seconds: float) -> str:
     return f"{h}h {m:02d} min" if m else f"{h}h"
 
 
-def _compute_process_stats(df_jobs: pd.DataFrame) -> pd.DataFrame | None:
-    """Aggregate per process_name: runs, success_rate, duration mean/min/max (seconds). Returns None if no jobs."""
-    if df_jobs.empty or "end_time" not in df_jobs.columns:
-        return None
-    df = df_jobs.copy()
-    df["duration_sec"] = (df["end_time"] - df["start_time"]).dt.total_seconds()
-    df = df[df["duration_sec"].notna() & (df["duration_sec"] >= 0)]
-    if df.empty:
-        return None
-    proc = df.groupby("process_name").agg(
-        runs=("job_key", "count"),
-        success=("state", lambda s: (s == "Successful").sum()),
-        duration_mean=("duration_sec", "mean"),
-        duration_min=("duration_sec", "min"),
-        duration_max=("duration_sec", "max"),
-    ).reset_index()
-    proc["success_rate"] = (proc["success"] / proc["runs"] * 100).round(1)
-    return proc
-
-
 st.title("RPA Performance Monitoring")
 
 # Button oben links für UiPath Daten laden
 if "load_success" in st.session_state:
     st.success(st.session_state.load_success)
     del st.session_state["load_success"]
+if "load_error" in st.session_state:
+    st.error(f"Fehler beim Laden: {st.session_state.load_error}")
+    del st.session_state["load_error"]
 if st.button("Get UiPath Data", type="primary"):
-    sync_days = 90
-    with st.spinner(f"Lade Daten von UiPath … ({sync_days} Tage, kann 1–2 Min. dauern)"):
-        try:
-            n_jobs = sync_jobs_module.run_sync(days=sync_days)
-            n_util = calc_util_module.calculate_and_store()
-            st.cache_data.clear()
-            st.session_state["load_success"] = f"Fertig: {n_jobs} Jobs synchronisiert, {n_util} Utilization-Tage berechnet."
-        except Exception as e:
-            st.error(f"Fehler beim Laden: {e}")
-            st.stop()
+    # Sync läuft im Hintergrund (Worker-Thread); das Dashboard zeigt bis zum Commit die bisherigen Daten.
+    # Läuft bereits ein Sync (auch aus anderer Session/Prozess) oder ist einer gerade fertig, wird dieser übernommen.
+    st.session_state["sync_watch"] = sync_runner.submit(days=90).id
+
+_sync_run = sync_runner.get(st.session_state.get("sync_watch")) or sync_runner.latest()
+_sync_active = _sync_run is not None and _sync_run.running
+if _sync_active:
+    # Auch nach Browser-Refresh wieder an den laufenden Sync anhängen
+    st.session_state["sync_watch"] = _sync_run.id
+
+
+@st.fragment(run_every=1.0 if _sync_active else None)
+def render_sync_status() -> None:
+    run = sync_runner.get(st.session_state.get("sync_watch"))
+    if run is None:
+        return
+    s = run.snapshot()
+    if s["running"]:
+        st.info(
+            f"Sync läuft – {s['phase_label']} ({s['elapsed_seconds']:.0f} s): {s['pages']} Seiten / "
+            f"{s['rows_fetched']} Jobs geladen, {s['rows_upserted']} Jobs geschrieben, "
+            f"{s['util_days']} Utilization-Tage berechnet. Bis zum Abschluss werden die bisherigen Daten angezeigt."
+        )
+        return
+    del st.session_state["sync_watch"]
+    if s["error"]:
+        st.session_state["load_error"] = s["error"]
+    elif s["reused"]:
+        st.session_state["load_success"] = (
+            f"Daten sind aktuell: Sync von {s['finished_at']:%H:%M} übernommen "
+            f"({s['n_jobs']} Jobs, {s['n_util']} Utilization-Tage)."
+        )
+    else:
+        st.session_state["load_success"] = f"Fertig: {s['n_jobs']} Jobs synchronisiert, {s['n_util']} Utilization-Tage berechnet."
     st.rerun()
 
+
+render_sync_status()
+
 st.divider()
 
 # Sidebar: Verbessertes Design
@@ -203,76 +200,11 @@ if st.sidebar.button("🚪 Abmelden", use_container_width=True, type="secondary"
     st.rerun()
 
 
-@st.cache_data(ttl=300)
-def load_jobs(d_start: date, d_end: date) -> pd.DataFrame:
-    """Lädt alle Jobs, die mit [d_start, d_end] überlappen (inkl. Übernacht-Jobs)."""
-    db = SessionLocal()
-    try:
-        t_start = datetime.combine(d_start, datetime.min.time())
-        t_end = datetime.combine(d_end, datetime.max.time())
-        rows = (
-            db.query(Job)
-            .filter(
-                Job.end_time.isnot(None),
-                Job.start_time < t_end,
-                Job.end_time >= t_start,
-            )
-            .all()
-        )
-        out = []
-        for j in rows:
-            rn = j.robot_name or "Unknown"
-            mn = (j.machine_name or "").strip()
-            robot_key = mn if mn else rn
-            out.append({
-                "job_key": j.job_key,
-                "robot_name": rn,
-                "machine_name": mn,
-                "robot_key": robot_key,
-                "process_name": j.process_name or "",
-                "start_time": j.start_time,
-                "end_time": j.end_time,
-                "state": j.state or "",
-            })
-        return pd.DataFrame(out)
-    finally:
-        db.close()
-
-
-@st.cache_data(ttl=300)
-def load_utilization(d_start: date, d_end: date) -> pd.DataFrame:
-    db = SessionLocal()
-    try:
-        rows = (
-            db.query(DailyUtilization)
-            .filter(DailyUtilization.date >= d_start, DailyUtilization.date <= d_end)
-            .all()
-        )
-        return pd.DataFrame([
-            {
-                "date": u.date,
-                "robot_name": u.robot_name,
-                "total_runtime_hours": u.total_runtime_hours,
-                "idle_hours": u.idle_hours,
-                "utilization_percent": u.utilization_percent,
-            }
-            for u in rows
-        ])
-    finally:
-        db.close()
-
-
-df_jobs = load_jobs(date_start, date_end)
-# Nur Roboter anzeigen, die in ROBOT_NAME_MAP sind (Donald, Mickey) – Unattended/RPA-SCRG-007 etc. ausblenden
-if not df_jobs.empty and "robot_key" in df_jobs.columns:
-    allowed_keys = set(ROBOT_NAME_MAP.keys())
-    df_jobs = df_jobs[df_jobs["robot_key"].astype(str).isin(allowed_keys)].copy()
-df_util = load_utilization(date_start, date_end)
+# Jobs: Slice aus dem 90-Tage-Superset (binäre Suche), nur Roboter aus ROBOT_NAME_MAP (Donald, Mickey)
+df_jobs = dashboard_service.load_jobs(date_start, date_end)
+df_util = dashboard_service.load_utilization(date_start, date_end)
+kpis = dashboard_service.compute_kpis(df_jobs, df_util, today)
 df_util_complete = df_util[df_util["date"] < today] if not df_util.empty else pd.DataFrame()
-df_util_kpi = df_util_complete[df_util_complete["robot_name"].astype(str).str.contains("RPA-", na=False)] if not df_util_complete.empty else pd.DataFrame()
-if df_util_kpi.empty:
-    df_util_kpi = df_util_complete
-idle_hours_sum = df_util_kpi["idle_hours"].sum() if not df_util_kpi.empty else 0.0
 
 # --- Overview KPIs ---
 st.header("Übersicht")
@@ -282,22 +214,16 @@ if df_jobs.empty and df_util.empty:
 
 c1, c2, c3, c4 = st.columns(4)
 with c1:
-    avg_util_raw = df_util_kpi["utilization_percent"].mean() if not df_util_kpi.empty else (df_util["utilization_percent"].mean() if not df_util.empty else 0)
-    avg_util = min(100.0, avg_util_raw)
-    st.metric("Ø Utilization %", f"{avg_util:.1f}%")
+    st.metric("Ø Utilization %", f"{kpis['avg_util']:.1f}%")
     st.caption("Durchschnitt pro Robot (Donald/Mickey), nur abgeschlossene Tage.")
 with c2:
-    st.metric("Leerlauf (ungenutzte Robot-Stunden)", f"{idle_hours_sum:.1f}h")
+    st.metric("Leerlauf (ungenutzte Robot-Stunden)", f"{kpis['idle_hours_sum']:.1f}h")
     st.caption("Donald + Mickey addiert: Zeit, in der ein Robot keinen Job hatte (Potenzial für mehr Prozesse).")
 with c3:
-    total = len(df_jobs)
-    success = (df_jobs["state"] == "Successful").sum() if not df_jobs.empty else 0
-    rate = (success / total * 100) if total else 0
-    st.metric("Success Rate", f"{rate:.1f}%")
+    st.metric("Success Rate", f"{kpis['success_rate']:.1f}%")
     st.caption("Anteil der erfolgreich abgeschlossenen Jobs")
 with c4:
-    impact = idle_hours_sum * 50
-    impact_formatted = f"{impact:,.0f}".replace(",", ".")
+    impact_formatted = f"{kpis['impact']:,.0f}".replace(",", ".")
     st.metric("Business Impact (Idle)", f"€{impact_formatted}")
     st.caption("Geschätzter Verlust durch Idle-Zeit (50 €/h)")
 
@@ -352,11 +278,7 @@ def render_weekly_trends_section(trends_data: dict) -> None:
         pass
 
 try:
-    from backend.services.trends_service import calculate_weekly_trends
-    _db = SessionLocal()
-    trends = calculate_weekly_trends(_db, 90)
-    _db.close()
-    render_weekly_trends_section(trends)
+    render_weekly_trends_section(dashboard_service.weekly_trends(today))
 except Exception as e:
     st.warning(f"Wochen-Vergleich nicht verfügbar: {e}")
 
@@ -364,10 +286,10 @@ except Exception as e:
 st.header("Utilization pro Robot")
 st.caption("Prozentuale Auslastung pro Robot (24h-Tagesbasis), nur abgeschlossene Tage.")
 if not df_util.empty:
-    df_util_chart = (df_util_complete if not df_util_complete.empty else df_util).copy()
+    df_util_chart = df_util_complete if not df_util_complete.empty else df_util
     df_util_chart = df_util_chart[df_util_chart["robot_name"].astype(str).str.contains("RPA-", na=False)]
     if df_util_chart.empty:
-        df_util_chart = (df_util_complete if not df_util_complete.empty else df_util).copy()
+        df_util_chart = df_util_complete if not df_util_complete.empty else df_util
     by_robot = df_util_chart.groupby("robot_name").agg(
         utilization_percent=("utilization_percent", "mean"),
         idle_hours=("idle_hours", "sum"),
@@ -393,115 +315,66 @@ else:
     st.caption("Keine Utilization-Daten. Führe `python -m backend.calculate_utilization` aus.")
 
 # --- Timeline (Gantt) ---
-st.header("Timeline (Jobs)")
-if not df_jobs.empty and df_jobs["end_time"].notna().any():
-    try:
-        import plotly.express as px
-        gantt_df = df_jobs[df_jobs["end_time"].notna()].copy()
-        gantt_df["Start"] = pd.to_datetime(gantt_df["start_time"])
-        gantt_df["End"] = pd.to_datetime(gantt_df["end_time"])
-        gantt_df["Task"] = gantt_df["process_name"] + " (" + gantt_df["job_key"].astype(str).str[:8] + ")"
-        rk_col = "robot_key" if "robot_key" in gantt_df.columns else "robot_name"
-        gantt_df["display_robot"] = gantt_df[rk_col].map(_display_robot_name)
-        fig = px.timeline(
-            gantt_df, x_start="Start", x_end="End", y="display_robot",
-            color="state", title="Jobs nach Robot",
-            custom_data=["process_name", "Start", "End", "display_robot", "state"],
-        )
-        fig.update_traces(
-            hovertemplate="<b>%{customdata[0]}</b><br>Robot: %{customdata[3]}<br>Start: %{base}<br>Ende: %{x}<br>Status: %{customdata[4]}<extra></extra>"
-        )
-        fig.update_yaxes(autorange="reversed")
-        st.plotly_chart(fig, use_container_width=True)
-    except Exception as e:
-        st.warning(f"Timeline konnte nicht gezeichnet werden: {e}")
-else:
-    st.caption("Keine Jobs mit Endzeit für Timeline.")
+@st.fragment
+def render_timeline_section(df_jobs: pd.DataFrame) -> None:
+    st.header("Timeline (Jobs)")
+    if not df_jobs.empty and df_jobs["end_time"].notna().any():
+        try:
+            import plotly.express as px
+            from backend.services.timeline_service import GANTT_MAX_JOBS, timeline_frame
+            gantt_jobs = df_jobs[df_jobs["end_time"].notna()]
+            rk_col = "robot_key" if "robot_key" in gantt_jobs.columns else "robot_name"
+            if len(gantt_jobs) > GANTT_MAX_JOBS:
+                # Zoom: Detailansicht erst, wenn der gewählte Ausschnitt wenige Jobs enthält
+                t_min = gantt_jobs["start_time"].min().floor("h").to_pydatetime()
+                t_max = gantt_jobs["end_time"].max().ceil("h").to_pydatetime()
+                zoom = st.slider(
+                    "Zoom (Ausschnitt)", min_value=t_min, max_value=t_max, value=(t_min, t_max),
+                    step=timedelta(hours=1), format="DD.MM. HH:mm", key="gantt_zoom",
+                )
+                gantt_jobs = gantt_jobs[
+                    (gantt_jobs["start_time"] < pd.Timestamp(zoom[1])) & (gantt_jobs["end_time"] > pd.Timestamp(zoom[0]))
+                ]
+            timeline_df, timeline_info = timeline_frame(gantt_jobs, robot_col=rk_col)
+            if timeline_info["aggregated"]:
+                st.caption(
+                    f"{timeline_info['n_jobs']} Jobs zu Blöcken à {timeline_info['bucket']} zusammengefasst "
+                    f"(gleicher Robot & Status; Balkenlänge = belegte Zeit im Block, ab dem ersten Job). "
+                    f"Für Einzel-Jobs einen Ausschnitt mit ≤ {GANTT_MAX_JOBS} Jobs wählen."
+                )
+            timeline_df = timeline_df.assign(display_robot=timeline_df["robot"].map(_display_robot_name))
+            fig = px.timeline(
+                timeline_df, x_start="Start", x_end="End", y="display_robot",
+                color="state", title="Jobs nach Robot",
+                custom_data=["label", "Start", "End", "display_robot", "state"],
+            )
+            fig.update_traces(
+                hovertemplate="<b>%{customdata[0]}</b><br>Robot: %{customdata[3]}<br>Start: %{base}<br>Ende: %{x}<br>Status: %{customdata[4]}<extra></extra>"
+            )
+            fig.update_yaxes(autorange="reversed")
+            st.plotly_chart(fig, use_container_width=True)
+        except Exception as e:
+            st.warning(f"Timeline konnte nicht gezeichnet werden: {e}")
+    else:
+        st.caption("Keine Jobs mit Endzeit für Timeline.")
+
+
+render_timeline_section(df_jobs)
 
 # --- Leerlauf pro Tag ---
 st.header("Leerlauf pro Tag")
 st.caption("Pro Tag: Donald-Leerlauf + Mickey-Leerlauf (Zeiten, in denen ein Robot keinen Job hatte – Potenzial für mehr Prozesse). Nur abgeschlossene Tage.")
 if not df_jobs.empty and df_jobs["end_time"].notna().any():
-    def _format_idle_min(minutes: float) -> str:
-        if minutes <= 0:
-            return "0 min"
-        h, m = divmod(int(minutes), 60)
-        if h > 0:
-            return f"{h}h {m}min"
-        return f"{int(minutes)} min"
-
-    start_dates = pd.to_datetime(df_jobs["start_time"]).dt.date
-    end_dates = pd.to_datetime(df_jobs["end_time"]).dt.date
-    all_dates_sorted = sorted(set(start_dates.dropna()) | set(end_dates.dropna()), reverse=True)
-    completed_dates = [d for d in all_dates_sorted if d < today]
-    dates_to_show = completed_dates[:7]
-
-    for d in dates_to_show:
-        day_start = datetime.combine(d, datetime.min.time())
-        day_end = datetime.combine(d, datetime.max.time())
-        start_ts = pd.to_datetime(df_jobs["start_time"])
-        end_ts = pd.to_datetime(df_jobs["end_time"])
-        day_jobs = df_jobs[
-            (start_ts < pd.Timestamp(day_end))
-            & (end_ts >= pd.Timestamp(day_start))
-            & (df_jobs["end_time"].notna())
-        ].copy()
-        day_jobs = day_jobs[day_jobs["robot_key"].astype(str).str.contains("RPA-", na=False)]
-        if day_jobs.empty:
-            continue
-        sum_idle_min_day = 0.0
-        timeline_entries: list[dict] = []
-        for rk in day_jobs["robot_key"].unique():
-            rj = day_jobs[day_jobs["robot_key"] == rk].sort_values("start_time")
-            prev_end = day_start
-            for _, j in rj.iterrows():
-                s, e = j["start_time"], j["end_time"]
-                if s is None or e is None:
-                    continue
-                s = pd.Timestamp(s).to_pydatetime() if hasattr(s, "to_pydatetime") else s
-                e = pd.Timestamp(e).to_pydatetime() if hasattr(e, "to_pydatetime") else e
-                s_in = max(s, day_start)
-                e_in = min(e, day_end)
-                if e_in <= s_in:
-                    continue
-                if s_in > prev_end:
-                    gap_min = (s_in - prev_end).total_seconds() / 60
-                    sum_idle_min_day += gap_min
-                    if gap_min >= 1:
-                        timeline_entries.append({
-                            "Von": prev_end, "Bis": s_in,
-                            "Prozess": "— Leerlauf —", "Robot": _display_robot_name(rk),
-                            "Dauer": _format_idle_min(gap_min), "Status": "",
-                        })
-                timeline_entries.append({
-                    "Von": s_in, "Bis": e_in,
-                    "Prozess": j["process_name"] or "(ohne Name)", "Robot": _display_robot_name(rk),
-                    "Dauer": f"{int((e_in - s_in).total_seconds() // 3600)}h {int((e_in - s_in).total_seconds() % 3600 // 60)}min" if (e_in - s_in).total_seconds() >= 3600 else f"{int((e_in - s_in).total_seconds() // 60)}min",
-                    "Status": j["state"] or "",
-                })
-                prev_end = max(prev_end, e_in)
-            if prev_end < day_end:
-                gap_min = (day_end - prev_end).total_seconds() / 60
-                sum_idle_min_day += gap_min
-                if gap_min >= 1:
-                    timeline_entries.append({
-                        "Von": prev_end, "Bis": day_end,
-                        "Prozess": "— Leerlauf —", "Robot": _display_robot_name(rk),
-                        "Dauer": _format_idle_min(gap_min), "Status": "",
-                    })
-        timeline_entries.sort(key=lambda x: x["Von"])
-        sum_idle_min_day = min(sum_idle_min_day, 24 * 60 * 2)
-        idle_str = _format_idle_min(sum_idle_min_day)
-        with st.expander(f"**{d.strftime('%d.%m.%Y')}** — Leerlauf (Donald + Mickey): **{idle_str}**", expanded=False):
-            if timeline_entries:
-                tbl = pd.DataFrame(timeline_entries)
-                tbl["Von"] = pd.to_datetime(tbl["Von"]).dt.strftime("%H:%M")
-                tbl["Bis"] = pd.to_datetime(tbl["Bis"]).dt.strftime("%H:%M")
-                display_tbl = tbl[["Von", "Bis", "Prozess", "Robot", "Dauer", "Status"]].copy()
+    idle_days = dashboard_service.idle_days(df_jobs, date_start, min(date_end, yesterday), last_n_days=7)
+    for day in idle_days:
+        with st.expander(f"**{day['date'].strftime('%d.%m.%Y')}** — Leerlauf (Donald + Mickey): **{day['idle_str']}**", expanded=False):
+            tbl = day["table"]
+            if not tbl.empty:
+                display_tbl = tbl[["Von", "Bis", "Prozess", "Robot", "Dauer", "Status"]]
+                idle_rows = tbl["is_idle"].tolist()
                 st.caption("Chronologisch: Jobs und Leerläufe pro Robot (wann welcher Robot idle war). Leerlauf-Zeilen rot markiert.")
                 def _row_bg(row):
-                    is_leerlauf = "Leerlauf" in str(row["Prozess"])
-                    return ["background-color: #ffcccc" if is_leerlauf else ""] * len(row)
+                    return ["background-color: #ffcccc" if idle_rows[row.name] else ""] * len(row)
                 try:
                     styled = display_tbl.style.apply(_row_bg, axis=1).set_table_styles([
                         {"selector": "th", "props": [("font-size", "12px"), ("text-align", "left")]},
@@ -520,12 +393,11 @@ def _process_durations_from_df(df_jobs: pd.DataFrame) -> list[tuple[str, float]]
     """(process_name, Ø Dauer in Min) aus df_jobs, sortiert nach Dauer aufsteigend. Gleiche Basis wie Prozess-Detail."""
     if df_jobs.empty or "end_time" not in df_jobs.columns or "start_time" not in df_jobs.columns:
         return []
-    df = df_jobs.copy()
-    df["dur_sec"] = (df["end_time"] - df["start_time"]).dt.total_seconds()
+    df = df_jobs.assign(dur_sec=(df_jobs["end_time"] - df_jobs["start_time"]).dt.total_seconds())
     df = df[df["dur_sec"].notna() & (df["dur_sec"] > 0)]
     if df.empty:
         return []
-    proc = df.groupby("process_name")["dur_sec"].mean().reset_index()
+    proc = df.groupby("process_name", observed=True)["dur_sec"].mean().reset_index()
     proc = proc[proc["process_name"].astype(str).str.strip() != ""]
     if proc.empty:
         return []
@@ -534,6 +406,7 @@ def _process_durations_from_df(df_jobs: pd.DataFrame) -> list[tuple[str, float]]
     return out
 
 
+@st.fragment
 def render_quickwins_section(quickwins_data: dict) -> None:
     st.header("Quick Wins – Sofort umsetzbare Optimierungen")
     with st.expander("Wie funktioniert Quick Wins?"):
@@ -609,12 +482,33 @@ def render_quickwins_section(quickwins_data: dict) -> None:
                 st.metric("Impact", f"€{window.get('impact_euro_month', 0):.0f}/Monat")
         st.divider()
         win_number += 1
+    plan = quickwins_data.get("trigger_plan") or {}
+    if plan.get("plan"):
+        st.subheader("Trigger-Plan (Prozesse in Idle-Lücken packen)")
+        solver_txt = "exakt optimiert" if plan.get("solver") == "exact" and plan.get("optimal") else "Heuristik (Best-Fit)"
+        st.caption(
+            "Prozesse werden so auf gemessene Idle-Lücken (an mind. 4 Tagen frei) verteilt, dass ihre p95-Laufzeit "
+            f"(Worst-Case) ab dem Trigger in die Lücke passt; Ziel = maximal zurückgewonnene Robot-Stunden ({solver_txt})."
+        )
+        pc1, pc2 = st.columns(2)
+        with pc1:
+            st.metric("Zurückgewonnen", f"{plan.get('recovered_hours_week', 0):.1f}h/Woche")
+        with pc2:
+            st.metric("Impact Trigger-Plan", f"€{plan.get('impact_euro_month', 0):.0f}/Monat")
+        plan_df = pd.DataFrame(plan["plan"])
+        plan_df["robot"] = plan_df["robot"].map(_display_robot_name)
+        st.dataframe(
+            plan_df[["robot", "gap", "trigger_time", "process_name", "p50_minutes", "p95_minutes"]].rename(columns={
+                "robot": "Robot", "gap": "Idle-Lücke", "trigger_time": "Trigger", "process_name": "Prozess",
+                "p50_minutes": "p50 (min)", "p95_minutes": "p95 (min)",
+            }),
+            use_container_width=True,
+            hide_index=True,
+        )
 
 try:
-    from backend.services.quickwins_service import analyze_quickwins
-    _db = SessionLocal()
-    quickwins = analyze_quickwins(_db, days=7)
-    _db.close()
+    # Geteiltes Ergebnis (alle Sessions) – Vorschläge werden pro Session auf einer Kopie ergänzt
+    quickwins = copy.deepcopy(dashboard_service.quickwins(today))
     # Vorschläge aus denselben Daten wie Prozess-Detail (df_jobs), alle passenden (kein Limit)
     process_durations_fe = _process_durations_from_df(df_jobs)
     for r in quickwins.get("recurring_idle", []):
@@ -628,238 +522,302 @@ try:
 except Exception as e:
     st.warning(f"Quick Wins Analyse nicht verfügbar: {e}")
 
-# --- Prozess-Detail: Laufzeiten & Scheduling ---
-proc_df = _compute_process_stats(df_jobs)
-st.header("Prozess-Detail: Laufzeiten & Scheduling")
-st.caption("Für optimale Trigger-Planung: Runs, Success Rate, Ø-/Min-/Max-Laufzeit pro Prozess.")
-if proc_df is not None and not proc_df.empty:
-    detail = proc_df.sort_values("runs", ascending=False).copy()
-    detail["Ø Dauer"] = detail["duration_mean"].apply(_format_duration)
-    detail["Min"] = detail["duration_min"].apply(_format_duration)
-    detail["Max (Worst-Case)"] = detail["duration_max"].apply(_format_duration)
+# --- What-if Simulation: Kapazität ---
+@st.fragment
+def render_simulation_section(df_jobs: pd.DataFrame) -> None:
+    st.header("What-if Simulation (Kapazität)")
+    st.caption(
+        "Spielt die Jobs der letzten 30 Tage erneut ab (Start = Ankunft, echte Laufzeiten) und zeigt, "
+        "wie sich Auslastung, Leerlauf und Wartezeiten ändern, wenn Roboter wegfallen/hinzukommen oder neue Prozesse geplant werden."
+    )
+    robot_keys = sorted(k for k in ROBOT_NAME_MAP.keys() if k in set(df_jobs["robot_key"].astype(str))) if not df_jobs.empty else []
+    process_names = sorted(p for p in df_jobs["process_name"].astype(str).unique() if p) if not df_jobs.empty else []
+    with st.form("simulation_form"):
+        f1, f2, f3 = st.columns(3)
+        with f1:
+            add_robots = st.number_input("Zusätzliche Roboter", min_value=0, max_value=10, value=0, step=1)
+            remove_robots = st.multiselect("Roboter entfernen", options=robot_keys, format_func=_display_robot_name)
+        with f2:
+            extra_process = st.selectbox("Zusätzlicher Prozess", options=["(keiner)"] + process_names)
+            extra_runs = st.number_input("Läufe pro Tag", min_value=1, max_value=96, value=1, step=1)
+        with f3:
+            extra_start = st.number_input("Erster Start (Stunde)", min_value=0, max_value=23, value=0, step=1)
+            extra_fixed = st.number_input("Feste Dauer (min, 0 = aus Historie)", min_value=0, max_value=24 * 60, value=0, step=5)
+        submitted = st.form_submit_button("Simulieren")
+    if not submitted:
+        return
+    scenario: dict = {"name": "Szenario", "add_robots": int(add_robots), "remove_robots": list(remove_robots)}
+    if extra_process != "(keiner)":
+        scenario["extra_processes"] = [{
+            "process_name": extra_process,
+            "runs_per_day": int(extra_runs),
+            "start_hour": int(extra_start),
+            "duration_minutes": float(extra_fixed) if extra_fixed else None,
+        }]
+    from backend.services.simulation_service import run_scenarios
+    _db = ReadSessionLocal()
+    try:
+        results = run_scenarios(_db, [scenario], days=30, robots=set(robot_keys) or None)
+    finally:
+        _db.close()
+    sim_df = pd.DataFrame(results)
     st.dataframe(
-        detail[["process_name", "runs", "success_rate", "Ø Dauer", "Min", "Max (Worst-Case)"]].rename(
-            columns={"process_name": "Prozess", "runs": "Runs", "success_rate": "Success Rate %"}
-        ),
+        sim_df[["name", "robots", "jobs", "utilization_percent", "idle_hours", "avg_wait_minutes", "p95_wait_minutes", "backlog_jobs", "backlog_hours"]].rename(columns={
+            "name": "Szenario", "robots": "Roboter", "jobs": "Jobs", "utilization_percent": "Ø Auslastung %",
+            "idle_hours": "Leerlauf (h)", "avg_wait_minutes": "Ø Wartezeit (min)", "p95_wait_minutes": "p95 Wartezeit (min)",
+            "backlog_jobs": "Rückstau (Jobs)", "backlog_hours": "Rückstau (h)",
+        }),
         use_container_width=True,
         hide_index=True,
     )
-    try:
-        import plotly.graph_objects as go
-        n_chart = min(20, len(detail))
-        chart_df = detail.head(n_chart).sort_values("runs", ascending=True)
-        st.subheader("Runs pro Prozess (Wichtigkeit)")
-        fig_runs = go.Figure(go.Bar(x=chart_df["runs"], y=chart_df["process_name"], orientation="h"))
-        fig_runs.update_layout(xaxis_title="Anzahl Runs", height=400 + n_chart * 18, margin=dict(l=180), showlegend=False)
-        st.plotly_chart(fig_runs, use_container_width=True)
-        st.subheader("Success Rate pro Prozess")
-        sr_colors = chart_df["success_rate"].apply(lambda x: "#2e7d32" if x >= 80 else "#f9a825" if x >= 50 else "#c62828").tolist()
-        fig_sr = go.Figure(go.Bar(x=chart_df["success_rate"], y=chart_df["process_name"], orientation="h", marker_color=sr_colors))
-        fig_sr.update_layout(xaxis_title="Success Rate %", xaxis_range=[0, 100], xaxis_dtick=10, height=400 + n_chart * 18, margin=dict(l=180), showlegend=False)
-        st.plotly_chart(fig_sr, use_container_width=True)
-        st.caption("Grün ≥80 %, Gelb 50–80 %, Rot <50 %")
-        st.subheader("Prozess-Verlauf über die Zeit")
-        st.caption("Prozess wählen, um zu sehen, wie sich Success Rate und Läufe im gewählten Zeitraum entwickelt haben.")
-        selected_process = st.selectbox("Prozess auswählen", options=detail.sort_values("runs", ascending=False)["process_name"].tolist(), index=0, key="process_trend_select", label_visibility="collapsed")
-        if selected_process and not df_jobs.empty:
-            proc_jobs = df_jobs[df_jobs["process_name"] == selected_process].copy()
-            if not proc_jobs.empty:
-                proc_jobs["date"] = pd.to_datetime(proc_jobs["start_time"]).dt.date
-                by_day = proc_jobs.groupby("date").agg(runs=("job_key", "count"), success=("state", lambda s: (s == "Successful").sum())).reset_index()
-                by_day["success_rate"] = (by_day["success"] / by_day["runs"] * 100).round(1)
-                by_day = by_day.sort_values("date")
-                try:
-                    fig_sr_trend = go.Figure()
-                    fig_sr_trend.add_trace(go.Scatter(x=by_day["date"], y=by_day["success_rate"], mode="lines+markers", line=dict(color="#0066CC", width=2), marker=dict(size=8)))
-                    fig_sr_trend.update_layout(title=f"Success Rate über die Zeit – „{selected_process}“", xaxis_title="Datum", yaxis_title="Success Rate %", yaxis_range=[0, 105], height=320, showlegend=False)
-                    st.plotly_chart(fig_sr_trend, use_container_width=True)
-                    fig_runs_trend = go.Figure(go.Bar(x=by_day["date"], y=by_day["runs"], marker_color="#B0BEC5"))
-                    fig_runs_trend.update_layout(title=f"Läufe pro Tag – „{selected_process}“", xaxis_title="Datum", yaxis_title="Anzahl Läufe", height=280, showlegend=False)
-                    st.plotly_chart(fig_runs_trend, use_container_width=True)
-                except Exception:
-                    st.dataframe(by_day.rename(columns={"date": "Datum", "runs": "Läufe", "success": "Erfolgreich", "success_rate": "Success Rate %"}), use_container_width=True, hide_index=True)
-        st.subheader("Laufzeiten (Ø und Worst-Case)")
-        duration_minutes_mean = chart_df["duration_mean"] / 60.0
-        duration_minutes_max = chart_df["duration_max"] / 60.0
-        fig_dur = go.Figure()
-        fig_dur.add_trace(go.Bar(name="Ø Dauer (min)", x=chart_df["process_name"], y=duration_minutes_mean.round(1), marker_color="#0066CC"))
-        fig_dur.add_trace(go.Bar(name="Max / Worst-Case (min)", x=chart_df["process_name"], y=duration_minutes_max.round(1), marker_color="#B0BEC5"))
-        fig_dur.update_layout(barmode="group", xaxis_tickangle=-45, yaxis_title="Minuten", yaxis_rangemode="tozero", height=max(400, n_chart * 28), margin=dict(b=120, t=40), showlegend=True)
-        st.plotly_chart(fig_dur, use_container_width=True)
-    except Exception:
-        pass
-else:
-    st.info("Keine Prozess-Daten für den gewählten Zeitraum.")
 
-# ========== Experimentell: Messstellen-Dashboard (Ablehnen / Reklamation) ==========
-# Master: data/ablehnen_messstellen_summary.csv (nur Tag + Anzahl, keine Malos). Fallback: erledigt/*.csv
-def _load_ablehnen_messstellen_per_day() -> pd.DataFrame | None:
-    """Liest zuerst data/ablehnen_messstellen_summary.csv (Master); falls nicht vorhanden/leer: erledigt-*.csv."""
-    master_path = ROOT / "data" / "ablehnen_messstellen_summary.csv"
-    if master_path.is_file():
+try:
+    render_simulation_section(df_jobs)
+except Exception as e:
+    st.warning(f"Simulation nicht verfügbar: {e}")
+
+# --- Prozess-Detail: Laufzeiten & Scheduling ---
+@st.fragment
+def render_process_trend(df_jobs: pd.DataFrame, process_options: list[str], date_start: date, date_end: date) -> None:
+    """Prozess-Verlauf: eigenes Fragment, damit die Prozess-Auswahl nur diesen Teil neu rendert."""
+    import plotly.graph_objects as go
+    selected_process = st.selectbox("Prozess auswählen", options=process_options, index=0, key="process_trend_select", label_visibility="collapsed")
+    if selected_process and not df_jobs.empty:
+        by_day = dashboard_service.process_daily_trend(df_jobs, selected_process, date_start, date_end)
+        if not by_day.empty:
+            try:
+                fig_sr_trend = go.Figure()
+                fig_sr_trend.add_trace(go.Scatter(x=by_day["date"], y=by_day["success_rate"], mode="lines+markers", line=dict(color="#0066CC", width=2), marker=dict(size=8)))
+                fig_sr_trend.update_layout(title=f"Success Rate über die Zeit – „{selected_process}“", xaxis_title="Datum", yaxis_title="Success Rate %", yaxis_range=[0, 105], height=320, showlegend=False)
+                st.plotly_chart(fig_sr_trend, use_container_width=True)
+                fig_runs_trend = go.Figure(go.Bar(x=by_day["date"], y=by_day["runs"], marker_color="#B0BEC5"))
+                fig_runs_trend.update_layout(title=f"Läufe pro Tag – „{selected_process}“", xaxis_title="Datum", yaxis_title="Anzahl Läufe", height=280, showlegend=False)
+                st.plotly_chart(fig_runs_trend, use_container_width=True)
+            except Exception:
+                st.dataframe(by_day.rename(columns={"date": "Datum", "runs": "Läufe", "success": "Erfolgreich", "success_rate": "Success Rate %"}), use_container_width=True, hide_index=True)
+
+
+def render_process_detail_section(df_jobs: pd.DataFrame, date_start: date, date_end: date) -> None:
+    proc_df = dashboard_service.process_stats(df_jobs)
+    st.header("Prozess-Detail: Laufzeiten & Scheduling")
+    st.caption("Für optimale Trigger-Planung: Runs, Success Rate, Ø-/Min-/Max-Laufzeit pro Prozess.")
+    if proc_df is not None and not proc_df.empty:
+        detail = proc_df.sort_values("runs", ascending=False)
+        detail["Ø Dauer"] = detail["duration_mean"].apply(_format_duration)
+        detail["Min"] = detail["duration_min"].apply(_format_duration)
+        detail["Max (Worst-Case)"] = detail["duration_max"].apply(_format_duration)
+        st.dataframe(
+            detail[["process_name", "runs", "success_rate", "Ø Dauer", "Min", "Max (Worst-Case)"]].rename(
+                columns={"process_name": "Prozess", "runs": "Runs", "success_rate": "Success Rate %"}
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
         try:
-            df = pd.read_csv(master_path)
-            if not df.empty and "date" in df.columns and "n" in df.columns:
-                df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
-                df = df.dropna(subset=["date", "n"])
-                if not df.empty:
-                    df = df.sort_values("date").reset_index(drop=True)
-                    return df
-        except Exception:
-            pass
-    import re
-    erledigt_dir = ROOT / "Claude Input" / "Ablehnen_Analyse" / "erledigt"
-    if not erledigt_dir.is_dir():
-        return None
-    date_counts: list[tuple[date, int]] = []
-    ts_fmt = "%d.%m.%Y %H:%M:%S"
-    re_dates = re.compile(r"(\d{8})")
-    for csv_path in erledigt_dir.glob("*.csv"):
+            from backend.services.regression_service import recent_flags
+            _db = ReadSessionLocal()
+            try:
+                flags = recent_flags(_db, datetime.combine(date_start, datetime.min.time()))
+            finally:
+                _db.close()
+            if flags:
+                st.subheader("Auffälligkeiten: Laufzeit-Regressionen & Fehler-Spitzen")
+                st.caption("Statistisch signifikante Verlangsamung (CUSUM auf Laufzeit) bzw. Anstieg der Fehlerrate, nach jedem Sync erkannt.")
+                flags_df = pd.DataFrame(flags)
+                is_slow = flags_df["kind"] == "slowdown"
+                flags_df["Art"] = is_slow.map({True: "Langsamer", False: "Fehlerrate ↑"})
+                flags_df["Erkannt"] = pd.to_datetime(flags_df["detected_at"]).dt.strftime("%d.%m.%Y %H:%M")
+                flags_df["Vorher"] = [
+                    _format_duration(v) if slow else f"{v * 100:.0f}%" for v, slow in zip(flags_df["baseline_value"], is_slow)
+                ]
+                flags_df["Jetzt"] = [
+                    _format_duration(v) if slow else f"{v * 100:.0f}%" for v, slow in zip(flags_df["current_value"], is_slow)
+                ]
+                flags_df["Änderung"] = [
+                    f"{c:+.0f}%" if slow else f"{c:+.0f} Pp." for c, slow in zip(flags_df["change_percent"].fillna(0), is_slow)
+                ]
+                st.dataframe(
+                    flags_df[["Erkannt", "process_name", "Art", "Vorher", "Jetzt", "Änderung"]].rename(columns={"process_name": "Prozess"}),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+        except Exception as e:
+            st.warning(f"Regressions-Erkennung nicht verfügbar: {e}")
         try:
-            df = pd.read_csv(csv_path, sep=";", encoding="utf-8", on_bad_lines="skip")
+            import plotly.graph_objects as go
+            n_chart = min(20, len(detail))
+            chart_df = detail.head(n_chart).sort_values("runs", ascending=True)
+            st.subheader("Runs pro Prozess (Wichtigkeit)")
+            fig_runs = go.Figure(go.Bar(x=chart_df["runs"], y=chart_df["process_name"], orientation="h"))
+            fig_runs.update_layout(xaxis_title="Anzahl Runs", height=400 + n_chart * 18, margin=dict(l=180), showlegend=False)
+            st.plotly_chart(fig_runs, use_container_width=True)
+            st.subheader("Success Rate pro Prozess")
+            sr_colors = chart_df["success_rate"].apply(lambda x: "#2e7d32" if x >= 80 else "#f9a825" if x >= 50 else "#c62828").tolist()
+            fig_sr = go.Figure(go.Bar(x=chart_df["success_rate"], y=chart_df["process_name"], orientation="h", marker_color=sr_colors))
+            fig_sr.update_layout(xaxis_title="Success Rate %", xaxis_range=[0, 100], xaxis_dtick=10, height=400 + n_chart * 18, margin=dict(l=180), showlegend=False)
+            st.plotly_chart(fig_sr, use_container_width=True)
+            st.caption("Grün ≥80 %, Gelb 50–80 %, Rot <50 %")
+            st.subheader("Prozess-Verlauf über die Zeit")
+            st.caption("Prozess wählen, um zu sehen, wie sich Success Rate und Läufe im gewählten Zeitraum entwickelt haben.")
+            render_process_trend(df_jobs, detail["process_name"].tolist(), date_start, date_end)
+            st.subheader("Laufzeiten (Ø und Worst-Case)")
+            duration_minutes_mean = chart_df["duration_mean"] / 60.0
+            duration_minutes_max = chart_df["duration_max"] / 60.0
+            fig_dur = go.Figure()
+            fig_dur.add_trace(go.Bar(name="Ø Dauer (min)", x=chart_df["process_name"], y=duration_minutes_mean.round(1), marker_color="#0066CC"))
+            fig_dur.add_trace(go.Bar(name="Max / Worst-Case (min)", x=chart_df["process_name"], y=duration_minutes_max.round(1), marker_color="#B0BEC5"))
+            fig_dur.update_layout(barmode="group", xaxis_tickangle=-45, yaxis_title="Minuten", yaxis_rangemode="tozero", height=max(400, n_chart * 28), margin=dict(b=120, t=40), showlegend=True)
+            st.plotly_chart(fig_dur, use_container_width=True)
         except Exception:
-            try:
-                df = pd.read_csv(csv_path, sep=";", encoding="latin-1", on_bad_lines="skip")
-            except Exception:
-                continue
-        if df.empty:
-            continue
-        matches = re_dates.findall(csv_path.stem)
-        file_date: date | None = None
-        if matches:
-            last_ymd = matches[-1]
-            file_date = datetime.strptime(last_ymd, "%Y%m%d").date()
-        col_ts = None
-        for c in ["RPA_Timestemp", "RPA_Timestemp ", "RPA_Timestamp"]:
-            if c in df.columns:
-                col_ts = c
-                break
-        if col_ts is None:
-            col_ts = next((c for c in df.columns if "timestemp" in c.lower() or "timestamp" in c.lower()), None)
-        if col_ts:
-            for _, row in df.iterrows():
-                val = row.get(col_ts)
-                if pd.notna(val) and str(val).strip():
-                    try:
-                        dt = datetime.strptime(str(val).strip()[:19], ts_fmt)
-                        date_counts.append((dt.date(), 1))
-                    except ValueError:
-                        if file_date is not None:
-                            date_counts.append((file_date, 1))
-                elif file_date is not None:
-                    date_counts.append((file_date, 1))
-        elif file_date is not None:
-            date_counts.append((file_date, len(df)))
-    if not date_counts:
+            pass
+    else:
+        st.info("Keine Prozess-Daten für den gewählten Zeitraum.")
+
+
+render_process_detail_section(df_jobs, date_start, date_end)
+
+# ========== Experimentell: Messstellen-Dashboard (Ablehnen / Reklamation) ==========
+# Master: data/ablehnen_messstellen_summary.csv (nur Tag + Anzahl, keine Malos). Fallback: erledigt/*.csv
+def _load_ablehnen_messstellen_per_day() -> pd.DataFrame | None:
+    """Liest zuerst data/ablehnen_messstellen_summary.csv (Master); falls nicht vorhanden/leer: erledigt-*.csv über den Index."""
+    from backend.services import ablehnen_index
+    try:
+        df = ablehnen_index.load_summary()
+        if df is not None and not df.empty:
+            return df
+    except Exception:
+        pass
+    if not ablehnen_index.ERLEDIGT_DIR.is_dir():
         return None
-    agg = pd.DataFrame(date_counts, columns=["date", "n"]).groupby("date", as_index=False)["n"].sum()
-    agg = agg.sort_values("date").reset_index(drop=True)
-    return agg
+    # Nur neue/geänderte Exporte werden gelesen, der Rest kommt aus data/ablehnen_index.json
+    index, _ = ablehnen_index.update_index()
+    agg = ablehnen_index.per_day_counts(index)
+    return agg if not agg.empty else None
 
-st.divider()
-st.header("Datensätze bearbeitet pro Prozess – experimentell")
-PROZESS_OPTIONS_MESSSTELLEN = ["Reklamation Ablehnen", "Weitere Prozesse (folgen)"]
-selected_messstellen_prozess = st.selectbox(
-    "Prozess auswählen",
-    options=PROZESS_OPTIONS_MESSSTELLEN,
-    index=0,
-    key="messstellen_prozess_select",
-    label_visibility="collapsed",
-)
-if selected_messstellen_prozess == "Reklamation Ablehnen":
-    ablehnen_process_mask = df_jobs["process_name"].astype(str).str.contains("Ablehnen", case=False, na=False) if not df_jobs.empty else pd.Series(dtype=bool)
-    proc_jobs_abl = df_jobs[ablehnen_process_mask].copy() if not df_jobs.empty and ablehnen_process_mask.any() else pd.DataFrame()
-    if not proc_jobs_abl.empty and "process_name" in proc_jobs_abl.columns:
-        uipath_process_name = proc_jobs_abl["process_name"].iloc[0]
-    else:
-        uipath_process_name = "Reklamation Ablehnen"
-    ablehnen_df = _load_ablehnen_messstellen_per_day()
-    if ablehnen_df is not None and not ablehnen_df.empty:
-        cutoff = today - timedelta(days=31)
-        ablehnen_df = ablehnen_df[ablehnen_df["date"] >= cutoff].copy()
-        # Ausreißer 21.01.2026: 55 → 20 ersetzen
-        outlier_date = date(2026, 1, 21)
-        ablehnen_df.loc[ablehnen_df["date"] == outlier_date, "n"] = 20
-    # Quick Facts: eine Zeile, darunter passend ausgerichtet (Tage/Messstellen unter Dauer, Max Runtime unter Runs)
-    total_runs = len(proc_jobs_abl) if not proc_jobs_abl.empty else 0
-    sr_pct = 0.0
-    avg_dur_min = 0.0
-    max_dur_min = 0.0
-    if not proc_jobs_abl.empty:
-        success_count = (proc_jobs_abl["state"] == "Successful").sum()
-        sr_pct = (success_count / total_runs * 100) if total_runs else 0
-        dur_sec = pd.to_datetime(proc_jobs_abl["end_time"]) - pd.to_datetime(proc_jobs_abl["start_time"])
-        dur_sec = dur_sec[dur_sec.notna()].dt.total_seconds()
-        if len(dur_sec):
-            avg_dur_min = dur_sec.mean() / 60.0
-            max_dur_min = dur_sec.max() / 60.0
-    qf1, qf2, qf3 = st.columns(3)
-    with qf1:
-        st.metric("Success Rate", f"{sr_pct:.1f}%")
-        if ablehnen_df is not None and not ablehnen_df.empty:
-            st.metric("Tage mit Daten", len(ablehnen_df))
-    with qf2:
-        st.metric("Ø Dauer", f"{avg_dur_min:.1f} min")
+
+@st.fragment
+def render_messstellen_section(date_start: date, date_end: date) -> None:
+    st.divider()
+    st.header("Datensätze bearbeitet pro Prozess – experimentell")
+    PROZESS_OPTIONS_MESSSTELLEN = ["Reklamation Ablehnen", "Weitere Prozesse (folgen)"]
+    selected_messstellen_prozess = st.selectbox(
+        "Prozess auswählen",
+        options=PROZESS_OPTIONS_MESSSTELLEN,
+        index=0,
+        key="messstellen_prozess_select",
+        label_visibility="collapsed",
+    )
+    if selected_messstellen_prozess == "Reklamation Ablehnen":
+        # Nur die Ablehnen-Jobs und benötigten Spalten aus der DB (Filter in SQL)
+        proc_jobs_abl = dashboard_service.load_process_jobs(date_start, date_end, "Ablehnen")
+        if not proc_jobs_abl.empty and "process_name" in proc_jobs_abl.columns:
+            uipath_process_name = proc_jobs_abl["process_name"].iloc[0]
+        else:
+            uipath_process_name = "Reklamation Ablehnen"
+        ablehnen_df = _load_ablehnen_messstellen_per_day()
         if ablehnen_df is not None and not ablehnen_df.empty:
-            st.metric("Datensätze insgesamt (letzter Monat)", int(ablehnen_df["n"].sum()))
-    with qf3:
-        st.metric("Runs gesamt", total_runs)
-        st.metric("Max. Runtime", f"{max_dur_min:.1f} min")
-    if ablehnen_df is not None and not ablehnen_df.empty:
-        ablehnen_df = ablehnen_df.rename(columns={"date": "Datum", "n": "Messstellen"})
-        try:
-            import plotly.graph_objects as go
-            fig_abl = go.Figure()
-            fig_abl.add_trace(go.Scatter(x=ablehnen_df["Datum"], y=ablehnen_df["Messstellen"], mode="lines+markers", name="Messstellen", line=dict(color="#0066CC", width=2), marker=dict(size=6)))
-            fig_abl.update_layout(title=f"Datensätze (Messstellen) pro Tag – „{selected_messstellen_prozess}\"", xaxis_title="Datum", yaxis_title="Anzahl Messstellen", height=360, showlegend=False, yaxis_rangemode="tozero")
-            st.plotly_chart(fig_abl, use_container_width=True)
-        except Exception:
-            st.line_chart(ablehnen_df.set_index("Datum")["Messstellen"])
+            cutoff = today - timedelta(days=31)
+            ablehnen_df = ablehnen_df[ablehnen_df["date"] >= cutoff].copy()
+            # Ausreißer 21.01.2026: 55 → 20 ersetzen
+            outlier_date = date(2026, 1, 21)
+            ablehnen_df.loc[ablehnen_df["date"] == outlier_date, "n"] = 20
+        # Quick Facts: eine Zeile, darunter passend ausgerichtet (Tage/Messstellen unter Dauer, Max Runtime unter Runs)
+        total_runs = len(proc_jobs_abl) if not proc_jobs_abl.empty else 0
+        sr_pct = 0.0
+        avg_dur_min = 0.0
+        max_dur_min = 0.0
         if not proc_jobs_abl.empty:
-            proc_jobs_abl["date"] = pd.to_datetime(proc_jobs_abl["start_time"]).dt.date
-            by_day_abl = proc_jobs_abl.groupby("date").agg(runs=("job_key", "count"), success=("state", lambda s: (s == "Successful").sum())).reset_index()
-            by_day_abl["success_rate"] = (by_day_abl["success"] / by_day_abl["runs"] * 100).round(1)
-            by_day_abl = by_day_abl.sort_values("date")
+            success_count = (proc_jobs_abl["state"] == "Successful").sum()
+            sr_pct = (success_count / total_runs * 100) if total_runs else 0
+            dur_sec = proc_jobs_abl["end_time"] - proc_jobs_abl["start_time"]
+            dur_sec = dur_sec[dur_sec.notna()].dt.total_seconds()
+            if len(dur_sec):
+                avg_dur_min = dur_sec.mean() / 60.0
+                max_dur_min = dur_sec.max() / 60.0
+        qf1, qf2, qf3 = st.columns(3)
+        with qf1:
+            st.metric("Success Rate", f"{sr_pct:.1f}%")
+            if ablehnen_df is not None and not ablehnen_df.empty:
+                st.metric("Tage mit Daten", len(ablehnen_df))
+        with qf2:
+            st.metric("Ø Dauer", f"{avg_dur_min:.1f} min")
+            if ablehnen_df is not None and not ablehnen_df.empty:
+                st.metric("Datensätze insgesamt (letzter Monat)", int(ablehnen_df["n"].sum()))
+        with qf3:
+            st.metric("Runs gesamt", total_runs)
+            st.metric("Max. Runtime", f"{max_dur_min:.1f} min")
+        if ablehnen_df is not None and not ablehnen_df.empty:
+            ablehnen_df = ablehnen_df.rename(columns={"date": "Datum", "n": "Messstellen"})
             try:
-                fig_sr_abl = go.Figure()
-                fig_sr_abl.add_trace(go.Scatter(x=by_day_abl["date"], y=by_day_abl["success_rate"], mode="lines+markers", line=dict(color="#0066CC", width=2), marker=dict(size=8)))
-                fig_sr_abl.update_layout(title=f"Success Rate über die Zeit – „{uipath_process_name}\"", xaxis_title="Datum", yaxis_title="Success Rate %", yaxis_range=[0, 105], height=320, showlegend=False)
-                st.plotly_chart(fig_sr_abl, use_container_width=True)
+                import plotly.graph_objects as go
+                fig_abl = go.Figure()
+                fig_abl.add_trace(go.Scatter(x=ablehnen_df["Datum"], y=ablehnen_df["Messstellen"], mode="lines+markers", name="Messstellen", line=dict(color="#0066CC", width=2), marker=dict(size=6)))
+                fig_abl.update_layout(title=f"Datensätze (Messstellen) pro Tag – „{selected_messstellen_prozess}\"", xaxis_title="Datum", yaxis_title="Anzahl Messstellen", height=360, showlegend=False, yaxis_rangemode="tozero")
+                st.plotly_chart(fig_abl, use_container_width=True)
             except Exception:
-                pass
+                st.line_chart(ablehnen_df.set_index("Datum")["Messstellen"])
+            if not proc_jobs_abl.empty:
+                proc_jobs_abl = proc_jobs_abl.assign(date=proc_jobs_abl["start_time"].dt.date)
+                by_day_abl = proc_jobs_abl.groupby("date").agg(runs=("job_key", "count"), success=("state", lambda s: (s == "Successful").sum())).reset_index()
+                by_day_abl["success_rate"] = (by_day_abl["success"] / by_day_abl["runs"] * 100).round(1)
+                by_day_abl = by_day_abl.sort_values("date")
+                try:
+                    fig_sr_abl = go.Figure()
+                    fig_sr_abl.add_trace(go.Scatter(x=by_day_abl["date"], y=by_day_abl["success_rate"], mode="lines+markers", line=dict(color="#0066CC", width=2), marker=dict(size=8)))
+                    fig_sr_abl.update_layout(title=f"Success Rate über die Zeit – „{uipath_process_name}\"", xaxis_title="Datum", yaxis_title="Success Rate %", yaxis_range=[0, 105], height=320, showlegend=False)
+                    st.plotly_chart(fig_sr_abl, use_container_width=True)
+                except Exception:
+                    pass
+        else:
+            st.info(
+                "Keine Daten (letzter Monat). Auf Streamlit Cloud: Lokal „python -m backend.update_ablehnen_summary“ "
+                "ausführen (liest erledigt/*.csv), dann data/ablehnen_messstellen_summary.csv committen und pushen."
+            )
     else:
-        st.info(
-            "Keine Daten (letzter Monat). Auf Streamlit Cloud: Lokal „python -m backend.update_ablehnen_summary“ "
-            "ausführen (liest erledigt/*.csv), dann data/ablehnen_messstellen_summary.csv committen und pushen."
-        )
-else:
-    st.info("Für diesen Prozess sind noch keine Daten hinterlegt.")
+        st.info("Für diesen Prozess sind noch keine Daten hinterlegt.")
+
+
+render_messstellen_section(date_start, date_end)
 
 # --- Excel Export (ganz am Ende) ---
-st.divider()
-st.header("Excel-Export")
-exports_dir = ROOT / "exports"
-exports_dir.mkdir(exist_ok=True)
-
-def build_excel() -> Path:
-    from backend.services.export_service import export_daily_summary
-    fname = exports_dir / f"rpa_performance_{date_end.isoformat()}.xlsx"
-    db = SessionLocal()
-    try:
-        kpi_metrics = {"avg_util": avg_util, "idle_hours_sum": idle_hours_sum, "success_rate": rate, "impact": impact}
-        return export_daily_summary(db, date_start, date_end, kpi_metrics, df_util, fname)
-    finally:
-        db.close()
+@st.fragment
+def render_export_section(date_start: date, date_end: date, kpi_metrics: dict, df_util: pd.DataFrame) -> None:
+    st.divider()
+    st.header("Excel-Export")
+    from backend.services import job_archive
+    from backend.services.export_service import archive_gap, export_daily_summary
+    horizon = archive_gap(date_start)
+    if horizon is not None and job_archive.available():
+        st.caption(f"Jobs vor dem {horizon:%d.%m.%Y} kommen aus dem Parquet-Archiv (Export lädt den Zeitraum komplett in den Speicher).")
+    elif horizon is not None:
+        st.warning(f"Jobs vor dem {horizon:%d.%m.%Y} sind archiviert und ohne pyarrow nicht lesbar – Jobs und Prozesse im Export unvollständig.")
+    exports_dir = ROOT / "exports"
+    exports_dir.mkdir(exist_ok=True)
+
+    def build_excel() -> Path:
+        fname = exports_dir / f"rpa_performance_{date_end.isoformat()}.xlsx"
+        db = ReadSessionLocal()
+        try:
+            return export_daily_summary(db, date_start, date_end, kpi_metrics, df_util, fname)
+        finally:
+            db.close()
 
-if "export_path" not in st.session_state:
-    st.session_state.export_path = None
-if st.button("Excel exportieren"):
-    try:
-        path = build_excel()
-        st.session_state.export_path = path
-        st.success(f"Export erstellt: {path.name}")
-    except Exception as e:
-        st.error(f"Export fehlgeschlagen: {e}")
-if st.session_state.export_path and st.session_state.export_path.exists():
-    with open(st.session_state.export_path, "rb") as f:
-        st.download_button("Download Excel", data=f.read(), file_name=st.session_state.export_path.name, mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    if "export_path" not in st.session_state:
+        st.session_state.export_path = None
+    if st.button("Excel exportieren"):
+        try:
+            path = build_excel()
+            st.session_state.export_path = path
+            st.success(f"Export erstellt: {path.name}")
+        except Exception as e:
+            st.error(f"Export fehlgeschlagen: {e}")
+    if st.session_state.export_path and st.session_state.export_path.exists():
+        with open(st.session_state.export_path, "rb") as f:
+            st.download_button("Download Excel", data=f.read(), file_name=st.session_state.export_path.name, mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
+render_export_section(
+    date_start, date_end,
+    kpis,
+    df_util,
+)
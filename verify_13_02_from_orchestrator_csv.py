@@ -1,17 +1,25 @@
 """
 Abgleich 13.02.2026: Orchestrator-CSV vs. Dashboard-Tagesansicht.
 Verwendet die gleiche Leerlauf-Logik wie die App (nur RPA-*, pro Robot Lücken, Tag 00:00–23:59).
+Run: python verify_13_02_from_orchestrator_csv.py [csv]
+Ohne Orchestrator-Export: python -m backend.synth csv --end 2026-02-13 --out jobs.csv
 """
 import csv
 import sys
 from datetime import date, datetime, timedelta
 from pathlib import Path
 
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from backend.services.idle_service import busy_idle_segments
+
 # CSV-Pfad (Orchestrator-Export)
 CSV_PATH = Path(r"c:\UiPath\jobs-1b4bdd9a-2ec0-4e32-b388-ffb396751c9b-2026-02-14-11-56-37-463-193486\jobs-1b4bdd9a-2ec0-4e32-b388-ffb396751c9b-2026-02-14-11-56-37-463-193486.csv")
 DAY = date(2026, 2, 13)
 DAY_START = datetime.combine(DAY, datetime.min.time())
 DAY_END = datetime.combine(DAY, datetime.max.time())
+HOSTS = ("RPA-DONALD-001", "RPA-MICKY-002")
 
 
 def parse_ts(s: str) -> datetime | None:
@@ -27,18 +35,19 @@ def parse_ts(s: str) -> datetime | None:
 
 
 def main():
-    if not CSV_PATH.exists():
-        print(f"CSV nicht gefunden: {CSV_PATH}")
+    csv_path = Path(sys.argv[1]) if len(sys.argv) > 1 else CSV_PATH
+    if not csv_path.exists():
+        print(f"CSV nicht gefunden: {csv_path}")
         print("Bitte Pfad anpassen oder CSV dorthin kopieren.")
         return
 
     # Alle Jobs, die mit dem 13.02 überlappen (Start vor Ende 13.02, Ende nach Start 13.02)
     rows = []
-    with open(CSV_PATH, newline="", encoding="utf-8") as f:
+    with open(csv_path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             host = (row.get("Hostname") or "").strip()
-            if host not in ("RPA-DONALD-001", "RPA-MICKY-002"):
+            if host not in HOSTS:
                 continue
             start_dt = parse_ts(row.get("Started (absolute)", ""))
             end_dt = parse_ts(row.get("Ended (absolute)", ""))
@@ -54,44 +63,28 @@ def main():
                 "end": end_dt,
             })
 
-    # Pro Robot: nur Zeiten innerhalb 13.02 (s, e, process)
-    by_host: dict[str, list[tuple[datetime, datetime, str]]] = {}
-    for r in rows:
-        host = r["host"]
-        s = max(r["start"], DAY_START)
-        e = r["end"]
-        if e is None or e <= s:
-            continue
-        e = min(e, DAY_END)
-        if e <= s:
-            continue
-        by_host.setdefault(host, []).append((s, e, r.get("process", "")[:50]))
+    # Gleiche Leerlauf-Logik wie die App (backend.services.idle_service)
+    jobs = pd.DataFrame([
+        {"robot_key": r["host"], "process_name": r["process"][:50], "state": r["state"],
+         "start_time": r["start"], "end_time": r["end"]}
+        for r in rows
+    ])
+    seg = busy_idle_segments(jobs, HOSTS, (DAY, DAY))
 
-    for host in by_host:
-        by_host[host].sort(key=lambda x: x[0])
-
-    sum_idle_min = 0.0
     print(f"\n=== 13.02.2026 - Abgleich mit Orchestrator-CSV ===\n")
-    print(f"Jobs mit Start am 13.02. und Host RPA-DONALD-001 / RPA-MICKY-002: {sum(len(by_host[h]) for h in by_host)}")
+    print(f"Jobs mit Start am 13.02. und Host RPA-DONALD-001 / RPA-MICKY-002: {int((seg['kind'] == 'job').sum()) if not seg.empty else 0}")
 
-    for host in sorted(by_host.keys()):
-        intervals = by_host[host]
-        prev_end = DAY_START
-        idle_min_robot = 0.0
+    sum_idle_min = 0.0
+    for host in sorted(seg["robot_key"].unique()) if not seg.empty else []:
+        host_seg = seg[seg["robot_key"] == host]
         print(f"\n--- {host} ---")
-        for s, e, proc in intervals:
-            if s > prev_end:
-                gap_min = (s - prev_end).total_seconds() / 60
-                idle_min_robot += gap_min
-                if gap_min >= 1:
-                    print(f"  Leerlauf {prev_end.strftime('%H:%M')}-{s.strftime('%H:%M')}: {int(gap_min)} min")
-            print(f"  Job {s.strftime('%H:%M')}-{e.strftime('%H:%M')}: {proc}")
-            prev_end = max(prev_end, e)
-        if prev_end < DAY_END:
-            gap_min = (DAY_END - prev_end).total_seconds() / 60
-            idle_min_robot += gap_min
-            if gap_min >= 1:
-                print(f"  Leerlauf {prev_end.strftime('%H:%M')}-24:00: {int(gap_min)} min")
+        for s, e, kind, proc, minutes in host_seg[["start", "end", "kind", "process_name", "minutes"]].itertuples(index=False):
+            if kind == "idle":
+                if minutes >= 1:
+                    print(f"  Leerlauf {s.strftime('%H:%M')}-{e.strftime('%H:%M')}: {int(minutes)} min")
+            else:
+                print(f"  Job {s.strftime('%H:%M')}-{e.strftime('%H:%M')}: {proc}")
+        idle_min_robot = float(host_seg.loc[host_seg["kind"] == "idle", "minutes"].sum())
         sum_idle_min += idle_min_robot
         print(f"  => Idle {host}: {idle_min_robot / 60:.2f} h")
 